@@ -1 +1,19 @@
-"""API routers here."""
\ No newline at end of file
+"""API routers here."""
+from fastapi import FastAPI
+
+from api.display import router as display_router
+from api.metrics import router as metrics_router
+from api.webhooks import router as webhooks_router
+from pool_queue.startup import startup
+
+
+app = FastAPI(title="Pool Queue")
+app.include_router(display_router)
+app.include_router(metrics_router)
+app.include_router(webhooks_router)
+
+
+@app.on_event("startup")
+def _startup() -> None:
+    """Prepare this worker process before it serves requests."""
+    startup()
@@ -0,0 +1,83 @@
+"""Visual Queue display feed, pushed to displays as server-sent events."""
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+import json
+from typing import AsyncIterator
+
+from pool_queue.events import EVENT_BUS
+from pool_queue.game import Game
+from pool_queue.player_queue import PlayerQueue
+from pool_queue.table import Table
+
+
+router = APIRouter(prefix="/display", tags=["display"])
+
+# Seconds between keep-alive comments while no events are sent
+HEARTBEAT_INTERVAL = 15
+
+
+async def venue_snapshot(venue: str) -> dict:
+    """
+    Every table at the venue with its queue and live game, for a display to apply
+    events to. Read once per connection, not per update.
+    """
+    games = {game.table: game for game in await Game.alive_games(venue)}
+    tables = sorted(
+        set(await Table.aat_venue(venue)) | set(games), key=lambda table: table.table
+    )
+
+    snapshot = {"venue": venue, "tables": []}
+    for table in tables:
+        queue = await PlayerQueue(table=table).asnapshot()
+        game = games.get(table)
+        snapshot["tables"].append(
+            {
+                "table": table.table,
+                "queue": [
+                    {"entry_id": entry_id, "name": player.name}
+                    for entry_id, player in zip(queue.entry_ids, queue.players)
+                ],
+                "game": game and {
+                    "game_id": str(game.game_id),
+                    "status": game.status.value,
+                    "king": game.king.name,
+                    "challenger": game.challenger.name
+                }
+            }
+        )
+
+    return snapshot
+
+
+async def _event_stream(venue: str) -> AsyncIterator[str]:
+    """
+    A snapshot of the venue, then its events as they happen. If the display falls too
+    far behind, the stream ends and the display reconnects to a fresh snapshot.
+    """
+    # Subscribe before reading the snapshot, so no events are missed in between
+    with EVENT_BUS.subscribe(venue) as subscription:
+        data = await venue_snapshot(venue)
+        yield f"event: snapshot\ndata: {json.dumps(data)}\n\n"
+
+        while True:
+            try:
+                event = await subscription.get(timeout=HEARTBEAT_INTERVAL)
+            except TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+
+            if event is None:
+                return
+
+            yield event.to_sse()
+
+
+@router.get("/{venue}/events")
+async def display_events(venue: str) -> StreamingResponse:
+    """Server-sent events for a venue's display: a snapshot, then incremental events."""
+    return StreamingResponse(
+        _event_stream(venue),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,14 @@
+"""Prometheus metrics of every worker process, see `pool_queue.telemetry`."""
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from pool_queue.telemetry import render_metrics
+
+
+router = APIRouter(tags=["metrics"])
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Turn, LLM, tool and Mongo command latencies and counts, for scraping."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,184 @@
+"""
+Inbound SMS webhooks. Messages are acknowledged immediately and answered by a bounded
+worker pool, so slow agent turns don't time out the provider's webhook and trigger
+retries. Each phone's messages are answered in order, one turn at a time, and texts
+sent in quick succession are answered together.
+"""
+from fastapi import APIRouter, HTTPException, Request, Response
+from pydantic import BaseModel
+
+from base64 import b64encode
+import hashlib
+import hmac
+import logging
+from urllib.parse import parse_qs
+from xml.sax.saxutils import escape
+
+from pool_queue.cache import MISSING, TTLCache
+from pool_queue.dispatch import DispatcherStats, KeyedDispatcher
+from pool_queue.table import DEFAULT_VENUE
+from pool_queue.utils import validate_phone_number
+
+from keys import KEYS
+
+
+logger = logging.getLogger(__name__)
+
+# Replied immediately instead of queueing, when the worker pool is saturated
+BUSY_MESSAGE = "Lots of texts right now, please try again in a minute."
+
+# Seconds to let queued messages finish when shutting down
+SHUTDOWN_TIMEOUT = 30
+
+# Message IDs seen recently, so provider retries of a message aren't answered twice.
+# Kept per process, so a retry handled by another worker is still answered again.
+RECENT_MESSAGES = TTLCache(max_size=4096, ttl=600)
+
+
+class InboundMessage(BaseModel):
+    """A text message to answer."""
+    phone: str
+    body: str
+    venue: str
+
+
+async def answer(phone: str, messages: list[InboundMessage]) -> None:
+    """
+    Run the agent on a phone's messages since its last turn, as one message, and
+    text the reply back. Slow replies are acknowledged by text first.
+    """
+    # The agent is slow to import, so it's imported on use (or pre-warmed, see
+    # `pool_queue.startup`) rather than with the API
+    from pool_queue.agent import arun_agent
+
+    body = "\n".join(message.body for message in messages)
+    await arun_agent(body, phone, messages[-1].venue, two_phase=True)
+
+
+# Answers inbound messages by phone number, built and started with the app, so
+# importing the API doesn't read the keys
+_dispatcher: KeyedDispatcher | None = None
+
+
+def get_dispatcher() -> KeyedDispatcher:
+    """The dispatcher answering inbound messages. Raises RuntimeError before startup."""
+    if _dispatcher is None:
+        raise RuntimeError("Webhook dispatcher used before the app started.")
+
+    return _dispatcher
+
+
+def _twiml(message: str | None = None) -> Response:
+    """TwiML response, replying with `message` if given, otherwise sending nothing."""
+    reply = f"<Message>{escape(message)}</Message>" if message else ""
+    return Response(
+        f'<?xml version="1.0" encoding="UTF-8"?><Response>{reply}</Response>',
+        media_type="application/xml"
+    )
+
+
+def _request_url(request: Request) -> str:
+    """
+    The URL Twilio sent the request to. Behind a proxy terminating TLS, the app sees
+    plain HTTP, so the scheme is taken from the proxy's forwarded header.
+    """
+    url = request.url
+    if scheme := request.headers.get("X-Forwarded-Proto"):
+        url = url.replace(scheme=scheme)
+
+    return str(url)
+
+
+def _signed(request: Request, form: dict[str, list[str]]) -> bool:
+    """
+    Whether a webhook request was signed by Twilio: its signature header must be the
+    base64 HMAC-SHA1, keyed with the account's auth token, of the request URL followed
+    by each form parameter's name and value, sorted by name.
+
+    Without Twilio keys, replies go to the stub sender (see `pool_queue.sms`) and
+    there's no token to check against, so every request is accepted, ex. locally.
+    """
+    if KEYS.Twilio is None:
+        return True
+
+    payload = _request_url(request) + "".join(
+        f"{key}{value}" for key in sorted(form) for value in sorted(form[key])
+    )
+    signature = hmac.new(
+        KEYS.Twilio.auth_token.encode(), payload.encode(), hashlib.sha1
+    ).digest()
+
+    return hmac.compare_digest(
+        b64encode(signature).decode(), request.headers.get("X-Twilio-Signature", "")
+    )
+
+
+async def _start_dispatcher() -> None:
+    """Build the dispatcher from the Webhooks keys and start its workers."""
+    global _dispatcher
+
+    _dispatcher = KeyedDispatcher(
+        answer,
+        concurrency=KEYS.Webhooks.concurrency,
+        max_pending=KEYS.Webhooks.max_queued,
+        coalesce_window=KEYS.Webhooks.coalesce_ms / 1000,
+        name="webhooks"
+    )
+    _dispatcher.start()
+
+
+async def _stop_dispatcher() -> None:
+    await get_dispatcher().stop(SHUTDOWN_TIMEOUT)
+
+
+router = APIRouter(
+    prefix="/webhooks",
+    tags=["webhooks"],
+    on_startup=[_start_dispatcher],
+    on_shutdown=[_stop_dispatcher]
+)
+
+
+@router.post("/sms")
+async def inbound_sms(request: Request, venue: str = DEFAULT_VENUE) -> Response:
+    """
+    Twilio inbound SMS webhook. Queues the message to be answered and acknowledges it
+    without waiting. If too many messages are already queued, replies right away
+    asking the sender to try again. The venue is set per number in the webhook URL.
+
+    Requests not signed by Twilio are rejected. Retries of a message already queued
+    by this process are acknowledged without answering them again, but retries
+    reaching another worker are answered, see RECENT_MESSAGES.
+    """
+    # Blank parameters are signed too
+    form = parse_qs((await request.body()).decode(), keep_blank_values=True)
+    if not _signed(request, form):
+        raise HTTPException(status_code=403, detail="Invalid signature")
+
+    try:
+        phone = validate_phone_number(form["From"][0])
+        if not (body := form["Body"][0]):
+            raise ValueError("empty body")
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid message: {e}")
+
+    message_id = form.get("MessageSid", [None])[0]
+    if message_id and RECENT_MESSAGES.get(message_id) is not MISSING:
+        return _twiml()
+
+    message = InboundMessage(phone=phone, body=body, venue=venue)
+    dispatcher = get_dispatcher()
+    if not dispatcher.submit(phone, message):
+        logger.warning("Webhooks saturated, %s", dispatcher.stats())
+        return _twiml(BUSY_MESSAGE)
+
+    if message_id:
+        RECENT_MESSAGES.set(message_id, True)
+
+    return _twiml()
+
+
+@router.get("/status")
+async def webhook_status() -> DispatcherStats:
+    """Queue depth and load of webhook processing."""
+    return get_dispatcher().stats()
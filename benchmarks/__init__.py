@@ -0,0 +1,15 @@
+"""
+Offline benchmarks for the queue, game, chat history and agent hot paths. Mongo is
+replaced by an in-memory store that counts the operations it serves, and the LLM by a
+scripted one, so the suite runs without network access. Run with `python -m benchmarks`.
+
+Timings against the in-memory store aren't Mongo's, compare them across commits rather
+than reading them as absolute. Operation counts are exact.
+"""
+import os
+
+
+# Point the keys at placeholders before pool_queue is imported, see `keys`
+os.environ.setdefault(
+    "POOL_QUEUE_KEYS", os.path.join(os.path.dirname(__file__), "keys.yaml")
+)
@@ -0,0 +1,50 @@
+"""
+Run the benchmarks, save the results and compare them with the previous run.
+
+    python -m benchmarks [--sizes 10 100 1000 10000] [--only run_agent] [--no-save]
+        [--baseline results/<run>.json] [--fail-on-regression]
+"""
+import argparse
+import sys
+
+from benchmarks import report
+from benchmarks.suite import DEFAULT_SIZES, run
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=20, help="most calls per size")
+    parser.add_argument("--budget", type=float, default=5, help="seconds per size")
+    parser.add_argument("--only", nargs="+", help="benchmarks to run, by name")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--baseline", help="run to compare with, default the latest")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="slowdown counted as a regression"
+    )
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat, args.budget, args.only)
+    saved = None if args.no_save else report.save(results)
+
+    baseline_path = args.baseline or report.latest(exclude=saved)
+    baseline = report.load(baseline_path) if baseline_path else None
+
+    print(report.table(results, baseline))
+    if saved:
+        print(f"\nSaved to {saved}")
+
+    if baseline is None:
+        return 0
+
+    print(f"Compared with {baseline.commit} ({baseline.time:%Y-%m-%d %H:%M})")
+    regressed = report.regressions(results, baseline, args.threshold)
+    for result in regressed:
+        print(f"Regression: {result.benchmark} at size {result.size}")
+
+    return 1 if regressed and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Stand-ins for external services: an in-memory Mongo (mongomock) that counts the
+operations it serves, and a scripted LLM.
+"""
+from langchain.llms.base import LLM
+from pymongo import IndexModel
+import mongomock
+
+from collections import Counter
+from typing import Any
+
+
+# Collection methods that each make one round trip to the server
+MONGO_OPERATIONS = {
+    "find",
+    "find_one",
+    "insert_one",
+    "insert_many",
+    "update_one",
+    "update_many",
+    "find_one_and_update",
+    "find_one_and_delete",
+    "find_one_and_replace",
+    "delete_one",
+    "delete_many",
+    "count_documents",
+    "aggregate",
+    "bulk_write"
+}
+
+
+def _without_partial_filter(index: IndexModel) -> IndexModel:
+    """
+    The index as mongomock can build it. mongomock ignores partial filters, so a
+    partial unique index would be enforced on every document; it's built as a plain
+    index instead, leaving its uniqueness unchecked.
+    """
+    options = dict(index.document)
+    if "partialFilterExpression" not in options:
+        return index
+
+    del options["partialFilterExpression"]
+    options.pop("unique", None)
+    return IndexModel(list(options.pop("key").items()), **options)
+
+
+class CountingCollection:
+    """Collection proxy counting the operations called on it."""
+
+    def __init__(self, collection: mongomock.Collection, counts: Counter):
+        self._collection = collection
+        self._counts = counts
+
+    def create_indexes(self, indexes: list[IndexModel], **kwargs) -> list[str]:
+        """Create indexes, building partial ones without their filter."""
+        return self._collection.create_indexes(
+            [_without_partial_filter(index) for index in indexes], **kwargs
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._collection, name)
+        if name not in MONGO_OPERATIONS:
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counts[f"{self._collection.name}.{name}"] += 1
+            return attr(*args, **kwargs)
+
+        return counted
+
+
+class CountingDatabase:
+    """Database proxy whose collections count their operations."""
+
+    def __init__(self, database: mongomock.Database, counts: Counter):
+        self._database = database
+        self._counts = counts
+
+    def __getitem__(self, name: str) -> CountingCollection:
+        return CountingCollection(self._database[name], self._counts)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._database, name)
+
+
+class CountingClient:
+    """In-memory Mongo client counting the operations served by its databases."""
+
+    def __init__(self):
+        self._client = mongomock.MongoClient()
+        self.counts: Counter = Counter()
+
+    def __getitem__(self, name: str) -> CountingDatabase:
+        return CountingDatabase(self._client[name], self.counts)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+    def reset(self) -> None:
+        """Zero the operation counts."""
+        self.counts.clear()
+
+    def total(self) -> int:
+        """Operations served since the last reset."""
+        return sum(self.counts.values())
+
+
+class ScriptedLLM(LLM):
+    """
+    LLM that answers without a network call. The agent uses one tool, then answers;
+    summary requests get a fixed summary.
+    """
+    tool: str = "Check Position"
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def _call(self, prompt: str, stop: list[str] | None = None, **kwargs) -> str:
+        self.calls += 1
+
+        if "running summary" in prompt:
+            return "The player asked about the queue."
+
+        # The scratchpad follows the chat history, the format instructions come before
+        if "Observation:" in prompt.rsplit("=== End Chat History ===", 1)[-1]:
+            return "Thought: I now know the final answer\nFinal Answer: Done."
+
+        return f"Thought: I should use a tool\nAction: {self.tool}\nAction Input: n/a"
@@ -0,0 +1,102 @@
+"""
+Startup profiler. Imports a module in a fresh interpreter with `-X importtime` and
+reports the slowest modules it imports, and the total, so cold-start regressions show
+up. Each module's time is the fastest of several runs.
+
+    python -m benchmarks.imports [api pool_queue.agent] [--top 20] [--budget-ms 1500]
+
+Exits with an error if `--budget-ms` is given and any module's total exceeds it.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+
+# Modules imported by default: the API, as served
+DEFAULT_MODULES = ["api"]
+
+ROOT = os.path.realpath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def import_times(module: str) -> dict[str, tuple[int, int]]:
+    """
+    Self and cumulative import time, in microseconds, of every module imported while
+    importing `module` in a fresh interpreter.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        cwd=ROOT,
+        env={
+            **os.environ,
+            "POOL_QUEUE_KEYS": os.path.join(ROOT, "benchmarks", "keys.yaml")
+        }
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    # Lines look like "import time:       512 |       1024 |   package.module"
+    times: dict[str, tuple[int, int]] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+
+    return times
+
+
+def profile(module: str, runs: int) -> dict[str, tuple[int, int]]:
+    """Import times of `module`, keeping each imported module's fastest run."""
+    fastest: dict[str, tuple[int, int]] = {}
+
+    for _ in range(runs):
+        for name, times in import_times(module).items():
+            if name not in fastest or times[1] < fastest[name][1]:
+                fastest[name] = times
+
+    return fastest
+
+
+def report(module: str, times: dict[str, tuple[int, int]], top: int) -> str:
+    """The slowest modules by cumulative time, and the total to import `module`."""
+    lines = [f"{'module':<60}{'self ms':>10}{'total ms':>10}"]
+    slowest = sorted(times.items(), key=lambda item: item[1][1], reverse=True)
+
+    for name, (self_us, cumulative_us) in slowest[:top]:
+        lines.append(f"{name:<60}{self_us / 1000:>10.1f}{cumulative_us / 1000:>10.1f}")
+
+    lines.append(f"\nImporting {module} took {total_ms(module, times):.1f} ms")
+    return "\n".join(lines)
+
+
+def total_ms(module: str, times: dict[str, tuple[int, int]]) -> float:
+    """Milliseconds to import `module`, including everything it imports."""
+    return times[module][1] / 1000
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.imports")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--top", type=int, default=25, help="slowest modules shown")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--budget-ms", type=float, help="fail if an import is slower")
+    args = parser.parse_args()
+
+    over_budget = False
+    for module in args.modules:
+        times = profile(module, args.runs)
+        print(report(module, times, args.top), end="\n\n")
+
+        if args.budget_ms is not None and total_ms(module, times) > args.budget_ms:
+            print(f"{module} is over the {args.budget_ms:.0f} ms budget", end="\n\n")
+            over_budget = True
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
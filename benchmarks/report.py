@@ -0,0 +1,131 @@
+"""
+Saving benchmark runs and comparing them. Each run is saved as JSON in the results
+directory, named by time and commit, so a run can be compared with an earlier one.
+"""
+from pydantic import BaseModel
+
+from datetime import datetime
+import os
+import subprocess
+
+from benchmarks.suite import Result
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+class Run(BaseModel):
+    """A saved benchmark run."""
+    commit: str
+    time: datetime
+    results: list[Result]
+
+
+def current_commit() -> str:
+    """Short hash of the checked out commit, marked dirty if there are changes."""
+    def git(*args: str) -> str:
+        return subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True
+        ).stdout.strip()
+
+    try:
+        commit = git("rev-parse", "--short", "HEAD")
+        dirty = bool(git("status", "--porcelain", "--untracked-files=no"))
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+    return f"{commit}-dirty" if dirty else commit
+
+
+def save(results: list[Result]) -> str:
+    """Save a run of results, returning the file it was saved to."""
+    run = Run(commit=current_commit(), time=datetime.now(), results=results)
+    path = os.path.join(RESULTS_DIR, f"{run.time:%Y%m%d-%H%M%S}-{run.commit}.json")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(run.model_dump_json(indent=2))
+
+    return path
+
+
+def load(path: str) -> Run:
+    """Load a saved run."""
+    with open(path, "r", encoding="utf-8") as f:
+        return Run.model_validate_json(f.read())
+
+
+def latest(exclude: str | None = None) -> str | None:
+    """The most recently saved run, other than `exclude`, or None if there's none."""
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+
+    paths = sorted(
+        os.path.join(RESULTS_DIR, name)
+        for name in os.listdir(RESULTS_DIR)
+        if name.endswith(".json")
+    )
+    paths = [path for path in paths if path != exclude]
+    return paths[-1] if paths else None
+
+
+def table(results: list[Result], baseline: Run | None = None) -> str:
+    """
+    Format results as a table. Given a baseline run, each result is shown with its
+    change from the baseline's result for the same benchmark and size.
+    """
+    previous = {
+        (result.benchmark, result.size): result
+        for result in (baseline.results if baseline else [])
+    }
+
+    lines = [
+        f"{'benchmark':<26}{'size':>7}{'calls':>7}{'median ms':>12}{'p95 ms':>10}"
+        f"{'mongo ops':>11}  change"
+    ]
+    for result in results:
+        line = (
+            f"{result.benchmark:<26}{result.size:>7}{result.calls:>7}"
+            f"{result.median_ms:>12.3f}{result.p95_ms:>10.3f}{result.mongo_ops:>11.2f}"
+        )
+
+        if (before := previous.get((result.benchmark, result.size))) is not None:
+            line += f"  {change(before, result)}"
+
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+def change(before: Result, after: Result) -> str:
+    """How a result changed: its median time, and its Mongo operations if they did."""
+    # Medians are rounded to the microsecond, so a very fast call can round to zero
+    ratio = after.median_ms / max(before.median_ms, 0.001)
+    described = f"{(ratio - 1) * 100:+.0f}% time"
+    if after.mongo_ops != before.mongo_ops:
+        described += f", {after.mongo_ops - before.mongo_ops:+.2f} ops"
+
+    return described
+
+
+def regressions(
+    results: list[Result], baseline: Run, threshold: float
+) -> list[Result]:
+    """
+    Results whose median time grew by more than `threshold` (a fraction) over the
+    baseline, or that make more Mongo operations per call.
+    """
+    previous = {(result.benchmark, result.size): result for result in baseline.results}
+    regressed: list[Result] = []
+
+    for result in results:
+        if (before := previous.get((result.benchmark, result.size))) is None:
+            continue
+
+        if (
+            result.median_ms > before.median_ms * (1 + threshold)
+            or result.mongo_ops > before.mongo_ops
+        ):
+            regressed.append(result)
+
+    return regressed
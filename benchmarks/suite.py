@@ -0,0 +1,198 @@
+"""
+The benchmarks. Each size gets a fresh in-memory database seeded with a queue of that
+many players, an in-progress game and as many finished games, then every benchmark
+is timed against it.
+"""
+from pydantic import BaseModel
+
+from contextlib import redirect_stdout
+from datetime import datetime
+from io import StringIO
+from typing import Callable
+import itertools
+import statistics
+import time
+
+from benchmarks.fakes import CountingClient, ScriptedLLM
+from pool_queue import agent, database
+from pool_queue.agent import run_agent
+from pool_queue.history import ChatHistory, Message
+from pool_queue.game import GAME_COLL, Game, GameStatus
+from pool_queue.indexes import ensure_indexes
+from pool_queue.player import PLAYER_CACHE, PLAYER_COLL, Player
+from pool_queue.player_queue import COUNTER_COLL, QUEUE_COLL, PlayerQueue
+from pool_queue.table import DEFAULT_TABLE
+
+
+# Queue sizes benchmarked by default
+DEFAULT_SIZES = [10, 100, 1_000, 10_000]
+
+# A message the agent answers with one tool call, as it doesn't match any intent
+AGENT_QUERY = "how many people are ahead of me right now?"
+
+
+class Result(BaseModel):
+    """Timings and Mongo operations of one benchmark at one queue size."""
+    benchmark: str
+    size: int
+    calls: int
+    median_ms: float
+    p95_ms: float
+    mongo_ops: float
+    operations: dict[str, float]
+
+
+class Fixture(BaseModel):
+    """A seeded database: the queue, its last player and the players in its game."""
+    queue: PlayerQueue
+    last_player: Player
+    king: Player
+    challenger: Player
+
+
+def phone(n: int) -> str:
+    """The nth benchmark player's phone number."""
+    return f"1{n:010d}"
+
+
+def install_fakes() -> CountingClient:
+    """
+    Swap a fresh in-memory client in for the shared Mongo client, and the scripted LLM
+    in for the agent's. Agent executors are rebuilt on the scripted LLM.
+    """
+    client = CountingClient()
+    database.set_client(client)
+
+    agent.set_llm(ScriptedLLM())
+    PLAYER_CACHE.clear()
+
+    return client
+
+
+def seed(size: int) -> Fixture:
+    """
+    Seed a queue of `size` players, an in-progress game between two more players and
+    `size` finished games. Indexes are created after seeding, as startup would on an
+    existing database.
+    """
+    players = [
+        Player(name=f"Player {n}", phone_number=phone(n)) for n in range(size + 2)
+    ]
+    king, challenger, queued = players[0], players[1], players[2:]
+
+    PLAYER_COLL.insert_many([player.model_dump() for player in players])
+    QUEUE_COLL.insert_many(
+        [
+            {
+                "player_phone": player.phone_number,
+                "datetime_added": datetime.now(),
+                "seq": seq,
+                **DEFAULT_TABLE.key
+            }
+            for seq, player in enumerate(queued, start=1)
+        ]
+    )
+    COUNTER_COLL.insert_one({"_id": f"queue:{DEFAULT_TABLE.id}", "seq": size})
+
+    finished = {
+        "king": king.model_dump(),
+        "challenger": challenger.model_dump(),
+        "status": GameStatus.FINISHED.value,
+        **DEFAULT_TABLE.key
+    }
+    GAME_COLL.insert_many([dict(finished) for _ in range(size)])
+    Game.create(king, challenger, force_active=True)
+
+    ensure_indexes()
+
+    return Fixture(
+        queue=PlayerQueue(), last_player=queued[-1], king=king, challenger=challenger
+    )
+
+
+def benchmarks(fixture: Fixture) -> dict[str, Callable[[], object]]:
+    """The calls to time, by benchmark name."""
+    new_phones = (phone(n) for n in itertools.count(10_000_000))
+    history = ChatHistory.from_phone(fixture.king.phone_number)
+
+    def agent_turn() -> str:
+        # The agent executor is verbose
+        with redirect_stdout(StringIO()):
+            return run_agent(AGENT_QUERY, fixture.last_player.phone_number)
+
+    return {
+        "PlayerQueue.add": lambda: fixture.queue.add(next(new_phones)),
+        "PlayerQueue.get_position": lambda: fixture.queue.get_position(
+            fixture.last_player
+        ),
+        "PlayerQueue.get_queue": fixture.queue.get_queue,
+        "Game.from_only_active": Game.from_only_active,
+        "ChatHistory.add": lambda: history.add(
+            Message(phone_number=history.phone_number, content="hey", sender="user")
+        ),
+        "run_agent": agent_turn
+    }
+
+
+def measure(
+    name: str,
+    call: Callable[[], object],
+    client: CountingClient,
+    size: int,
+    repeat: int,
+    budget: float
+) -> Result:
+    """
+    Time `call` up to `repeat` times, stopping early once `budget` seconds have been
+    spent, and count the Mongo operations it makes per call.
+    """
+    client.reset()
+    timings: list[float] = []
+    started = time.perf_counter()
+
+    while len(timings) < repeat and (
+        not timings or time.perf_counter() - started < budget
+    ):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    calls = len(timings)
+    timings.sort()
+    return Result(
+        benchmark=name,
+        size=size,
+        calls=calls,
+        median_ms=round(statistics.median(timings), 3),
+        p95_ms=round(timings[min(calls - 1, int(calls * 0.95))], 3),
+        mongo_ops=round(client.total() / calls, 2),
+        operations={
+            operation: round(count / calls, 2)
+            for operation, count in sorted(client.counts.items())
+        }
+    )
+
+
+def run(
+    sizes: list[int] = DEFAULT_SIZES,
+    repeat: int = 20,
+    budget: float = 5,
+    only: list[str] | None = None
+) -> list[Result]:
+    """
+    Run the benchmarks, or only those named in `only`, at each queue size. Each
+    benchmark is called up to `repeat` times per size, within `budget` seconds.
+    """
+    results: list[Result] = []
+
+    for size in sizes:
+        client = install_fakes()
+        fixture = seed(size)
+
+        for name, call in benchmarks(fixture).items():
+            if only and name not in only:
+                continue
+
+            results.append(measure(name, call, client, size, repeat, budget))
+
+    return results
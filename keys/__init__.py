@@ -1,22 +1,56 @@
-"""Key management for pool_queue. Read keys.yaml."""
+"""
+Key management for pool_queue. Read keys.yaml, or the file at $POOL_QUEUE_KEYS if set.
+The file is read and validated when KEYS is first used, not on import.
+"""
 import os
+from threading import Lock
+
 import yaml
 
 from keys import models
 
 
-keys_path = os.path.join(
-    (current_dir := os.path.realpath(os.path.dirname(__file__))),
-    "..",  # parent dir since module is in a subdirectory
-    "keys.yaml"
-)
+def keys_path() -> str:
+    """Path of the keys file."""
+    return os.environ.get("POOL_QUEUE_KEYS") or os.path.join(
+        os.path.realpath(os.path.dirname(__file__)),
+        "..",  # parent dir since module is in a subdirectory
+        "keys.yaml"
+    )
+
+
+def load_keys() -> models.Keys:
+    """Read and validate the keys file."""
+    path = keys_path()
+
+    if not os.path.exists(path):
+        raise FileNotFoundError("keys.yaml file not found.")
+
+    with open(path, "r", encoding="utf-8") as f:
+        raw_keys = yaml.safe_load(f)
+
+    return models.Keys(**raw_keys)
+
+
+class LazyKeys:
+    """The validated keys, loaded on first attribute access."""
+
+    def __init__(self):
+        self._keys: models.Keys | None = None
+        self._lock = Lock()
+
+    def load(self) -> models.Keys:
+        """Load the keys if they haven't been yet, and return them."""
+        if self._keys is None:
+            with self._lock:
+                if self._keys is None:
+                    self._keys = load_keys()
 
-if not os.path.exists(keys_path):
-    raise FileNotFoundError("keys.yaml file not found.")
+        return self._keys
 
-with open(keys_path, "r", encoding="utf-8") as f:
-    RAW_KEYS = yaml.safe_load(f)
+    def __getattr__(self, name: str):
+        return getattr(self.load(), name)
 
 
-# Validate the keys and expose KEYS
-KEYS = models.Keys(**RAW_KEYS)
+# The keys, validated on first use
+KEYS = LazyKeys()
@@ -13,6 +13,14 @@ from pydantic import BaseModel
 class MongoDBModel(BaseModel):
     """Credentials to connect to Pool Queue project and database."""
     connect_str: str
+    database: str = "PoolQueue"
+
+    # Connection pool settings, shared by every model
+    max_pool_size: int = 10
+    min_pool_size: int = 0
+    connect_timeout_ms: int = 5_000
+    server_selection_timeout_ms: int = 5_000
+    socket_timeout_ms: int | None = None
 
 
 class OpenAI(BaseModel):
@@ -20,7 +28,38 @@ class OpenAI(BaseModel):
     api_key: str
 
 
+class TwilioModel(BaseModel):
+    """Credentials for sending SMS replies through Twilio."""
+    account_sid: str
+    auth_token: str
+    from_number: str
+
+
+class WebhooksModel(BaseModel):
+    """Inbound webhook processing settings."""
+    # Messages processed at once, and messages waiting before new ones are turned away
+    concurrency: int = 8
+    max_queued: int = 100
+
+    # How long a sender's first text waits for follow-ups to answer them as one turn
+    coalesce_ms: int = 750
+
+
+class StartupModel(BaseModel):
+    """Process startup settings, see `pool_queue.startup`."""
+    # Migrate legacy documents and create indexes before serving. Can be turned off
+    # once the database is migrated, saving the round trips on every cold start.
+    migrate: bool = True
+
+    # Import the agent and build its clients in the background at startup, rather
+    # than while answering the first message
+    prewarm: bool = True
+
+
 class Keys(BaseModel):
     """Overall keys."""
     MongoDB: MongoDBModel
     OpenAI: OpenAI
+    Twilio: TwilioModel | None = None
+    Webhooks: WebhooksModel = WebhooksModel()
+    Startup: StartupModel = StartupModel()
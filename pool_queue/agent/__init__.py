@@ -1,33 +1,128 @@
 """The agent to serve as the interface between users and the pool-queue system."""
-from langchain.chat_models import ChatOpenAI
-from langchain.tools import Tool
 from langchain.agents import AgentExecutor
+from langchain.schema.language_model import BaseLanguageModel
+
+from pydantic import BaseModel
+
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from functools import cache
+from threading import Event, Lock, Timer
+import asyncio
+import logging
 
 from pool_queue.agent.custom_agent import InternalThoughtZeroShotAgent
-from pool_queue.agent.prompts import AgentPrompts
-from pool_queue.agent.tools import create_registration_tool, create_tools
+from pool_queue.agent.intents import (
+    Intent,
+    aacknowledgment,
+    acknowledgment,
+    ahandle_intent,
+    aintent_for,
+    handle_intent,
+    intent_for
+)
+from pool_queue.agent.prompts import (
+    AgentPrompts,
+    asummarize_history,
+    messages_to_summarize,
+    summarize_history
+)
+from pool_queue.agent.responses import (
+    ResponseKey,
+    cache_response,
+    cacheable_query,
+    cached_response,
+    response_key
+)
+from pool_queue.agent.tools import PLAYER_TOOLS, REGISTRATION_TOOLS, acting_as
+from pool_queue.events import EVENT_BUS
 from pool_queue.player import Player, PlayerNotFoundError
-from pool_queue.agent.history import ChatHistory, Message
+from pool_queue.player_queue import PlayerQueue
+from pool_queue.sms import asend_sms, send_sms
+from pool_queue.table import DEFAULT_VENUE
+from pool_queue.history import ChatHistory, Message
+from pool_queue import telemetry
+from pool_queue.telemetry import Turn, redact_phone
 
 from keys import KEYS
 
 
-llm = ChatOpenAI(model_name="gpt-4", openai_api_key=KEYS.OpenAI.api_key, temperature=0)
+logger = logging.getLogger(__name__)
+
+# The agent's LLM, built on first use, see `get_llm`
+_llm: BaseLanguageModel | None = None
+_llm_lock = Lock()
+
+# Seconds a two-phase reply waits for the answer before texting an acknowledgment
+ACK_AFTER = 1.0
+
+# Summarizes chat histories after synchronous replies, one at a time, see
+# `_summarize_later`
+_SUMMARY_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summaries")
+
+# Summaries running after async replies, kept until done so they aren't collected
+_summary_tasks: set[asyncio.Task] = set()
+
+
+class Route(Enum):
+    """
+    How a message was answered.
+
+    CACHED: The agent's earlier reply to the same question, in the same state, was
+        reused, see `pool_queue.agent.responses`.
+    """
+    FAST_PATH = "fast_path"
+    CACHED = "cached"
+    AGENT = "agent"
+
+
+class AgentReply(BaseModel):
+    """The response to a message and how it was produced."""
+    response: str
+    route: Route
+    intent: Intent | None = None
+
+
+def get_llm() -> BaseLanguageModel:
+    """The agent's LLM, built on first use so the OpenAI client isn't made on import."""
+    global _llm
+
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                from langchain.chat_models import ChatOpenAI
+
+                _llm = ChatOpenAI(
+                    model_name="gpt-4", openai_api_key=KEYS.OpenAI.api_key, temperature=0
+                )
+
+    return _llm
+
+
+def set_llm(llm: BaseLanguageModel) -> None:
+    """Use `llm` for the agent, ex. a scripted LLM in benchmarks."""
+    global _llm
+
+    with _llm_lock:
+        _llm = llm
+        get_agent_executor.cache_clear()
 
 
-def create_agent_executor(
-    toolkit: list[Tool],
-    player: Player | None,
-    chat_history: ChatHistory
-) -> AgentExecutor:
-    """Create the agent given authenticated tools."""
-    agent_prompts = AgentPrompts.build(player, chat_history=chat_history)
+@cache
+def get_agent_executor(registered: bool) -> AgentExecutor:
+    """
+    Create the agent for registered or unregistered players. Built once per process
+    and reused, as the tools and prompt templates don't change between messages.
+    """
+    toolkit = PLAYER_TOOLS if registered else REGISTRATION_TOOLS
+    agent_prompts = AgentPrompts.templates(registered)
     agent = InternalThoughtZeroShotAgent.from_llm_and_tools(
-        llm=llm,
+        llm=get_llm(),
         tools=toolkit,
         prefix=agent_prompts.prefix,
         format_instructions=agent_prompts.format_instructions,
-        suffix=agent_prompts.suffix
+        suffix=agent_prompts.suffix,
+        input_variables=["input", "chat_history", "agent_scratchpad"]
     )
     return AgentExecutor(
         agent=agent,
@@ -37,21 +132,304 @@ def create_agent_executor(
     )
 
 
-def run_agent(query: str, player_phone: str) -> str:
-    """Run the agent."""
+def _response_key(
+    query: str, player: Player | None, venue: str
+) -> ResponseKey | None:
+    """
+    Cache key of a message, or None if it isn't cacheable. The sender's queue is only
+    looked up for cacheable messages.
+    """
+    if not cacheable_query(query):
+        return None
+
+    queue = PlayerQueue.for_player(player) if player else None
+    return response_key(query, player, venue, queue)
+
+
+async def _aresponse_key(
+    query: str, player: Player | None, venue: str
+) -> ResponseKey | None:
+    """Async version of `_response_key`."""
+    if not cacheable_query(query):
+        return None
+
+    queue = await PlayerQueue.afor_player(player) if player else None
+    return response_key(query, player, venue, queue)
+
+
+def _cached_reply(key: ResponseKey | None) -> AgentReply | None:
+    """The cached reply to a message with the given key, if any."""
+    if key is None or (response := cached_response(key)) is None:
+        return None
+
+    return AgentReply(response=response, route=Route.CACHED)
+
+
+def _prompt_history(key: ResponseKey | None, chat_history: ChatHistory) -> ChatHistory:
+    """
+    The history to prompt the agent with. Cacheable messages are answered without
+    it, as their reply may be sent to other players.
+    """
+    if key is None:
+        return chat_history
+
+    return ChatHistory(phone_number=chat_history.phone_number, messages=[])
+
+
+def _cache_reply(
+    key: ResponseKey | None, reply: AgentReply, turn: Turn, version: int
+) -> None:
+    """Cache the agent's reply, if everyone asking would get the same one."""
+    if key is not None:
+        cache_response(key, reply.response, turn.tools, version)
+
+
+def _summarize(chat_history: ChatHistory) -> None:
+    """Fold older messages into the history's summary, logging any failure."""
     try:
-        player = Player.from_phone(player_phone)
-        tools = create_tools(player)
-    except PlayerNotFoundError:
-        tools = [create_registration_tool(player_phone)]
-        player = None
+        summarize_history(chat_history, get_llm().predict)
+    except Exception:
+        logger.exception(
+            "Summarizing %s's history failed", redact_phone(chat_history.phone_number)
+        )
+
+
+async def _asummarize(chat_history: ChatHistory) -> None:
+    """Async version of `_summarize`."""
+    try:
+        await asummarize_history(chat_history, get_llm().apredict)
+    except Exception:
+        logger.exception(
+            "Summarizing %s's history failed", redact_phone(chat_history.phone_number)
+        )
+
+
+def _summarize_later(chat_history: ChatHistory) -> None:
+    """
+    Summarize older messages on a background thread if they're due, so the LLM call
+    isn't part of the reply. Until then they stay in the prompt verbatim.
+    """
+    if messages_to_summarize(chat_history):
+        _SUMMARY_EXECUTOR.submit(_summarize, chat_history)
+
+
+def _asummarize_later(chat_history: ChatHistory) -> None:
+    """Async version of `_summarize_later`, summarizing on a background task."""
+    if messages_to_summarize(chat_history):
+        task = asyncio.create_task(_asummarize(chat_history))
+        _summary_tasks.add(task)
+        task.add_done_callback(_summary_tasks.discard)
+
+
+def respond(query: str, player_phone: str, venue: str = DEFAULT_VENUE) -> AgentReply:
+    """
+    Answer a message sent from a venue. Registered players' messages that match a
+    known command are handled directly by its tool, repeats of read-only questions
+    are answered from the response cache, and everything else goes through the
+    agent. The turn is traced, see `pool_queue.telemetry`.
+    """
+    with telemetry.turn(player_phone) as turn:
+        try:
+            player = Player.from_phone(player_phone)
+        except PlayerNotFoundError:
+            player = None
+
+        intent = intent_for(query, player, venue) if player else None
+        chat_history = ChatHistory.from_phone(player_phone)
+
+        with acting_as(player_phone, player, venue):
+            if intent:
+                reply = AgentReply(
+                    response=handle_intent(intent, callbacks=turn.callbacks),
+                    route=Route.FAST_PATH,
+                    intent=intent
+                )
+            else:
+                key = _response_key(query, player, venue)
+                reply = _cached_reply(key)
+
+            if reply is None:
+                version = EVENT_BUS.version
+                agent_prompts = AgentPrompts.build(
+                    player, chat_history=_prompt_history(key, chat_history)
+                )
+                agent_executor = get_agent_executor(registered=player is not None)
+                reply = AgentReply(
+                    response=agent_executor.run(
+                        input=query,
+                        chat_history=agent_prompts.chat_history,
+                        callbacks=turn.callbacks
+                    ),
+                    route=Route.AGENT
+                )
+                _cache_reply(key, reply, turn, version)
+
+        turn.route = reply.route.value
+        logger.info(
+            "Answered %s via %s (intent: %s)",
+            redact_phone(player_phone),
+            reply.route.value,
+            reply.intent.value if reply.intent else None
+        )
+
+        # Add the query and response to the chat history
+        chat_history.extend(
+            [
+                Message(phone_number=player_phone, content=query, sender="user"),
+                Message(
+                    phone_number=player_phone, content=reply.response, sender="agent"
+                )
+            ]
+        )
+
+    _summarize_later(chat_history)
+    return reply
+
+
+async def arespond(
+    query: str, player_phone: str, venue: str = DEFAULT_VENUE
+) -> AgentReply:
+    """
+    Async version of `respond`. Database access and LLM calls are awaited, so many
+    conversations can be served concurrently on one event loop.
+    """
+    with telemetry.turn(player_phone) as turn:
+        try:
+            player = await Player.afrom_phone(player_phone)
+        except PlayerNotFoundError:
+            player = None
+
+        intent = await aintent_for(query, player, venue) if player else None
+        chat_history = await ChatHistory.afrom_phone(player_phone)
+
+        with acting_as(player_phone, player, venue):
+            if intent:
+                reply = AgentReply(
+                    response=await ahandle_intent(intent, callbacks=turn.callbacks),
+                    route=Route.FAST_PATH,
+                    intent=intent
+                )
+            else:
+                key = await _aresponse_key(query, player, venue)
+                reply = _cached_reply(key)
+
+            if reply is None:
+                version = EVENT_BUS.version
+                agent_prompts = AgentPrompts.build(
+                    player, chat_history=_prompt_history(key, chat_history)
+                )
+                agent_executor = get_agent_executor(registered=player is not None)
+                reply = AgentReply(
+                    response=await agent_executor.arun(
+                        input=query,
+                        chat_history=agent_prompts.chat_history,
+                        callbacks=turn.callbacks
+                    ),
+                    route=Route.AGENT
+                )
+                _cache_reply(key, reply, turn, version)
+
+        turn.route = reply.route.value
+        logger.info(
+            "Answered %s via %s (intent: %s)",
+            redact_phone(player_phone),
+            reply.route.value,
+            reply.intent.value if reply.intent else None
+        )
+
+        await chat_history.aextend(
+            [
+                Message(phone_number=player_phone, content=query, sender="user"),
+                Message(
+                    phone_number=player_phone, content=reply.response, sender="agent"
+                )
+            ]
+        )
+
+    _asummarize_later(chat_history)
+    return reply
+
+
+def _acknowledge(query: str, player_phone: str, venue: str) -> None:
+    """Text the sender a short acknowledgment of their message, logging any failure."""
+    try:
+        try:
+            player = Player.from_phone(player_phone)
+        except PlayerNotFoundError:
+            player = None
+
+        send_sms(player_phone, acknowledgment(query, player, venue))
+    except Exception:
+        logger.exception("Acknowledging %s failed", redact_phone(player_phone))
+
+
+async def _aacknowledge(query: str, player_phone: str, venue: str) -> None:
+    """Async version of `_acknowledge`."""
+    try:
+        try:
+            player = await Player.afrom_phone(player_phone)
+        except PlayerNotFoundError:
+            player = None
+
+        await asend_sms(player_phone, await aacknowledgment(query, player, venue))
+    except Exception:
+        logger.exception("Acknowledging %s failed", redact_phone(player_phone))
+
+
+def run_agent(
+    query: str,
+    player_phone: str,
+    venue: str = DEFAULT_VENUE,
+    two_phase: bool = False
+) -> str:
+    """
+    Run the agent. If `two_phase` is True, the reply is also texted to the sender
+    through the outbound sender (see `pool_queue.sms`), and if it isn't ready within
+    ACK_AFTER seconds, a short acknowledgment is texted first while the turn finishes.
+    The turn runs on the calling thread, so callers bound how many run at once.
+    """
+    if not two_phase:
+        return respond(query, player_phone, venue).response
+
+    # Held while acknowledging, so the acknowledgment is never texted after the reply
+    acknowledging = Lock()
+    answered = Event()
+
+    def acknowledge() -> None:
+        with acknowledging:
+            if not answered.is_set():
+                _acknowledge(query, player_phone, venue)
+
+    timer = Timer(ACK_AFTER, acknowledge)
+    timer.daemon = True
+    timer.start()
+
+    try:
+        reply = respond(query, player_phone, venue)
+    finally:
+        timer.cancel()
+        with acknowledging:
+            answered.set()
+
+    send_sms(player_phone, reply.response)
+    return reply.response
+
 
-    chat_history = ChatHistory.from_phone(player_phone)
-    agent_executor = create_agent_executor(tools, player, chat_history)
-    response = agent_executor.run(query)
+async def arun_agent(
+    query: str,
+    player_phone: str,
+    venue: str = DEFAULT_VENUE,
+    two_phase: bool = False
+) -> str:
+    """Async version of `run_agent`."""
+    if not two_phase:
+        return (await arespond(query, player_phone, venue)).response
 
-    # Add the query and response to the chat history
-    chat_history.add(Message(phone_number=player_phone, content=query, sender="user"))
-    chat_history.add(Message(phone_number=player_phone, content=response, sender="agent"))
+    turn = asyncio.create_task(arespond(query, player_phone, venue))
+    done, _ = await asyncio.wait({turn}, timeout=ACK_AFTER)
+    if not done:
+        await _aacknowledge(query, player_phone, venue)
 
-    return response
+    reply = await turn
+    await asend_sms(player_phone, reply.response)
+    return reply.response
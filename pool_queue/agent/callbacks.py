@@ -0,0 +1,61 @@
+"""LangChain callbacks recording the agent's work on a turn, see pool_queue.telemetry."""
+from langchain.callbacks.base import BaseCallbackHandler
+
+from typing import Any
+from uuid import UUID
+import time
+
+from pool_queue.telemetry import LLM_SECONDS, TOOL_SECONDS, Turn
+
+
+class AgentTelemetry(BaseCallbackHandler):
+    """
+    Records a turn's LLM calls, tool runs and agent iterations. Passed explicitly as a
+    callback, as LangChain may call it from an executor thread outside the turn's
+    context.
+    """
+
+    def __init__(self, turn: Turn):
+        self.turn = turn
+        self._started: dict[UUID, tuple[float, str | None]] = {}
+
+    def on_llm_start(
+        self, serialized: dict, prompts: list[str], *, run_id: UUID, **kwargs
+    ):
+        self._started[run_id] = (time.perf_counter(), None)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._finish(run_id, error=type(error).__name__)
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs):
+        self._started[run_id] = (time.perf_counter(), serialized.get("name", ""))
+
+    def on_tool_end(self, output: str, *, run_id: UUID, **kwargs):
+        self._finish(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._finish(run_id, error=type(error).__name__)
+
+    def on_agent_action(self, action: Any, **kwargs):
+        self.turn.iterations += 1
+
+    def on_agent_finish(self, finish: Any, **kwargs):
+        self.turn.iterations += 1
+
+    def _finish(self, run_id: UUID, **attributes: str) -> None:
+        """Record the LLM call or tool run started as `run_id`."""
+        if (started := self._started.pop(run_id, None)) is None:
+            return
+
+        start, tool = started
+        seconds = time.perf_counter() - start
+
+        if tool is None:
+            LLM_SECONDS.observe(seconds)
+            self.turn.record("llm", seconds, **attributes)
+        else:
+            TOOL_SECONDS.observe(seconds, tool=tool)
+            self.turn.record("tool", seconds, tool=tool, **attributes)
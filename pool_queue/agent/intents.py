@@ -0,0 +1,258 @@
+"""
+Rule-based intent routing. The handful of commands that make up most traffic are
+recognized here and handled by calling their tool directly, skipping the LLM. Anything
+that doesn't match a rule exactly is left to the agent.
+"""
+from langchain.callbacks.base import BaseCallbackHandler
+from langchain.tools import BaseTool
+
+from enum import Enum
+import re
+
+from pool_queue.agent.tools import (
+    CheckPositionTool,
+    ConfirmInboundChallengerTool,
+    JoinQueueTool,
+    LeaveQueueTool,
+    LostMatchEndGameTool,
+    SeeFullQueueTool
+)
+from pool_queue.game import Game, GameNotFoundError, GameStatus
+from pool_queue.player import Player
+from pool_queue.player_queue import PlayerQueue
+
+
+class Intent(Enum):
+    """A command recognized without the agent."""
+    LOST_MATCH = "lost_match"
+    JOIN_QUEUE = "join_queue"
+    LEAVE_QUEUE = "leave_queue"
+    CHECK_POSITION = "check_position"
+    SEE_QUEUE = "see_queue"
+    CONFIRM_CHALLENGER = "confirm_challenger"
+
+
+# Each pattern must match the whole normalized message, see `normalize`. Patterns that
+# act on a game only match fixed phrases, as a near miss like "nobody is here" must go
+# to the agent rather than start a game.
+_LINE = r"(the )?(line|queue|list)"
+
+INTENT_PATTERNS: dict[Intent, re.Pattern] = {
+    Intent.LOST_MATCH: re.compile(
+        r"(i )?(just )?lost( (the |my )?(game|match))?( again)?"
+    ),
+    Intent.JOIN_QUEUE: re.compile(
+        rf"join( {_LINE})?|(add|put) me (in|on|to) {_LINE}|((can|could) i |i want to )"
+        rf"(join|get in) {_LINE}"
+    ),
+    Intent.LEAVE_QUEUE: re.compile(
+        rf"leave( {_LINE})?|(take|remove) me (off|out of|from) {_LINE}"
+    ),
+    Intent.CHECK_POSITION: re.compile(
+        rf"where am i( in {_LINE})?|my (position|spot)"
+        rf"|(whats|what is) my (position|spot|place)( in {_LINE})?"
+    ),
+    Intent.SEE_QUEUE: re.compile(
+        rf"(whos|who is) in {_LINE}|(show|see) (me )?(the )?(full )?(line|queue)"
+        rf"|(whos|who is) (next|up next)"
+    ),
+    Intent.CONFIRM_CHALLENGER: re.compile(
+        r"((the )?next (player|person|challenger)|(my )?challenger) "
+        r"(is here|has arrived|arrived)|(hes|shes|theyre) here"
+    )
+}
+
+# A challenger's arrival by name, ex. "john is here". It only confirms the challenger
+# if the name is theirs, see `intent_for`.
+NAMED_ARRIVAL = re.compile(
+    r"(?P<name>[a-z]+( [a-z]+){0,2}?) (is here|has arrived|arrived)"
+)
+
+INTENT_TOOLS: dict[Intent, BaseTool] = {
+    Intent.LOST_MATCH: LostMatchEndGameTool(),
+    Intent.JOIN_QUEUE: JoinQueueTool(),
+    Intent.LEAVE_QUEUE: LeaveQueueTool(),
+    Intent.CHECK_POSITION: CheckPositionTool(),
+    Intent.SEE_QUEUE: SeeFullQueueTool(),
+    Intent.CONFIRM_CHALLENGER: ConfirmInboundChallengerTool()
+}
+
+
+# Sent while a message matching the intent is answered, if the player's state lets it
+# go ahead, see `acknowledgment`
+INTENT_ACKS: dict[Intent, str] = {
+    Intent.LOST_MATCH: "Got it, ending the game...",
+    Intent.JOIN_QUEUE: "Got it, adding you to the queue...",
+    Intent.LEAVE_QUEUE: "Got it, taking you out of the queue...",
+    Intent.CHECK_POSITION: "Checking your spot in the queue...",
+    Intent.SEE_QUEUE: "Checking the queue...",
+    Intent.CONFIRM_CHALLENGER: "Got it, starting the game..."
+}
+DEFAULT_ACK = "On it..."
+REGISTRATION_ACK = "Got it, one moment while I get you set up..."
+
+
+def normalize(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    query = re.sub(r"[^a-z0-9\s]", "", query.lower())
+    return " ".join(query.split())
+
+
+def match_intent(query: str) -> Intent | None:
+    """The intent the query unambiguously expresses, or None to defer to the agent."""
+    query = normalize(query)
+    matches = [
+        intent for intent, pattern in INTENT_PATTERNS.items() if pattern.fullmatch(query)
+    ]
+
+    # Only act when exactly one rule matches
+    return matches[0] if len(matches) == 1 else None
+
+
+# Intents whose acknowledgment depends on the player's queue or game
+_QUEUE_INTENTS = {Intent.JOIN_QUEUE, Intent.LEAVE_QUEUE}
+_GAME_INTENTS = {Intent.LOST_MATCH, Intent.CONFIRM_CHALLENGER}
+
+
+def _can_act(
+    intent: Intent, player: Player, queue: PlayerQueue | None, game: Game | None
+) -> bool:
+    """
+    Whether the intent's action can go ahead for a player in `queue` and `game`, each
+    None if they aren't in one. Only the state the intent depends on is given.
+    """
+    if intent is Intent.JOIN_QUEUE:
+        return queue is None
+    if intent is Intent.LEAVE_QUEUE:
+        return queue is not None
+    if intent is Intent.LOST_MATCH:
+        return game is not None and game.status is GameStatus.IN_PROGRESS
+    if intent is Intent.CONFIRM_CHALLENGER:
+        return (
+            game is not None
+            and game.status is GameStatus.PENDING_CHALLENGER
+            and game.king.phone_number == player.phone_number
+        )
+
+    return True
+
+
+def _acknowledgment(
+    intent: Intent | None, player: Player, queue: PlayerQueue | None, game: Game | None
+) -> str:
+    """The acknowledgment of a registered player's message matching `intent`."""
+    if intent is None or not _can_act(intent, player, queue, game):
+        return DEFAULT_ACK
+
+    return INTENT_ACKS[intent]
+
+
+def _names_challenger(query: str, player: Player, game: Game) -> bool:
+    """
+    Whether the query announces the arrival, by full or first name, of the challenger
+    in a pending game the player is king of.
+    """
+    if (arrival := NAMED_ARRIVAL.fullmatch(normalize(query))) is None:
+        return False
+
+    challenger = normalize(game.challenger.name)
+    return (
+        game.status is GameStatus.PENDING_CHALLENGER
+        and game.king.phone_number == player.phone_number
+        and arrival["name"] in (challenger, challenger.split(" ")[0])
+    )
+
+
+def intent_for(query: str, player: Player, venue: str) -> Intent | None:
+    """
+    The intent of a registered player's message at a venue, or None to defer to the
+    agent. Besides the rules of `match_intent`, "<name> is here" confirms the player's
+    challenger if it's their name, which needs the player's game, so the game is only
+    loaded for messages of that form.
+    """
+    if intent := match_intent(query):
+        return intent
+
+    if not NAMED_ARRIVAL.fullmatch(normalize(query)):
+        return None
+
+    try:
+        game = Game.for_player(player, venue)
+    except GameNotFoundError:
+        return None
+
+    return Intent.CONFIRM_CHALLENGER if _names_challenger(query, player, game) else None
+
+
+async def aintent_for(query: str, player: Player, venue: str) -> Intent | None:
+    """Async version of `intent_for`."""
+    if intent := match_intent(query):
+        return intent
+
+    if not NAMED_ARRIVAL.fullmatch(normalize(query)):
+        return None
+
+    try:
+        game = await Game.afor_player(player, venue)
+    except GameNotFoundError:
+        return None
+
+    return Intent.CONFIRM_CHALLENGER if _names_challenger(query, player, game) else None
+
+
+def acknowledgment(query: str, player: Player | None, venue: str) -> str:
+    """
+    A short reply to send while a message from `player` (None if unregistered) is
+    answered. Messages are only acknowledged as a command if they match it exactly,
+    see `match_intent`, and commands that act only if the player's queue or game
+    lets them go ahead. Anything else gets DEFAULT_ACK.
+    """
+    if player is None:
+        return REGISTRATION_ACK
+
+    intent = match_intent(query)
+    queue = PlayerQueue.for_player(player) if intent in _QUEUE_INTENTS else None
+
+    game = None
+    if intent in _GAME_INTENTS:
+        try:
+            game = Game.for_player(player, venue)
+        except GameNotFoundError:
+            pass
+
+    return _acknowledgment(intent, player, queue, game)
+
+
+async def aacknowledgment(query: str, player: Player | None, venue: str) -> str:
+    """Async version of `acknowledgment`."""
+    if player is None:
+        return REGISTRATION_ACK
+
+    intent = match_intent(query)
+    queue = await PlayerQueue.afor_player(player) if intent in _QUEUE_INTENTS else None
+
+    game = None
+    if intent in _GAME_INTENTS:
+        try:
+            game = await Game.afor_player(player, venue)
+        except GameNotFoundError:
+            pass
+
+    return _acknowledgment(intent, player, queue, game)
+
+
+def handle_intent(
+    intent: Intent, callbacks: list[BaseCallbackHandler] | None = None
+) -> str:
+    """
+    Run the intent's tool for the player the tools are acting for (see
+    `pool_queue.agent.tools.acting_as`) and return the reply.
+    """
+    return INTENT_TOOLS[intent].run("n/a", callbacks=callbacks)
+
+
+async def ahandle_intent(
+    intent: Intent, callbacks: list[BaseCallbackHandler] | None = None
+) -> str:
+    """Async version of `handle_intent`."""
+    return await INTENT_TOOLS[intent].arun("n/a", callbacks=callbacks)
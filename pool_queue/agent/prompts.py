@@ -1,6 +1,25 @@
-"""Building prompts for the agent."""
+"""Building prompts for the agent, and summarizing the chat history they include."""
+from typing import Awaitable, Callable
+
 from pool_queue.player import Player
-from pool_queue.agent.history import ChatHistory
+from pool_queue.history import ChatHistory, Message
+
+
+# Most tokens of chat history, including its summary, put in a prompt
+HISTORY_TOKEN_BUDGET = 600
+
+# Most recent messages put in a prompt verbatim, the rest are summarized. Kept well
+# under HISTORY_WINDOW so messages are summarized before they leave the loaded window.
+MAX_VERBATIM_MESSAGES = 12
+
+# Older messages are folded into the summary once at least this many are waiting.
+# Until then they stay in the prompt verbatim.
+SUMMARY_BATCH_SIZE = 6
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of English text, about four characters per token."""
+    return len(text) // 4 + 1
 
 
 prefix = lambda: """
@@ -85,38 +104,180 @@ Note that I will only receive your "Final Answer" so if there's any information
 If you are responding with a "Thought", you must ALWAYS include either an "Action" or "Final Answer" with it. You may not respond with only a "Thought". You can never have both an "Action" and a "Final Answer". Each "Action" requires an "Action Input", even if the "Action Input" is "n/a".
 """
 
-suffix = lambda chat_history: f"""
+suffix = lambda: """
 Below is your chat history with the user who has messaged you.
 
 === Chat History ===
 {chat_history}
 === End Chat History ===
 
-Input: {{input}}
-{{agent_scratchpad}}
+Input: {input}
+{agent_scratchpad}
+"""
+
+summary_prompt = lambda summary, transcript: f"""
+You are maintaining a running summary of a text conversation between a user and Pool Queue,
+a system for queueing at a pool hall practice table. Update the summary with the new messages.
+Keep only what would help answer the user's future messages (their name, requests, games,
+queue activity, open questions), in at most 80 words. Respond with only the updated summary.
+
+=== Current Summary ===
+{summary or "(none)"}
+=== End Current Summary ===
+
+=== New Messages ===
+{transcript}
+=== End New Messages ===
 """
 
 
 class AgentPrompts:
-    """Building prompts for the agent."""
-    def __init__(self, prefix: str, format_instructions: str, suffix: str) -> None:
+    """
+    Building prompts for the agent. The prefix, format instructions and suffix are
+    templates that don't change between messages, so the agent is built from them
+    once. The chat history is rendered per message and fills the suffix's
+    {chat_history} variable.
+    """
+    def __init__(
+        self,
+        prefix: str,
+        format_instructions: str,
+        suffix: str,
+        chat_history: str = ""
+    ) -> None:
         self.prefix = prefix
         self.format_instructions = format_instructions
         self.suffix = suffix
+        self.chat_history = chat_history
 
     @classmethod
-    def build(cls, player: Player | None, chat_history: ChatHistory) -> "AgentPrompts":
-        """Build the prompts."""
-        if not player:
-            return cls(
-                prefix=registration_prefix(),
-                format_instructions=format_instructions(),
-                suffix=suffix(chat_history.as_string())
-            )
-        
+    def templates(cls, registered: bool) -> "AgentPrompts":
+        """The prompt templates for registered or unregistered players."""
         return cls(
-            prefix=prefix(),
+            prefix=prefix() if registered else registration_prefix(),
             format_instructions=format_instructions(),
-            suffix=suffix(chat_history.as_string())
+            suffix=suffix()
+        )
+
+    @staticmethod
+    def _split_history(
+        chat_history: ChatHistory,
+        token_budget: int
+    ) -> tuple[list[Message], list[Message]]:
+        """
+        Split the history into older messages not yet in the summary, and the most
+        recent messages that fit in the token budget verbatim alongside the summary.
+        """
+        budget = token_budget - estimate_tokens(chat_history.summary)
+        recent: list[Message] = []
+        for message in reversed(chat_history.messages):
+            budget -= estimate_tokens(chat_history.as_string([message]))
+            if budget < 0 or len(recent) == MAX_VERBATIM_MESSAGES:
+                break
+            recent.insert(0, message)
+
+        older = chat_history.messages[:len(chat_history.messages) - len(recent)]
+        return chat_history.unsummarized(older), recent
+
+    @classmethod
+    def _fit_history(
+        cls, chat_history: ChatHistory, messages: list[Message], token_budget: int
+    ) -> list[Message]:
+        """
+        The newest of the given messages that fit in the token budget alongside the
+        summary, dropping the oldest first. If even the newest doesn't fit, it's cut
+        short to fit.
+        """
+        budget = token_budget - estimate_tokens(cls._render_history(chat_history, []))
+        fitted: list[Message] = []
+        for message in reversed(messages):
+            tokens = estimate_tokens(chat_history.as_string([message]))
+            if tokens <= budget:
+                budget -= tokens
+                fitted.insert(0, message)
+                continue
+
+            # About four characters per token, leaving room for the sender and the cut
+            chars = (budget - 1) * 4 - len(f"{message.sender}: ...")
+            if not fitted and chars > 0:
+                content = message.content[:chars] + "..."
+                fitted.append(message.model_copy(update={"content": content}))
+            break
+
+        return fitted
+
+    @staticmethod
+    def _render_history(chat_history: ChatHistory, messages: list[Message]) -> str:
+        """The summary, if any, followed by the given messages verbatim."""
+        if not chat_history.summary:
+            return chat_history.as_string(messages)
+
+        return (
+            f"(Summary of earlier messages: {chat_history.summary})\n"
+            f"{chat_history.as_string(messages)}"
         )
-        
\ No newline at end of file
+
+    @classmethod
+    def build(
+        cls,
+        player: Player | None,
+        chat_history: ChatHistory,
+        token_budget: int = HISTORY_TOKEN_BUDGET
+    ) -> "AgentPrompts":
+        """
+        Build the prompts. The chat history is kept within `token_budget`: recent
+        messages are included verbatim and older ones through the history's stored
+        summary. Older messages that aren't in the summary yet are kept verbatim too,
+        while they fit, see `summarize_history`. Whatever doesn't fit in the budget
+        is dropped, oldest first.
+        """
+        agent_prompts = cls.templates(registered=player is not None)
+        unsummarized, recent = cls._split_history(chat_history, token_budget)
+        messages = cls._fit_history(chat_history, unsummarized + recent, token_budget)
+        agent_prompts.chat_history = cls._render_history(chat_history, messages)
+        return agent_prompts
+
+
+def messages_to_summarize(
+    chat_history: ChatHistory, token_budget: int = HISTORY_TOKEN_BUDGET
+) -> list[Message]:
+    """
+    Older messages due to be folded into the history's summary: those that no longer
+    fit in the prompt verbatim, once at least SUMMARY_BATCH_SIZE are waiting.
+    """
+    unsummarized, _ = AgentPrompts._split_history(chat_history, token_budget)
+    return unsummarized if len(unsummarized) >= SUMMARY_BATCH_SIZE else []
+
+
+def summarize_history(
+    chat_history: ChatHistory,
+    summarize: Callable[[str], str],
+    token_budget: int = HISTORY_TOKEN_BUDGET
+) -> None:
+    """
+    Fold the older messages due to be summarized into the history's stored summary,
+    with `summarize`, which completes a prompt. Run after replying, as it's a full
+    LLM call.
+    """
+    if not (older := messages_to_summarize(chat_history, token_budget)):
+        return
+
+    summary = summarize(
+        summary_prompt(chat_history.summary, chat_history.as_string(older))
+    )
+    chat_history.save_summary(summary.strip(), through=older[-1].seq)
+
+
+async def asummarize_history(
+    chat_history: ChatHistory,
+    summarize: Callable[[str], Awaitable[str]],
+    token_budget: int = HISTORY_TOKEN_BUDGET
+) -> None:
+    """Async version of `summarize_history`."""
+    if not (older := messages_to_summarize(chat_history, token_budget)):
+        return
+
+    summary = await summarize(
+        summary_prompt(chat_history.summary, chat_history.as_string(older))
+    )
+    await chat_history.asave_summary(summary.strip(), through=older[-1].seq)
@@ -0,0 +1,73 @@
+"""
+Cache of agent replies to questions everyone asking would get the same answer to, ex.
+how long the line is or how the queue works. Replies are keyed on the normalized
+question and who's asking (registered or not, and which queue they're in), so a repeat
+question is answered without the agent.
+
+Other players must never see the asker's chat history, so cacheable questions are
+answered without it. Replies that used tools are only cached if the tools are shared
+and read-only, and only until the version of queue and game state changes. The
+version only tracks every process's mutations while change streams feed the event
+bus, so without them only replies that used no tools are cached. Entries expire soon
+either way, in case the stream falls behind.
+"""
+from pool_queue.agent.intents import normalize
+from pool_queue.cache import MISSING, TTLCache
+from pool_queue.events import EVENT_BUS
+from pool_queue.player import Player
+from pool_queue.player_queue import PlayerQueue
+
+
+# Cached replies, with the state version they were answered in, or None if they don't
+# depend on state
+RESPONSE_CACHE = TTLCache(max_size=1024, ttl=60, name="responses")
+
+# Read-only tools whose output is the same for everyone with the same key. A reply
+# that used tools is only cached if it used these, and no others.
+SHARED_TOOLS = {"See Full Queue"}
+
+# Shorter messages, ex. "yes", depend on the conversation so they're never cached
+MIN_CACHED_WORDS = 3
+
+ResponseKey = tuple[str, bool, str | None, str]
+
+
+def cacheable_query(query: str) -> bool:
+    """Whether a message could be answered from the cache, see MIN_CACHED_WORDS."""
+    return len(normalize(query).split()) >= MIN_CACHED_WORDS
+
+
+def response_key(
+    query: str, player: Player | None, venue: str, queue: PlayerQueue | None
+) -> ResponseKey:
+    """
+    Cache key of a cacheable message from `player` (None if unregistered) in `queue`
+    (None if not in one) at a venue.
+    """
+    table = queue.table.id if queue else None
+    return venue, player is not None, table, normalize(query)
+
+
+def cached_response(key: ResponseKey) -> str | None:
+    """The cached reply to a message with `key`, unless the state changed since."""
+    if (entry := RESPONSE_CACHE.get(key)) is MISSING:
+        return None
+
+    response, version = entry
+    if version is not None and version != EVENT_BUS.version:
+        return None
+
+    return response
+
+
+def cache_response(
+    key: ResponseKey, response: str, tools: set[str], version: int
+) -> None:
+    """
+    Cache the reply to a message with `key`, produced using `tools` from the state at
+    `version`, if everyone asking would get the same reply.
+    """
+    if not tools:
+        RESPONSE_CACHE.set(key, (response, None))
+    elif tools <= SHARED_TOOLS and not EVENT_BUS.local:
+        RESPONSE_CACHE.set(key, (response, version))
@@ -1,34 +1,229 @@
-"""All tools for the users to use with the agent."""
+"""
+All tools for the users to use with the agent. Tools are built once per process and act
+for the player whose message is being handled, set per message with `acting_as`.
+"""
 from langchain.tools import BaseTool
 
+from contextlib import contextmanager
+from contextvars import ContextVar
 from threading import Thread
 
-from pool_queue.player import Player, PlayerNotFoundError
-from pool_queue.game import Game, GameNotFoundError, GameStatus
+from pool_queue.player import Player, PlayerAlreadyRegisteredError, PlayerNotFoundError
+from pool_queue.game import (
+    CHALLENGER_ARRIVAL_WINDOW,
+    Game,
+    GameNotFoundError,
+    GameStatus,
+    LiveGameExistsError
+)
 from pool_queue.player_queue import PlayerQueue
+from pool_queue.table import DEFAULT_TABLE, DEFAULT_VENUE, Table
+from pool_queue.table.stats import TableStats
+from pool_queue.timers import acall_next_challenger, call_next_challenger
 
 
-def create_registration_tool(player_phone: str) -> BaseTool:
-    """Create the registration tool for the agent to use."""
+# Who the tools are acting for while a message is being handled, and where
+CURRENT_PHONE: ContextVar[str] = ContextVar("current_phone")
+CURRENT_PLAYER: ContextVar[Player | None] = ContextVar("current_player")
+CURRENT_VENUE: ContextVar[str] = ContextVar("current_venue", default=DEFAULT_VENUE)
 
-    class RegisterPlayerTool(BaseTool):
-        """Register a player with the agent."""
-        name = "Register Player"
-        description = (
-            "Register a new player with the system. Input must be simply the full name of "
-            "the player. If the full name is not provided, ask the user for the full name. "
-            "Provide the full name with proper capitalization, even if it wasn't provided "
-            "that way. Ex. if user provides 'john doe', you should register 'John Doe'."
+
+@contextmanager
+def acting_as(player_phone: str, player: Player | None, venue: str = DEFAULT_VENUE):
+    """
+    Have the tools act for a player (or, if unregistered, a phone number) at a venue
+    within the block.
+    """
+    phone_token = CURRENT_PHONE.set(player_phone)
+    player_token = CURRENT_PLAYER.set(player)
+    venue_token = CURRENT_VENUE.set(venue)
+
+    try:
+        yield
+    finally:
+        CURRENT_VENUE.reset(venue_token)
+        CURRENT_PLAYER.reset(player_token)
+        CURRENT_PHONE.reset(phone_token)
+
+
+def _queue_name(table: Table) -> str:
+    """
+    How to refer to a table's queue, naming the table unless it's the default table
+    of a deployment with no venues.
+    """
+    if table == DEFAULT_TABLE:
+        return "the queue"
+
+    return f"the table {table.table} queue"
+
+
+def _arrival_minutes() -> int:
+    """Minutes a called challenger has to arrive, see `pool_queue.timers`."""
+    return int(CHALLENGER_ARRIVAL_WINDOW.total_seconds() // 60)
+
+
+def _wait_estimate(position: int, stats: TableStats, game: Game | None) -> str:
+    """Roughly how long until the player at `position` is called to the table."""
+    minutes = round(stats.eta(position, game).total_seconds() / 60)
+    if minutes < 1:
+        return "any minute now"
+
+    return f"in about {minutes} minute{'s' if minutes != 1 else ''}"
+
+
+def _format_queue(table: Table, queue: list[Player]) -> str:
+    """A table's queue as a numbered list of names."""
+    if not queue:
+        return f"{_queue_name(table).capitalize()} is empty."
+
+    queue_str = "\n".join([f"{i}. {p.name}" for i, p in enumerate(queue, 1)])
+    return f"{_queue_name(table).capitalize()}:\n{queue_str}"
+
+
+def _sorted_tables(tables: list[Table]) -> list[Table]:
+    """Tables in the order their queues are listed."""
+    return sorted(tables, key=lambda table: table.table)
+
+
+# Replies shared by the sync and async versions of each tool
+NAME_MISSING = "Player name must be provided."
+ALREADY_REGISTERED = "Player is already registered."
+REGISTERED = "Player has been registered."
+
+NOBODY_PLAYING = (
+    "Looks like nobody's playing right now, so you can head to the "
+    "table and start a match. Let me know that you're starting, "
+    "and give me your opponent's phone number so we can get the "
+    "queue going. On the other hand, if this is an error and there "
+    "is a game going on, have one of the players text me to start "
+    "a match, with the phone number of the opponent they're currently "
+    "playing. Then, you can join the queue, and the loser of their "
+    "match can tell me he/she lost to automatically call you to the "
+    "table."
+)
+NOT_IN_QUEUE = "You're not in the queue."
+WERENT_IN_QUEUE = "You weren't in the queue."
+
+NO_FREE_TABLE = (
+    "Game already exists, cannot use this tool. "
+    "End the last active game by having the loser declare themselves."
+)
+GAME_EXISTS = "Game already exists, cannot use this tool."
+OPPONENT_UNREGISTERED = (
+    "Opponent has not registered. Have them text me to register first."
+)
+
+NOT_IN_GAME = (
+    "You're not in a game right now. To start one, tell me you're starting "
+    "a game and give me your opponent's phone number."
+)
+NO_CHALLENGER = (
+    "You don't have a challenger on the way. Only the winner of the last "
+    "game can confirm the next player has arrived."
+)
+
+
+def _already_queued(queue: PlayerQueue, position: int) -> str:
+    """Reply to a player joining a queue they're already in."""
+    return f"You're already in {_queue_name(queue.table)}, position {position}."
+
+
+def _joined(queue: PlayerQueue, position: int) -> str:
+    """Reply to a player joining a queue."""
+    return f"You've joined {_queue_name(queue.table)}, position {position}."
+
+
+def _position(
+    queue: PlayerQueue, position: int, stats: TableStats, game: Game | None
+) -> str:
+    """A player's position in their queue, with roughly how long until they're up."""
+    return (
+        f"You're in position {position} in {_queue_name(queue.table)}, "
+        f"likely up {_wait_estimate(position, stats, game)}."
+    )
+
+
+def _free_table(tables: list[Table], live_tables: list[Table]) -> Table | None:
+    """The first of the venue's tables that nobody is playing on."""
+    return next((table for table in tables if table not in live_tables), None)
+
+
+def _game_created(game: Game) -> str:
+    """Reply to a player starting a game."""
+    return (
+        f"Game created. King: {game.king.name}, Challenger: "
+        f"{game.challenger.name}"
+    )
+
+
+def _winner(game: Game, loser: Player) -> Player:
+    """The winner of a game the player lost."""
+    return game.challenger if game.king == loser else game.king
+
+
+def _game_ended(winner: Player, next_challenger: Player | None) -> str:
+    """Reply to a player ending a game, calling `next_challenger` if there is one."""
+    if next_challenger is None:
+        return (
+            "Game ended. No players in queue to challenge the winner, "
+            "feel free to play again."
         )
 
-        def _run(self, name: str):
-            if "n/a" in name:  # sometimes agent will mess up
-                return "Player name must be provided."
+    return (
+        f"Game ended. The next player in the queue, {next_challenger.name}, "
+        f"has {_arrival_minutes()} minutes to come to the table and be "
+        f"confirmed by {winner.name}. They can say '{next_challenger.name} is "
+        "here' or 'next player is here' etc."
+    )
+
+
+def _game_ended_race(next_challenger: Player) -> str:
+    """Reply when the next game couldn't be created, as one was started meanwhile."""
+    return (
+        "Game ended, but another game was started in the meantime. "
+        f"{next_challenger.name} is still next in the queue."
+    )
+
+
+def _confirmed(game: Game) -> str:
+    """Reply to a king confirming their challenger arrived."""
+    return (
+        f"Confirmed. The game has begun between {game.king.name} and "
+        f"{game.challenger.name}. Good luck."
+    )
+
 
-            Player.register(name=name, phone_number=player_phone)
-            return "Player has been registered."
+class RegisterPlayerTool(BaseTool):
+    """Register a player with the agent."""
+    name = "Register Player"
+    description = (
+        "Register a new player with the system. Input must be simply the full name of "
+        "the player. If the full name is not provided, ask the user for the full name. "
+        "Provide the full name with proper capitalization, even if it wasn't provided "
+        "that way. Ex. if user provides 'john doe', you should register 'John Doe'."
+    )
 
-    return RegisterPlayerTool()
+    def _run(self, name: str):
+        if "n/a" in name:  # sometimes agent will mess up
+            return NAME_MISSING
+
+        try:
+            Player.register(name=name, phone_number=CURRENT_PHONE.get())
+        except PlayerAlreadyRegisteredError:
+            return ALREADY_REGISTERED
+
+        return REGISTERED
+
+    async def _arun(self, name: str):
+        if "n/a" in name:  # sometimes agent will mess up
+            return NAME_MISSING
+
+        try:
+            await Player.aregister(name=name, phone_number=CURRENT_PHONE.get())
+        except PlayerAlreadyRegisteredError:
+            return ALREADY_REGISTERED
+
+        return REGISTERED
 
 
 # Necessary tools:
@@ -41,188 +236,309 @@ def create_registration_tool(player_phone: str) -> BaseTool:
 # - confirm inbound challenger
 
 
-def create_tools(player: Player) -> list[BaseTool]:
-    """
-    Create the tools for the agent to use. Returns a list of tools.
+class JoinQueueTool(BaseTool):
+    """Join the queue."""
+    name = "Join Queue"
+    description = "Join the queue to play a game. Takes no input, so input n/a."
 
-    The player queue can be daily cleared here because tools are built for every
-    inbound request.
-    """
-    player_queue = PlayerQueue()
-    player_queue.daily_clear()
-
-    class JoinQueueTool(BaseTool):
-        """Join the queue."""
-        name = "Join Queue"
-        description = "Join the queue to play a game. Takes no input, so input n/a."
-
-        def _run(self, query: str):
-            # If there is no active game, they need to start one, not join the queue
-            try: 
-                Game.from_only_active()
-            except GameNotFoundError:
-                return (
-                    "Looks like nobody's playing right now, so you can head to the "
-                    "table and start a match. Let me know that you're starting, "
-                    "and give me your opponent's phone number so we can get the "
-                    "queue going. On the other hand, if this is an error and there "
-                    "is a game going on, have one of the players text me to start "
-                    "a match, with the phone number of the opponent they're currently "
-                    "playing. Then, you can join the queue, and the loser of their "
-                    "match can tell me he/she lost to automatically call you to the "
-                    "table."
-                )
-
-            if not player_queue.add(player):
-                return (
-                    "Player is already in the queue, position "
-                    f"{player_queue.get_position(player)}"
-                )
-
-            return f"Player added to queue, position {player_queue.get_position(player)}."
-
-    class LeaveQueueTool(BaseTool):
-        """Leave the queue."""
-        name = "Leave Queue"
-        description = "Leave the queue. Takes no input, so input n/a."
-
-        def _run(self, query: str):
-            if not player_queue.remove(player):
-                return "Player was not in the queue."
-
-            return "Player removed from queue."
-
-    class CheckPositionTool(BaseTool):
-        """Check position in queue."""
-        name = "Check Position"
-        description = "Check position in queue. Takes no input, so input n/a."
-
-        def _run(self, query: str):
-            position = player_queue.get_position(player)
-            if position == -1:
-                return "Player is not in the queue."
-
-            return f"Player is in position {position}."
-        
-    class SeeFullQueueTool(BaseTool):
-        """See the full queue."""
-        name = "See Full Queue"
-        description = (
-            "See the names of all players in order in the queue. "
-            "Takes no input, so input n/a."
+    def _run(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        if queue := PlayerQueue.for_player(player):
+            return _already_queued(queue, queue.get_position(player))
+
+        # If there is no active game, they need to start one, not join the queue
+        if not (tables := Game.live_tables(CURRENT_VENUE.get())):
+            return NOBODY_PLAYING
+
+        # Balance players across the tables being played on
+        queue = PlayerQueue.shortest(tables)
+        if not queue.add(player):
+            queue = PlayerQueue.for_player(player) or queue
+            return _already_queued(queue, queue.get_position(player))
+
+        return _joined(queue, queue.get_position(player))
+
+    async def _arun(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        if queue := await PlayerQueue.afor_player(player):
+            return _already_queued(queue, await queue.aget_position(player))
+
+        # If there is no active game, they need to start one, not join the queue
+        if not (tables := await Game.alive_tables(CURRENT_VENUE.get())):
+            return NOBODY_PLAYING
+
+        # Balance players across the tables being played on
+        queue = await PlayerQueue.ashortest(tables)
+        if not await queue.aadd(player):
+            queue = await PlayerQueue.afor_player(player) or queue
+            return _already_queued(queue, await queue.aget_position(player))
+
+        return _joined(queue, await queue.aget_position(player))
+
+
+class LeaveQueueTool(BaseTool):
+    """Leave the queue."""
+    name = "Leave Queue"
+    description = "Leave the queue. Takes no input, so input n/a."
+
+    def _run(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        queue = PlayerQueue.for_player(player)
+        if queue is None or not queue.remove(player):
+            return WERENT_IN_QUEUE
+
+        return f"You've left {_queue_name(queue.table)}."
+
+    async def _arun(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        queue = await PlayerQueue.afor_player(player)
+        if queue is None or not await queue.aremove(player):
+            return WERENT_IN_QUEUE
+
+        return f"You've left {_queue_name(queue.table)}."
+
+
+class CheckPositionTool(BaseTool):
+    """Check position in queue."""
+    name = "Check Position"
+    description = "Check position in queue. Takes no input, so input n/a."
+
+    def _run(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        queue = PlayerQueue.for_player(player)
+        if queue is None or (position := queue.get_position(player)) == -1:
+            return NOT_IN_QUEUE
+
+        return _position(
+            queue,
+            position,
+            TableStats.for_table(queue.table),
+            Game.live_at(queue.table)
         )
 
-        def _run(self, query: str):
-            queue: list[Player] = player_queue.get_queue()
-            queue_str = "\n".join([f"{i}. {p.name}" for i, p in enumerate(queue, 1)])
-            return f"Queue:\n{queue_str}"
-
-    class StartGameTool(BaseTool):
-        """Start a game when none exist."""
-        name = "Start First Game"
-        description = (
-            "Create the first game of the day, when none exist. Input must the phone "
-            "number of the user's opponent. If the phone number is not provided, ask the "
-            "user for the phone number. This tool is only used to create a game if "
-            "nobody is actively playing."
+    async def _arun(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        queue = await PlayerQueue.afor_player(player)
+        if queue is None or (position := await queue.aget_position(player)) == -1:
+            return NOT_IN_QUEUE
+
+        return _position(
+            queue,
+            position,
+            await TableStats.afor_table(queue.table),
+            await Game.alive_at(queue.table)
         )
 
-        def _run(self, opponent_phone: str):
-            try:
-                Game.from_only_active()
-                return (
-                    "Game already exists, cannot use this tool. "
-                    "End the last active game by having the loser declare themselves."
-                )
-            except GameNotFoundError:
-                try:
-                    opponent = Player.from_phone(opponent_phone)
-                except PlayerNotFoundError:
-                    return "Opponent has not registered. Have them text me to register first."
-                game = Game.create(king=player, challenger=opponent, force_active=True)
-                return (
-                    f"Game created. King: {game.king.name}, Challenger: "
-                    f"{game.challenger.name}"
-                )
-
-    class LostMatchEndGameTool(BaseTool):
-        """End the game when the king loses."""
-        name = "Lost Match, End Game"
-        description = (
-            "The loser of the active match will use this tool to specify that they lost "
-            "the match. The game will then be ended and a new game will be started with "
-            "the next player in the queue to challenge the winner of the last match. "
-            "Takes no input, as the loser is the one to use this tool, so input n/a."
+
+class SeeFullQueueTool(BaseTool):
+    """See the full queue."""
+    name = "See Full Queue"
+    description = (
+        "See the names of all players in order in the queue. "
+        "Takes no input, so input n/a."
+    )
+
+    def _run(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        # The player's own queue if they're in one, otherwise every table being played
+        if queue := PlayerQueue.for_player(player):
+            tables = [queue.table]
+        else:
+            tables = Game.live_tables(CURRENT_VENUE.get()) or [
+                Table.default(CURRENT_VENUE.get())
+            ]
+
+        return "\n\n".join(
+            _format_queue(table, PlayerQueue(table=table).get_queue())
+            for table in _sorted_tables(tables)
         )
 
-        def _run(self, query: str):
-            try:
-                game = Game.from_only_active()
-            except GameNotFoundError:
-                return (
-                    "No game exists. Use the 'Start Game' tool to start a new game."
-                )
-
-            # Determine winner and loser
-            winner = game.challenger if game.king == player else game.king
-
-            # Mark game as finshed
-            game.update_status(GameStatus.FINISHED)
-
-            # Start next game
-            next_challenger = player_queue.find_next_player()
-            if not next_challenger:
-                return (
-                    "Game ended. No players in queue to challenge the winner, "
-                    "feel free to play again."
-                )
-
-            next_game = Game.create(king=winner, challenger=next_challenger)
-            print("awaiting confirmation")
-
-            return (
-                f"Game ended. The next player in the queue, {next_challenger.name}, "
-                f"has two minutes to come to the table and be confirmed by "
-                f"{winner.name}. They can say '{next_challenger.name} is here' or "
-                "'next player is here' etc."
+    async def _arun(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        # The player's own queue if they're in one, otherwise every table being played
+        if queue := await PlayerQueue.afor_player(player):
+            tables = [queue.table]
+        else:
+            tables = await Game.alive_tables(CURRENT_VENUE.get()) or [
+                Table.default(CURRENT_VENUE.get())
+            ]
+
+        return "\n\n".join(
+            [
+                _format_queue(table, await PlayerQueue(table=table).aget_queue())
+                for table in _sorted_tables(tables)
+            ]
+        )
+
+
+class StartGameTool(BaseTool):
+    """Start a game on a free table."""
+    name = "Start First Game"
+    description = (
+        "Create the first game of the day on a table, when nobody is playing on it. "
+        "Input must the phone number of the user's opponent. If the phone number is "
+        "not provided, ask the user for the phone number. This tool is only used to "
+        "create a game if a table is free."
+    )
+
+    def _run(self, opponent_phone: str):
+        player = CURRENT_PLAYER.get()
+        venue = CURRENT_VENUE.get()
+
+        table = _free_table(Table.at_venue(venue), Game.live_tables(venue))
+        if table is None:
+            return NO_FREE_TABLE
+
+        try:
+            opponent = Player.from_phone(opponent_phone)
+        except PlayerNotFoundError:
+            return OPPONENT_UNREGISTERED
+        try:
+            game = Game.create(
+                king=player, challenger=opponent, force_active=True, table=table
             )
+        except LiveGameExistsError:
+            return GAME_EXISTS
+        return _game_created(game)
+
+    async def _arun(self, opponent_phone: str):
+        player = CURRENT_PLAYER.get()
+        venue = CURRENT_VENUE.get()
 
-    class ConfirmInboundChallengerTool(BaseTool):
-        """Confirm the inbound challenger."""
-        name = "Confirm Inbound Challenger"
-        description = (
-            "The winner of the last match will use this tool to confirm the next player "
-            "in the queue as the challenger. This tool will only work if the next player "
-            "in the queue has used the 'Start Game' tool and is waiting to be confirmed. "
-            "Takes no input, as the winner is the one to use this tool, so input n/a."
+        table = _free_table(
+            await Table.aat_venue(venue), await Game.alive_tables(venue)
         )
+        if table is None:
+            return NO_FREE_TABLE
+
+        try:
+            opponent = await Player.afrom_phone(opponent_phone)
+        except PlayerNotFoundError:
+            return OPPONENT_UNREGISTERED
+        try:
+            game = await Game.acreate(
+                king=player, challenger=opponent, force_active=True, table=table
+            )
+        except LiveGameExistsError:
+            return GAME_EXISTS
+        return _game_created(game)
+
+
+class LostMatchEndGameTool(BaseTool):
+    """End the game when the king loses."""
+    name = "Lost Match, End Game"
+    description = (
+        "The loser of the active match will use this tool to specify that they lost "
+        "the match. The game will then be ended and a new game will be started with "
+        "the next player in the queue to challenge the winner of the last match. "
+        "Takes no input, as the loser is the one to use this tool, so input n/a."
+    )
+
+    def _run(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        # Mark the player's game as finished in one atomic update, so only one
+        # message can end it
+        try:
+            game = Game.transition_for_player(
+                player, CURRENT_VENUE.get(), GameStatus.IN_PROGRESS, GameStatus.FINISHED
+            )
+        except GameNotFoundError:
+            return NOT_IN_GAME
 
-        def _run(self, query: str):
-            try:
-                game = Game.from_only_pending()
-            except GameNotFoundError:
-                return (
-                    "No game exists. Use the 'Start Game' tool to start a new game."
-                )
+        # Start next game at the same table, with the next player in its queue
+        winner = _winner(game, player)
+        next_challenger, next_game = call_next_challenger(winner, game.table)
+        if next_challenger and not next_game:
+            return _game_ended_race(next_challenger)
 
-            # Make sure user is the king
-            if game.king != player:
-                return "Only the king can confirm the inbound challenger."
+        return _game_ended(winner, next_challenger)
 
-            # Mark game as finshed
-            game.update_status(GameStatus.IN_PROGRESS)
+    async def _arun(self, query: str):
+        player = CURRENT_PLAYER.get()
 
-            return (
-                f"Confirmed. The game has begun between {game.king.name} and "
-                f"{game.challenger.name}. Good luck."
+        # Mark the player's game as finished in one atomic update, so only one
+        # message can end it
+        try:
+            game = await Game.atransition_for_player(
+                player, CURRENT_VENUE.get(), GameStatus.IN_PROGRESS, GameStatus.FINISHED
             )
+        except GameNotFoundError:
+            return NOT_IN_GAME
+
+        # Start next game at the same table, with the next player in its queue
+        winner = _winner(game, player)
+        next_challenger, next_game = await acall_next_challenger(winner, game.table)
+        if next_challenger and not next_game:
+            return _game_ended_race(next_challenger)
+
+        return _game_ended(winner, next_challenger)
+
+
+class ConfirmInboundChallengerTool(BaseTool):
+    """Confirm the inbound challenger."""
+    name = "Confirm Inbound Challenger"
+    description = (
+        "The winner of the last match will use this tool to confirm the next player "
+        "in the queue as the challenger. This tool will only work if the next player "
+        "in the queue has used the 'Start Game' tool and is waiting to be confirmed. "
+        "Takes no input, as the winner is the one to use this tool, so input n/a."
+    )
+
+    def _run(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        # Mark the game the player is king of as in progress in one atomic update,
+        # unless it was already confirmed or has expired
+        try:
+            game = Game.transition_for_player(
+                player,
+                CURRENT_VENUE.get(),
+                GameStatus.PENDING_CHALLENGER,
+                GameStatus.IN_PROGRESS,
+                as_king=True
+            )
+        except GameNotFoundError:
+            return NO_CHALLENGER
+
+        return _confirmed(game)
+
+    async def _arun(self, query: str):
+        player = CURRENT_PLAYER.get()
+
+        # Mark the game the player is king of as in progress in one atomic update,
+        # unless it was already confirmed or has expired
+        try:
+            game = await Game.atransition_for_player(
+                player,
+                CURRENT_VENUE.get(),
+                GameStatus.PENDING_CHALLENGER,
+                GameStatus.IN_PROGRESS,
+                as_king=True
+            )
+        except GameNotFoundError:
+            return NO_CHALLENGER
+
+        return _confirmed(game)
+
+
+# Tools for unregistered and registered players, built once per process
+REGISTRATION_TOOLS: list[BaseTool] = [RegisterPlayerTool()]
 
-    return [
-        JoinQueueTool(),
-        LeaveQueueTool(),
-        CheckPositionTool(),
-        SeeFullQueueTool(),
-        StartGameTool(),
-        LostMatchEndGameTool(),
-        ConfirmInboundChallengerTool()
-    ]
+PLAYER_TOOLS: list[BaseTool] = [
+    JoinQueueTool(),
+    LeaveQueueTool(),
+    CheckPositionTool(),
+    SeeFullQueueTool(),
+    StartGameTool(),
+    LostMatchEndGameTool(),
+    ConfirmInboundChallengerTool()
+]
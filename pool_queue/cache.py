@@ -0,0 +1,78 @@
+"""Process-local, thread-safe LRU cache with per-entry expiry."""
+from pydantic import BaseModel
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Hashable
+import time
+
+from pool_queue.telemetry import CACHE_LOOKUPS
+
+
+# Returned by TTLCache.get when a key isn't cached, as None can be a cached value
+MISSING = object()
+
+
+class CacheStats(BaseModel):
+    """Counters for a cache."""
+    hits: int
+    misses: int
+    size: int
+
+
+class TTLCache:
+    """
+    A bounded LRU cache whose entries expire `ttl` seconds after being set. When full,
+    the least recently used entry is evicted. Lookups of a cache given a `name` are
+    counted in the metrics, see `pool_queue.telemetry`.
+    """
+    def __init__(self, max_size: int, ttl: float, name: str | None = None) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Hashable) -> Any:
+        """Get a cached value, or MISSING if it isn't cached or has expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None or entry[0] <= time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                self._count("miss")
+                return MISSING
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._count("hit")
+            return entry[1]
+
+    def _count(self, result: str) -> None:
+        """Count a lookup in the metrics, if the cache is named."""
+        if self.name is not None:
+            CACHE_LOOKUPS.inc(cache=self.name, result=result)
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Cache a value."""
+        expires = time.monotonic() + self.ttl
+
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        """Hit and miss counters and the current number of entries."""
+        with self._lock:
+            return CacheStats(hits=self.hits, misses=self.misses, size=len(self._entries))
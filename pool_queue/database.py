@@ -0,0 +1,128 @@
+"""
+Shared connection to the database. A single client (and so a single connection pool)
+is created lazily on first use and shared by every model. Async code uses a Motor
+client, created the same way and configured the same as the synchronous one. Every
+command either client makes is timed, see `pool_queue.telemetry`.
+"""
+from pymongo import MongoClient
+from pymongo.database import Database
+
+from threading import Lock
+from typing import TYPE_CHECKING
+
+from pool_queue.telemetry import MongoCommandListener
+
+from keys import KEYS
+
+# Motor is imported when the async client is first needed
+if TYPE_CHECKING:
+    from motor.motor_asyncio import (
+        AsyncIOMotorClient,
+        AsyncIOMotorCollection,
+        AsyncIOMotorDatabase
+    )
+
+
+_client: MongoClient | None = None
+_async_client: "AsyncIOMotorClient | None" = None
+_client_lock = Lock()
+
+
+def _client_options() -> dict:
+    """Connection pool options from the keys and command timing, for both clients."""
+    return {
+        "maxPoolSize": KEYS.MongoDB.max_pool_size,
+        "minPoolSize": KEYS.MongoDB.min_pool_size,
+        "connectTimeoutMS": KEYS.MongoDB.connect_timeout_ms,
+        "serverSelectionTimeoutMS": KEYS.MongoDB.server_selection_timeout_ms,
+        "socketTimeoutMS": KEYS.MongoDB.socket_timeout_ms,
+        "event_listeners": [MongoCommandListener()]
+    }
+
+
+def get_client() -> MongoClient:
+    """Get the shared client, creating it on first use."""
+    global _client
+
+    if _client is None:
+        with _client_lock:
+            if _client is None:  # another thread may have connected while we waited
+                _client = MongoClient(KEYS.MongoDB.connect_str, **_client_options())
+
+    return _client
+
+
+def set_client(client: MongoClient | None) -> None:
+    """
+    Use `client` for all synchronous database access, ex. an in-memory one in
+    benchmarks and tests. None goes back to connecting on first use.
+    """
+    global _client
+
+    with _client_lock:
+        _client = client
+
+
+def get_async_client() -> "AsyncIOMotorClient":
+    """
+    Get the shared Motor client, creating it on first use. Motor binds to the event
+    loop it's first used on, so all async database access must run on that loop.
+    """
+    global _async_client
+
+    if _async_client is None:
+        with _client_lock:
+            if _async_client is None:
+                from motor.motor_asyncio import AsyncIOMotorClient
+
+                _async_client = AsyncIOMotorClient(
+                    KEYS.MongoDB.connect_str, **_client_options()
+                )
+
+    return _async_client
+
+
+def get_database() -> Database:
+    """Get the Pool Queue database from the shared client."""
+    return get_client()[KEYS.MongoDB.database]
+
+
+def get_async_database() -> "AsyncIOMotorDatabase":
+    """Get the Pool Queue database from the shared Motor client."""
+    return get_async_client()[KEYS.MongoDB.database]
+
+
+def close() -> None:
+    """Close the shared clients, if they were ever created."""
+    global _client, _async_client
+
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+        if _async_client is not None:
+            _async_client.close()
+            _async_client = None
+
+
+class LazyCollection:
+    """
+    A collection that's resolved from the shared client when it's first used, so
+    modules can define their collections at import without touching the network.
+    Attribute access is forwarded to the underlying pymongo collection, and `aio` is
+    the same collection on the Motor client.
+    """
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    @property
+    def aio(self) -> "AsyncIOMotorCollection":
+        """The collection on the shared Motor client, for async code."""
+        return get_async_database()[self.name]
+
+    def __getattr__(self, attr: str):
+        return getattr(get_database()[self.name], attr)
+
+    def __repr__(self) -> str:
+        return f"LazyCollection({self.name!r})"
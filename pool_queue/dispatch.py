@@ -0,0 +1,118 @@
+"""
+Keyed dispatch of work, ex. messages keyed by phone number. Items with the same key
+are handled one turn at a time, in order, while different keys run concurrently on a
+bounded worker pool. Items arriving for a key in quick succession, or while its last
+turn is still running, are coalesced into a single turn.
+"""
+from pydantic import BaseModel
+
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from pool_queue.workers import PoolStats, WorkerPool
+
+
+class DispatcherStats(BaseModel):
+    """Current load and lifetime counters of a dispatcher."""
+    pool: PoolStats
+    pending: int
+    keys: int
+    coalesced: int
+    shed: int
+
+
+class KeyedDispatcher:
+    """
+    Runs `handler(key, items)` with every item submitted for a key since its last
+    turn. A key's first item waits `coalesce_window` seconds for more to arrive
+    before its turn is queued; items arriving during a turn are handled together
+    right after it. At most `max_pending` items wait at once across all keys.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Hashable, list[Any]], Awaitable[None]],
+        concurrency: int,
+        max_pending: int,
+        coalesce_window: float,
+        name: str = "dispatcher"
+    ):
+        self.handler = handler
+        self.max_pending = max_pending
+        self.coalesce_window = coalesce_window
+
+        # A key is scheduled from its first pending item until its last turn ends,
+        # so it's never queued or running twice
+        self._pending: dict[Hashable, list[Any]] = {}
+        self._pending_count = 0
+        self._scheduled: set[Hashable] = set()
+        self._windows: dict[Hashable, asyncio.TimerHandle] = {}
+
+        # Pending items bound the number of queued keys, so the pool never refuses one
+        self._pool = WorkerPool(self._turn, concurrency, max_pending, name)
+        self.coalesced = 0
+        self.shed = 0
+
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        self._pool.start()
+
+    async def stop(self, timeout: float | None = None) -> None:
+        """
+        Queue every waiting key without waiting out its coalescing window, then stop
+        the workers, waiting up to `timeout` seconds for queued turns to finish.
+        """
+        for key, window in list(self._windows.items()):
+            window.cancel()
+            self._queue(key)
+
+        await self._pool.stop(timeout)
+
+    def submit(self, key: Hashable, item: Any) -> bool:
+        """
+        Add an item for a key. Returns False, without adding it, if too many items are
+        already pending.
+        """
+        if self._pending_count >= self.max_pending:
+            self.shed += 1
+            return False
+
+        self._pending.setdefault(key, []).append(item)
+        self._pending_count += 1
+
+        if key not in self._scheduled:
+            self._scheduled.add(key)
+            self._windows[key] = asyncio.get_running_loop().call_later(
+                self.coalesce_window, self._queue, key
+            )
+
+        return True
+
+    def _queue(self, key: Hashable) -> None:
+        """Queue a key's next turn on the pool."""
+        self._windows.pop(key, None)
+        self._pool.submit(key)
+
+    async def _turn(self, key: Hashable) -> None:
+        """Handle every item pending for a key, then queue its next turn if needed."""
+        items = self._pending.pop(key)
+        self._pending_count -= len(items)
+        self.coalesced += len(items) - 1
+
+        try:
+            await self.handler(key, items)
+        finally:
+            if key in self._pending:
+                self._queue(key)
+            else:
+                self._scheduled.discard(key)
+
+    def stats(self) -> DispatcherStats:
+        """Pool load, pending items and lifetime counters."""
+        return DispatcherStats(
+            pool=self._pool.stats(),
+            pending=self._pending_count,
+            keys=len(self._scheduled),
+            coalesced=self.coalesced,
+            shed=self.shed
+        )
@@ -0,0 +1,242 @@
+"""
+Live queue events for displays. Queue and game mutations are published as compact
+incremental events to subscribers, ex. the Visual Queue display's event stream, so
+displays update without reading the database.
+
+Events come from one of two sources: a Mongo change stream, which sees mutations made
+by every process (see `pool_queue.events.change_streams`), or, when change streams
+aren't available, the mutations made in this process.
+"""
+from pydantic import BaseModel, Field
+
+import asyncio
+from datetime import datetime
+from enum import Enum
+import logging
+from threading import Lock
+from typing import Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+# Events a subscriber can fall behind by before it's closed, to resync from a snapshot
+SUBSCRIBER_BUFFER = 256
+
+
+class EventType(Enum):
+    """
+    What happened.
+
+    PROMOTED: The next player in a table's queue was called up to challenge the king,
+        creating a pending game.
+    CLEARED: Every queue was cleared of old entries, see `PlayerQueue.daily_clear`.
+    """
+    JOINED = "joined"
+    LEFT = "left"
+    CLEARED = "cleared"
+    PROMOTED = "promoted"
+    GAME_STATUS = "game_status"
+
+
+class QueueEvent(BaseModel):
+    """
+    A change to a queue or game. Only the fields relevant to the type are set. Queue
+    entries are identified by `entry_id`, so displays can apply events to a snapshot.
+    """
+    type: EventType
+    venue: str | None = None
+    table: str | None = None
+    entry_id: str | None = None
+    name: str | None = None
+    seq: int | None = None
+    game_id: str | None = None
+    status: str | None = None
+    king: str | None = None
+    challenger: str | None = None
+    deadline: datetime | None = None
+    time: datetime = Field(default_factory=datetime.now)
+
+    @classmethod
+    def joined(
+        cls, venue: str, table: str, entry_id: str, name: str | None, seq: int
+    ) -> "QueueEvent":
+        """A player joined a table's queue."""
+        return cls(
+            type=EventType.JOINED,
+            venue=venue,
+            table=table,
+            entry_id=entry_id,
+            name=name,
+            seq=seq
+        )
+
+    @classmethod
+    def left(
+        cls, entry_id: str, venue: str | None = None, table: str | None = None
+    ) -> "QueueEvent":
+        """An entry left a queue, ex. the player left or was called up."""
+        return cls(type=EventType.LEFT, venue=venue, table=table, entry_id=entry_id)
+
+    @classmethod
+    def game(
+        cls,
+        game_id: str,
+        status: str,
+        venue: str,
+        table: str,
+        king: str | None,
+        challenger: str | None,
+        promoted: bool = False,
+        deadline: datetime | None = None
+    ) -> "QueueEvent":
+        """
+        A game was created or changed status. `deadline` is a pending game's
+        challenger deadline.
+        """
+        return cls(
+            type=EventType.PROMOTED if promoted else EventType.GAME_STATUS,
+            venue=venue,
+            table=table,
+            game_id=game_id,
+            status=status,
+            king=king,
+            challenger=challenger,
+            deadline=deadline
+        )
+
+    def to_sse(self) -> str:
+        """The event as a server-sent event."""
+        data = self.model_dump_json(exclude_none=True)
+        return f"event: {self.type.value}\ndata: {data}\n\n"
+
+
+class Subscription:
+    """
+    A subscriber's events, delivered on the event loop it subscribed from. If the
+    subscriber falls more than `max_pending` events behind, it's closed rather than
+    buffering without bound.
+    """
+
+    def __init__(self, bus: "EventBus", venue: str | None, max_pending: int):
+        self.venue = venue
+        self.closed = False
+        self._bus = bus
+        self._loop = asyncio.get_running_loop()
+        self._events: asyncio.Queue[QueueEvent] = asyncio.Queue(max_pending)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._bus.unsubscribe(self)
+
+    def wants(self, event: QueueEvent) -> bool:
+        """Whether the event is for this subscriber's venue."""
+        return self.venue is None or event.venue is None or event.venue == self.venue
+
+    def deliver(self, event: QueueEvent) -> None:
+        """Deliver an event from any thread."""
+        self._loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: QueueEvent) -> None:
+        """Queue an event, closing the subscription if it's too far behind."""
+        try:
+            self._events.put_nowait(event)
+        except asyncio.QueueFull:
+            self.closed = True
+            self._bus.unsubscribe(self)
+
+    async def get(self, timeout: float | None = None) -> QueueEvent | None:
+        """
+        The next event. Returns None if the subscription was closed. Raises
+        TimeoutError if there's no event within `timeout` seconds.
+        """
+        if self.closed:
+            return None
+
+        return await asyncio.wait_for(self._events.get(), timeout)
+
+
+class EventBus:
+    """
+    Fans queue events out to subscribers, in this process. `version` counts the events
+    seen, so it changes whenever queue or game state does. Listeners are called with
+    every event on the publishing thread, ex. to keep timers in step with games.
+    """
+
+    def __init__(self):
+        self._subscriptions: set[Subscription] = set()
+        self._listeners: list[Callable[[QueueEvent], None]] = []
+        self._lock = Lock()
+        self.local = True
+        self.version = 0
+
+    def subscribe(
+        self, venue: str | None = None, max_pending: int = SUBSCRIBER_BUFFER
+    ) -> Subscription:
+        """
+        Subscribe to events at a venue, or every venue if None. Must be called from
+        a running event loop. Use as a context manager to unsubscribe on exit.
+        """
+        subscription = Subscription(self, venue, max_pending)
+        with self._lock:
+            self._subscriptions.add(subscription)
+
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        """Stop delivering events to a subscription."""
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def add_listener(self, listener: Callable[[QueueEvent], None]) -> None:
+        """
+        Call `listener` with every event published, on the publishing thread, so it
+        should return quickly.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[QueueEvent], None]) -> None:
+        """Stop calling a listener, if it was added."""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def publish(self, event: QueueEvent) -> None:
+        """
+        Deliver an event to every subscriber it's for, and every listener. Safe to call
+        from any thread.
+        """
+        with self._lock:
+            self.version += 1
+            subscriptions = list(self._subscriptions)
+            listeners = list(self._listeners)
+
+        for subscription in subscriptions:
+            if subscription.wants(event):
+                subscription.deliver(event)
+
+        for listener in listeners:
+            try:
+                listener(event)
+            except Exception:
+                logger.exception("Event listener failed on %s event", event.type.value)
+
+    def emit(self, event: QueueEvent) -> None:
+        """
+        Publish an event for a mutation made by this process. While a change stream is
+        feeding the bus, as it publishes every process's mutations itself, only the
+        version is bumped, so it changes without waiting for the stream.
+        """
+        if self.local:
+            self.publish(event)
+            return
+
+        with self._lock:
+            self.version += 1
+
+
+# Queue events in this process
+EVENT_BUS = EventBus()
@@ -0,0 +1,219 @@
+"""
+Feed the event bus from a Mongo change stream on the queue and games collections, so
+each process's displays see mutations made by every process. Change streams need a
+replica set; without one, the bus keeps publishing this process's own mutations.
+"""
+from pymongo.errors import OperationFailure, PyMongoError
+
+import logging
+from threading import Event, Thread
+
+from pool_queue.database import get_database
+from pool_queue.events import EVENT_BUS, QueueEvent
+from pool_queue.game import GAME_COLL, GameStatus
+from pool_queue.player import Player, PlayerNotFoundError
+from pool_queue.player_queue import QUEUE_COLL
+
+
+logger = logging.getLogger(__name__)
+
+# How long each wait for changes blocks server-side, bounding how long stopping takes
+MAX_AWAIT_MS = 1000
+
+# Seconds to wait before reopening the stream after an error, doubling after each
+# consecutive failure up to MAX_RETRY_DELAY
+RETRY_DELAY = 1
+MAX_RETRY_DELAY = 60
+
+_stopped = Event()
+
+
+def _snapshot_name(snapshot: dict | str) -> str | None:
+    """Name in an embedded player snapshot. Older games only store phone numbers."""
+    return snapshot.get("name") if isinstance(snapshot, dict) else None
+
+
+class ChangeStreamSource:
+    """
+    Translates change events into queue events. Deleted queue entries are reported by
+    ID only, so the tables of entries seen joining, or already queued when the stream
+    opened, are remembered to route their leaving events to the right venue.
+    """
+
+    def __init__(self):
+        self._entry_tables: dict[str, tuple[str, str]] = {}
+
+    def remember_entries(self) -> None:
+        """Remember the tables of every entry currently queued."""
+        entries = QUEUE_COLL.find(
+            {"player_phone": {"$exists": True}}, {"venue": 1, "table": 1}
+        )
+        for entry in entries:
+            self._entry_tables[str(entry["_id"])] = (entry["venue"], entry["table"])
+
+    def _queue_event(self, change: dict) -> QueueEvent | None:
+        """Event for a change to the queue collection."""
+        entry_id = str(change["documentKey"]["_id"])
+
+        if change["operationType"] == "insert":
+            item = change["fullDocument"]
+            if "player_phone" not in item:  # legacy single-document queue
+                return None
+
+            try:
+                name = Player.from_phone(item["player_phone"]).name
+            except PlayerNotFoundError:
+                name = None
+
+            self._entry_tables[entry_id] = (item["venue"], item["table"])
+            return QueueEvent.joined(
+                venue=item["venue"],
+                table=item["table"],
+                entry_id=entry_id,
+                name=name,
+                seq=item["seq"]
+            )
+
+        # Entries whose table isn't known can't be routed, and aren't on any display
+        # this process serves, ex. the legacy single-document queue
+        if change["operationType"] == "delete" and entry_id in self._entry_tables:
+            venue, table = self._entry_tables.pop(entry_id)
+            return QueueEvent.left(entry_id, venue=venue, table=table)
+
+        return None
+
+    @staticmethod
+    def _game_event(change: dict) -> QueueEvent | None:
+        """Event for a game being created or changing status."""
+        game = change.get("fullDocument")
+        if game is None or "venue" not in game:
+            return None
+
+        if change["operationType"] == "update":
+            updated = change["updateDescription"]["updatedFields"]
+            if "status" not in updated:
+                return None
+        elif change["operationType"] not in ("insert", "replace"):
+            return None
+
+        return QueueEvent.game(
+            game_id=str(game["_id"]),
+            status=game["status"],
+            venue=game["venue"],
+            table=game["table"],
+            king=_snapshot_name(game["king"]),
+            challenger=_snapshot_name(game["challenger"]),
+            promoted=(
+                change["operationType"] == "insert"
+                and game["status"] == GameStatus.PENDING_CHALLENGER.value
+            ),
+            deadline=game.get("challenger_deadline")
+        )
+
+    def to_event(self, change: dict) -> QueueEvent | None:
+        """The queue event for a change, or None if displays don't need it."""
+        collection = change["ns"]["coll"]
+        if collection == QUEUE_COLL.name:
+            return self._queue_event(change)
+
+        if collection == GAME_COLL.name:
+            return self._game_event(change)
+
+        return None
+
+
+def _open_stream(resume_token: dict | None = None):
+    """Open a change stream on the queue and games collections."""
+    return get_database().watch(
+        [{"$match": {"ns.coll": {"$in": [QUEUE_COLL.name, GAME_COLL.name]}}}],
+        full_document="updateLookup",
+        max_await_time_ms=MAX_AWAIT_MS,
+        resume_after=resume_token
+    )
+
+
+def _reopen(resume_token: dict | None):
+    """
+    Reopen the change stream where it left off, or from now if it can't resume there.
+    Returns None if it couldn't be opened.
+    """
+    try:
+        return _open_stream(resume_token)
+    except OperationFailure:  # ex. the resume point is no longer in the oplog
+        logger.exception("Couldn't resume change stream, reopening from now")
+    except PyMongoError:
+        logger.exception("Couldn't reopen change stream")
+        return None
+
+    try:
+        return _open_stream()
+    except PyMongoError:
+        logger.exception("Couldn't reopen change stream")
+        return None
+
+
+def _run(stream) -> None:
+    """
+    Publish changes as events until stopped. The stream is reopened after errors,
+    backing off while they persist, and the bus publishes this process's own
+    mutations until it's open again. If `stream` is None, it's opened first.
+    """
+    source = ChangeStreamSource()
+    resume_token = None
+    delay = RETRY_DELAY
+
+    while not _stopped.is_set():
+        if stream is None and (stream := _reopen(resume_token)) is None:
+            _stopped.wait(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+            continue
+
+        try:
+            with stream:
+                source.remember_entries()
+                EVENT_BUS.local = False
+
+                while not _stopped.is_set():
+                    if (change := stream.try_next()) is None:
+                        continue
+
+                    delay = RETRY_DELAY
+                    if event := source.to_event(change):
+                        EVENT_BUS.publish(event)
+        except PyMongoError:
+            # Publish this process's own mutations until the stream is back
+            EVENT_BUS.local = True
+            logger.exception("Change stream failed, reopening in %ds", delay)
+            _stopped.wait(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+        resume_token, stream = stream.resume_token, None
+
+
+def start_change_streams() -> Thread | None:
+    """
+    Feed the event bus from a change stream, if the deployment supports them, and
+    stop it publishing this process's own mutations once the stream is open. Returns
+    None, leaving the bus as it is, if change streams aren't supported. If the
+    database can't be reached, the stream is opened in the background, with retries.
+    """
+    try:
+        stream = _open_stream()
+    except OperationFailure:
+        logger.info("Change streams unavailable, publishing this process's events")
+        return None
+    except PyMongoError:
+        logger.exception("Couldn't open change stream, retrying in the background")
+        stream = None
+
+    _stopped.clear()
+
+    thread = Thread(target=_run, args=(stream,), name="change-streams", daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_change_streams() -> None:
+    """Stop the change stream thread and go back to publishing local events."""
+    _stopped.set()
+    EVENT_BUS.local = True
@@ -1,16 +1,27 @@
-"""Game class, interfaces with the database."""
+"""Game class, interfaces with the database. Each table has at most one live game."""
 from pydantic import BaseModel, ConfigDict
 from bson.objectid import ObjectId
-from pymongo import MongoClient
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import DuplicateKeyError
 
+from datetime import datetime, timedelta
 from enum import Enum
+import logging
 
-from keys import KEYS
-from pool_queue.player import Player
+from pool_queue.database import LazyCollection
+from pool_queue.events import EVENT_BUS, QueueEvent
+from pool_queue.player import PLAYER_COLL, Player
+from pool_queue.table import DEFAULT_TABLE, Table
+from pool_queue.table.stats import Transition, arecord, record
 
 
-# Create a connection to the database players collection
-PLAYER_COLL = MongoClient(KEYS.MongoDB.connect_str).PoolQueue.games
+logger = logging.getLogger(__name__)
+
+# The database games collection, connected on first use
+GAME_COLL = LazyCollection("games")
+
+# How long a called challenger has to arrive and be confirmed by the king
+CHALLENGER_ARRIVAL_WINDOW = timedelta(minutes=2)
 
 
 class GameNotFoundError(Exception):
@@ -19,6 +30,18 @@ class GameNotFoundError(Exception):
         super().__init__(f"Game with {lookup_method} {value} not found.")
 
 
+class GameStatusConflictError(Exception):
+    """Raised when a game's status changed before a transition could be applied."""
+    def __init__(self, game_id: ObjectId, expected: "GameStatus"):
+        super().__init__(f"Game {game_id} is no longer {expected.value}.")
+
+
+class LiveGameExistsError(Exception):
+    """Raised when creating a game while another is pending or in progress."""
+    def __init__(self, table: Table):
+        super().__init__(f"A game is already pending or in progress at {table.id}.")
+
+
 class GameStatus(Enum):
     """
     The status of a game.
@@ -31,6 +54,32 @@ class GameStatus(Enum):
     IN_PROGRESS = "in_progress"
     FINISHED = "finished"
 
+    @classmethod
+    def initial(cls, force_active: bool = False) -> "GameStatus":
+        """Status of a newly created game, see `Game.create`."""
+        return cls.IN_PROGRESS if force_active else cls.PENDING_CHALLENGER
+
+    def update(self, at: datetime) -> dict:
+        """
+        Update setting a game to this status at time `at`. Pending and in-progress
+        games are flagged `live`, which a unique index limits to one game per table.
+        Only pending games keep their challenger deadline. Games record when they
+        started and finished.
+        """
+        if self is GameStatus.FINISHED:
+            return {
+                "$set": {"status": self.value, "finished_at": at},
+                "$unset": {"live": "", "challenger_deadline": ""}
+            }
+
+        if self is GameStatus.IN_PROGRESS:
+            return {
+                "$set": {"status": self.value, "live": True, "started_at": at},
+                "$unset": {"challenger_deadline": ""}
+            }
+
+        return {"$set": {"status": self.value, "live": True}}
+
 
 class Game(BaseModel):
     """A pool player in or out of the queue."""
@@ -38,58 +87,282 @@ class Game(BaseModel):
     king: Player
     challenger: Player
     status: GameStatus
+    table: Table = DEFAULT_TABLE
+    challenger_deadline: datetime | None = None
+
+    # When the game was created, started and finished. Games from before these were
+    # recorded don't have them.
+    created_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
 
     # Model config
     model_config = ConfigDict(arbitrary_types_allowed=True)
 
+    @staticmethod
+    def bootstrap() -> None:
+        """
+        Migrate games stored in older formats: games from before they were
+        partitioned by table are assigned to the default table, players stored as
+        phone numbers become snapshots, and pending and in-progress games are marked
+        live. Run once at startup, see `pool_queue.startup`.
+        """
+        GAME_COLL.update_many({"venue": {"$exists": False}}, {"$set": DEFAULT_TABLE.key})
+
+        # Look the players up in one query, leaving phone numbers with no record
+        for role in ("king", "challenger"):
+            legacy = list(GAME_COLL.find({role: {"$type": "string"}}, {role: 1}))
+            phones = list({game[role] for game in legacy})
+            players = {
+                player["phone_number"]: Player(**player).model_dump()
+                for player in PLAYER_COLL.find({"phone_number": {"$in": phones}})
+            }
+            updates = [
+                UpdateOne({"_id": game["_id"]}, {"$set": {role: players[game[role]]}})
+                for game in legacy
+                if game[role] in players
+            ]
+            if updates:
+                GAME_COLL.bulk_write(updates)
+
+        # One at a time, as the unique index allows one live game per table
+        statuses = [GameStatus.PENDING_CHALLENGER.value, GameStatus.IN_PROGRESS.value]
+        unmarked = GAME_COLL.find(
+            {"status": {"$in": statuses}, "live": {"$exists": False}}, {"_id": 1}
+        )
+        for game in unmarked:
+            try:
+                GAME_COLL.update_one({"_id": game["_id"]}, {"$set": {"live": True}})
+            except DuplicateKeyError:
+                logger.warning("Game %s isn't its table's only live game", game["_id"])
+
+    @staticmethod
+    def _player_from_snapshot(snapshot: dict | str) -> Player:
+        """
+        Parse a player snapshot embedded in a game document. Games created before
+        snapshots were embedded only store the phone number, so look those up.
+        """
+        if isinstance(snapshot, str):
+            return Player.from_phone(snapshot)
+
+        return Player(**snapshot)
+
+    @classmethod
+    def _from_document(cls, game: dict) -> "Game":
+        """Parse a game document, including its embedded player snapshots."""
+        return cls(
+            game_id=game["_id"],
+            king=cls._player_from_snapshot(game["king"]),
+            challenger=cls._player_from_snapshot(game["challenger"]),
+            status=GameStatus(game["status"]),
+            table=Table.from_document(game),
+            challenger_deadline=game.get("challenger_deadline"),
+            created_at=game.get("created_at"),
+            started_at=game.get("started_at"),
+            finished_at=game.get("finished_at")
+        )
+
+    @classmethod
+    async def _afrom_document(cls, game: dict) -> "Game":
+        """Async version of `_from_document`."""
+        for role in ("king", "challenger"):
+            if isinstance(game[role], str):
+                game[role] = (await Player.afrom_phone(game[role])).model_dump()
+
+        return cls._from_document(game)
+
     @classmethod
     def _from_game_id(cls, object_id: str | ObjectId) -> "Game":
         """
-        Get a game from it's database ID. If no player is found, raise
-        PlayerNotFoundError.
+        Get a game from it's database ID. If no game is found, raise
+        GameNotFoundError.
         """
         if isinstance(object_id, str):
             object_id = ObjectId(object_id)
 
-        game = PLAYER_COLL.find_one({"_id": object_id})
+        game = GAME_COLL.find_one({"_id": object_id})
 
         if game is None:
             raise GameNotFoundError("game ID", object_id)
 
-        # Parse
-        return cls(
-            game_id=game["_id"],
-            king=Player.from_phone(game["king"]),
-            challenger=Player.from_phone(game["challenger"]),
-            status=GameStatus(game["status"])
-        )
+        return cls._from_document(game)
 
     @classmethod
-    def from_only_active(cls) -> "Game":
+    def _from_status(cls, status: GameStatus, table: Table) -> "Game":
         """
-        Get the only active game. If no game is found, raise GameNotFoundError.
+        Get the table's only game with the given status. If no game is found, raise
+        GameNotFoundError.
         """
-        game = PLAYER_COLL.find_one({"status": GameStatus.IN_PROGRESS.value})
+        game = GAME_COLL.find_one({"status": status.value, **table.key})
 
         if game is None:
-            raise GameNotFoundError("status", GameStatus.IN_PROGRESS.value)
-        
-        return cls._from_game_id(game["_id"])
+            raise GameNotFoundError("status", status.value)
+
+        return cls._from_document(game)
 
     @classmethod
-    def from_only_pending(cls) -> "Game":
+    async def _afrom_status(cls, status: GameStatus, table: Table) -> "Game":
+        """Async version of `_from_status`."""
+        game = await GAME_COLL.aio.find_one({"status": status.value, **table.key})
+
+        if game is None:
+            raise GameNotFoundError("status", status.value)
+
+        return await cls._afrom_document(game)
+
+    @classmethod
+    def from_only_active(cls, table: Table = DEFAULT_TABLE) -> "Game":
+        """
+        Get the table's only active game. If no game is found, raise
+        GameNotFoundError.
+        """
+        return cls._from_status(GameStatus.IN_PROGRESS, table)
+
+    @classmethod
+    async def afrom_only_active(cls, table: Table = DEFAULT_TABLE) -> "Game":
+        """Async version of `from_only_active`."""
+        return await cls._afrom_status(GameStatus.IN_PROGRESS, table)
+
+    @classmethod
+    def from_only_pending(cls, table: Table = DEFAULT_TABLE) -> "Game":
+        """
+        Get the table's only pending game. If no game is found, raise
+        GameNotFoundError.
+        """
+        return cls._from_status(GameStatus.PENDING_CHALLENGER, table)
+
+    @classmethod
+    async def afrom_only_pending(cls, table: Table = DEFAULT_TABLE) -> "Game":
+        """Async version of `from_only_pending`."""
+        return await cls._afrom_status(GameStatus.PENDING_CHALLENGER, table)
+
+    @staticmethod
+    def _live_filter(venue: str, player: Player | None = None) -> dict:
+        """Filter for a venue's live games, optionally only those a player is in."""
+        query = {"venue": venue, "live": True}
+        if player is not None:
+            query["$or"] = [
+                {"king.phone_number": player.phone_number},
+                {"challenger.phone_number": player.phone_number}
+            ]
+
+        return query
+
+    @classmethod
+    def live_tables(cls, venue: str) -> list[Table]:
+        """Tables at the venue with a pending or in-progress game."""
+        games = GAME_COLL.find(cls._live_filter(venue), {"venue": 1, "table": 1})
+        return [Table.from_document(game) for game in games]
+
+    @classmethod
+    async def alive_tables(cls, venue: str) -> list[Table]:
+        """Async version of `live_tables`."""
+        cursor = GAME_COLL.aio.find(cls._live_filter(venue), {"venue": 1, "table": 1})
+        return [Table.from_document(game) for game in await cursor.to_list(length=None)]
+
+    @classmethod
+    def live_at(cls, table: Table) -> "Game | None":
+        """The table's pending or in-progress game, if it has one."""
+        game = GAME_COLL.find_one({**table.key, "live": True})
+        return None if game is None else cls._from_document(game)
+
+    @classmethod
+    async def alive_at(cls, table: Table) -> "Game | None":
+        """Async version of `live_at`."""
+        game = await GAME_COLL.aio.find_one({**table.key, "live": True})
+        return None if game is None else await cls._afrom_document(game)
+
+    @classmethod
+    def live_games(cls, venue: str) -> list["Game"]:
+        """Pending and in-progress games at the venue, one per table at most."""
+        games = GAME_COLL.find(cls._live_filter(venue))
+        return [cls._from_document(game) for game in games]
+
+    @classmethod
+    async def alive_games(cls, venue: str) -> list["Game"]:
+        """Async version of `live_games`."""
+        cursor = GAME_COLL.aio.find(cls._live_filter(venue))
+        return [await cls._afrom_document(game) for game in await cursor.to_list(None)]
+
+    @classmethod
+    def for_player(cls, player: Player, venue: str) -> "Game":
         """
-        Get the only pending game. If no game is found, raise GameNotFoundError.
+        Get the live game at the venue the player is in. If there isn't one, raise
+        GameNotFoundError.
         """
-        game = PLAYER_COLL.find_one({"status": GameStatus.PENDING_CHALLENGER.value})
+        game = GAME_COLL.find_one(cls._live_filter(venue, player))
 
         if game is None:
-            raise GameNotFoundError("status", GameStatus.PENDING_CHALLENGER.value)
-        
-        return cls._from_game_id(game["_id"])
+            raise GameNotFoundError("player", player.phone_number)
+
+        return cls._from_document(game)
 
     @classmethod
-    def create(cls, king: Player, challenger: Player, force_active: bool = False) -> "Game":
+    async def afor_player(cls, player: Player, venue: str) -> "Game":
+        """Async version of `for_player`."""
+        game = await GAME_COLL.aio.find_one(cls._live_filter(venue, player))
+
+        if game is None:
+            raise GameNotFoundError("player", player.phone_number)
+
+        return await cls._afrom_document(game)
+
+    @classmethod
+    def _new(
+        cls, king: Player, challenger: Player, force_active: bool, table: Table
+    ) -> "Game":
+        """
+        A new game, not yet inserted. Pending games get a challenger deadline, and
+        games created in progress start now.
+        """
+        status = GameStatus.initial(force_active)
+        now = datetime.now()
+
+        return cls(
+            game_id=ObjectId(),
+            king=king,
+            challenger=challenger,
+            status=status,
+            table=table,
+            challenger_deadline=(
+                now + CHALLENGER_ARRIVAL_WINDOW
+                if status is GameStatus.PENDING_CHALLENGER
+                else None
+            ),
+            created_at=now,
+            started_at=now if status is GameStatus.IN_PROGRESS else None
+        )
+
+    def _document(self) -> dict:
+        """
+        The game's document, to insert it. Player snapshots are embedded so the game
+        loads without fetching its players.
+        """
+        document = {
+            "_id": self.game_id,
+            "king": self.king.model_dump(),
+            "challenger": self.challenger.model_dump(),
+            "status": self.status.value,
+            "live": True,
+            "created_at": self.created_at,
+            **self.table.key
+        }
+        if self.started_at is not None:
+            document["started_at"] = self.started_at
+
+        if self.challenger_deadline is not None:
+            document["challenger_deadline"] = self.challenger_deadline
+
+        return document
+
+    @classmethod
+    def create(
+        cls,
+        king: Player,
+        challenger: Player,
+        force_active: bool = False,
+        table: Table = DEFAULT_TABLE
+    ) -> "Game":
         """
         Create a new pending game. This should happen when a game has just finished 
         and a new game needs to be created, involving the winner of the last 
@@ -98,25 +371,255 @@ class Game(BaseModel):
         If force_active is True, the game will be created as active, rather than
         pending. This should only be used when a game is being created for the first
         time.
+
+        Pending games get a challenger deadline, after which the challenger is
+        skipped, see `pool_queue.timers`.
+
+        Raises LiveGameExistsError if another game is already pending or in progress
+        at the table.
+        """
+        game = cls._new(king, challenger, force_active, table)
+
+        try:
+            GAME_COLL.insert_one(game._document())
+        except DuplicateKeyError:
+            raise LiveGameExistsError(table)
+
+        EVENT_BUS.emit(game._event())
+        return game
+
+    @classmethod
+    async def acreate(
+        cls,
+        king: Player,
+        challenger: Player,
+        force_active: bool = False,
+        table: Table = DEFAULT_TABLE
+    ) -> "Game":
+        """Async version of `create`."""
+        game = cls._new(king, challenger, force_active, table)
+
+        try:
+            await GAME_COLL.aio.insert_one(game._document())
+        except DuplicateKeyError:
+            raise LiveGameExistsError(table)
+
+        EVENT_BUS.emit(game._event())
+        return game
+
+    @staticmethod
+    def challenger_deadlines() -> list[tuple[ObjectId, datetime]]:
+        """The IDs and challenger deadlines of all pending games, at every table."""
+        games = GAME_COLL.find(
+            {"challenger_deadline": {"$exists": True}}, {"challenger_deadline": 1}
+        )
+        return [(game["_id"], game["challenger_deadline"]) for game in games]
+
+    @classmethod
+    def expire_challenger(
+        cls, game_id: ObjectId, now: datetime | None = None
+    ) -> "Game | None":
         """
-        res = PLAYER_COLL.insert_one(
+        Atomically finish a pending game whose challenger deadline has passed,
+        returning it as it was before. Returns None if the game was confirmed or
+        expired in the meantime, or its deadline hasn't passed.
+        """
+        now = now or datetime.now()
+        update = GameStatus.FINISHED.update(now)
+        update["$set"]["challenger_expired"] = True
+
+        game = GAME_COLL.find_one_and_update(
             {
-                "king": king.phone_number,
-                "challenger": challenger.phone_number,
-                "status": GameStatus.PENDING_CHALLENGER.value
-            }
+                "_id": game_id,
+                "status": GameStatus.PENDING_CHALLENGER.value,
+                "challenger_deadline": {"$lte": now}
+            },
+            update,
+            return_document=ReturnDocument.BEFORE
         )
 
-        return cls._from_game_id(res.inserted_id)
-    
+        if game is None:
+            return None
+
+        expired = cls._from_document(game)
+        if stat := expired._stat(GameStatus.FINISHED, now):
+            record(expired.table, *stat)
+
+        EVENT_BUS.emit(expired._event(GameStatus.FINISHED))
+        return expired
+
+    def _event(self, status: GameStatus | None = None) -> QueueEvent:
+        """
+        Event for the game being created, or moving to `status` if given. Creating a
+        pending game means its challenger was called up from the queue.
+        """
+        pending = (status or self.status) is GameStatus.PENDING_CHALLENGER
+        return QueueEvent.game(
+            game_id=str(self.game_id),
+            status=(status or self.status).value,
+            venue=self.table.venue,
+            table=self.table.table,
+            king=self.king.name,
+            challenger=self.challenger.name,
+            promoted=status is None and pending,
+            deadline=self.challenger_deadline if pending else None
+        )
+
+    def _stat(
+        self, status: GameStatus, at: datetime
+    ) -> tuple[Transition, float] | None:
+        """
+        The table statistic for this game moving to `status` at time `at`, and how long
+        it took, if the move counts toward one and the game has the timestamps.
+        """
+        if self.status is GameStatus.IN_PROGRESS and status is GameStatus.FINISHED:
+            transition, since = Transition.GAME, self.started_at
+        elif self.status is GameStatus.PENDING_CHALLENGER:
+            transition = (
+                Transition.ARRIVAL
+                if status is GameStatus.IN_PROGRESS
+                else Transition.NO_SHOW
+            )
+            since = self.created_at
+        else:
+            return None
+
+        if since is None:
+            return None
+
+        return transition, max(0, (at - since).total_seconds())
+
     def check_status(self) -> GameStatus:
         """Check the status of the game."""
-        return GameStatus(PLAYER_COLL.find_one({"_id": self.game_id})["status"])
+        game = GAME_COLL.find_one({"_id": self.game_id}, {"status": 1})
+        return GameStatus(game["status"])
+
+    async def acheck_status(self) -> GameStatus:
+        """Async version of `check_status`."""
+        game = await GAME_COLL.aio.find_one({"_id": self.game_id}, {"status": 1})
+        return GameStatus(game["status"])
+
+    @classmethod
+    def transition_for_player(
+        cls,
+        player: Player,
+        venue: str,
+        current: GameStatus,
+        status: GameStatus,
+        as_king: bool = False
+    ) -> "Game":
+        """
+        Atomically move the live game at the venue that the player is in (as king,
+        if `as_king`) from status `current` to `status`, returning it as it was before
+        the change. If there's no such game, for example because a concurrent message
+        already moved it, raise GameNotFoundError.
+        """
+        now = datetime.now()
+        game = GAME_COLL.find_one_and_update(
+            cls._transition_filter(player, venue, current, as_king),
+            status.update(now),
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if game is None:
+            raise GameNotFoundError("status", current.value)
+
+        before = cls._from_document(game)
+        if stat := before._stat(status, now):
+            record(before.table, *stat)
+
+        EVENT_BUS.emit(before._event(status))
+        return before
+
+    @classmethod
+    async def atransition_for_player(
+        cls,
+        player: Player,
+        venue: str,
+        current: GameStatus,
+        status: GameStatus,
+        as_king: bool = False
+    ) -> "Game":
+        """Async version of `transition_for_player`."""
+        now = datetime.now()
+        game = await GAME_COLL.aio.find_one_and_update(
+            cls._transition_filter(player, venue, current, as_king),
+            status.update(now),
+            return_document=ReturnDocument.BEFORE
+        )
+
+        if game is None:
+            raise GameNotFoundError("status", current.value)
+
+        before = await cls._afrom_document(game)
+        if stat := before._stat(status, now):
+            await arecord(before.table, *stat)
+
+        EVENT_BUS.emit(before._event(status))
+        return before
+
+    @classmethod
+    def _transition_filter(
+        cls,
+        player: Player,
+        venue: str,
+        current: GameStatus,
+        as_king: bool
+    ) -> dict:
+        """Filter for `transition_for_player`."""
+        if as_king:
+            query = cls._live_filter(venue)
+            query["king.phone_number"] = player.phone_number
+        else:
+            query = cls._live_filter(venue, player)
+
+        query["status"] = current.value
+        return query
+
+    def _set_status(self, status: GameStatus, at: datetime) -> None:
+        """Set the game's status, and when it started or finished, after updating it."""
+        if status is GameStatus.IN_PROGRESS:
+            self.started_at = at
+        elif status is GameStatus.FINISHED:
+            self.finished_at = at
 
-    def update_status(self, status: GameStatus):
-        """Update the status of the game."""
         self.status = status
-        PLAYER_COLL.update_one(
-            {"_id": self.game_id},
-            {"$set": {"status": status.value}}
+
+    def update_status(self, status: GameStatus):
+        """
+        Update the status of the game, only if it still has the status it was loaded
+        with. Otherwise, raise GameStatusConflictError.
+        """
+        now = datetime.now()
+        game = GAME_COLL.find_one_and_update(
+            {"_id": self.game_id, "status": self.status.value},
+            status.update(now),
+            projection={"_id": 1}
         )
+
+        if game is None:
+            raise GameStatusConflictError(self.game_id, self.status)
+
+        if stat := self._stat(status, now):
+            record(self.table, *stat)
+
+        self._set_status(status, now)
+        EVENT_BUS.emit(self._event(status))
+
+    async def aupdate_status(self, status: GameStatus):
+        """Async version of `update_status`."""
+        now = datetime.now()
+        game = await GAME_COLL.aio.find_one_and_update(
+            {"_id": self.game_id, "status": self.status.value},
+            status.update(now),
+            projection={"_id": 1}
+        )
+
+        if game is None:
+            raise GameStatusConflictError(self.game_id, self.status)
+
+        if stat := self._stat(status, now):
+            await arecord(self.table, *stat)
+
+        self._set_status(status, now)
+        EVENT_BUS.emit(self._event(status))
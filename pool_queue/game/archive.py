@@ -0,0 +1,136 @@
+"""
+Archive of finished games. Finished games are moved out of the games collection in
+batches, so it only holds recent and live games and its per-message status queries
+stay in cache. Archived games are stored compactly, one bucket document per table per
+day, holding that day's games.
+"""
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from pool_queue.database import LazyCollection
+from pool_queue.game import GAME_COLL, GameStatus
+
+
+# The database game archive collection, one bucket per table per day
+ARCHIVE_COLL = LazyCollection("games_archive")
+
+# How long finished games stay in the games collection before they're archived
+ARCHIVE_AFTER = timedelta(days=1)
+
+# Games archived per batch, each batch is one read, one bulk write and one delete
+ARCHIVE_BATCH_SIZE = 500
+
+# Indexes of the archive, see `pool_queue.indexes`
+ARCHIVE_INDEXES = [
+    IndexModel(
+        [("venue", ASCENDING), ("table", ASCENDING), ("day", ASCENDING)],
+        name="venue_table_day",
+        unique=True
+    )
+]
+
+
+def _finished_at(game: dict) -> datetime:
+    """
+    When a game finished. Games from before finish times were recorded use when they
+    were created instead, in local time like every other timestamp.
+    """
+    if finished_at := game.get("finished_at"):
+        return finished_at
+
+    return game["_id"].generation_time.astimezone().replace(tzinfo=None)
+
+
+def _bucket(game: dict) -> tuple[str, str, datetime]:
+    """The archive bucket a finished game goes in: its table and the day it finished."""
+    finished_at = _finished_at(game)
+    day = datetime(finished_at.year, finished_at.month, finished_at.day)
+    return game["venue"], game["table"], day
+
+
+def _compact(game: dict) -> dict:
+    """
+    A game as archived. The table, status and live flag are implied by its bucket, so
+    only the players, timestamps and whether the challenger expired are kept.
+    """
+    compact = {
+        "_id": game["_id"],
+        "king": game["king"],
+        "challenger": game["challenger"],
+        "finished_at": _finished_at(game)
+    }
+
+    for field in ("created_at", "started_at"):
+        if game.get(field) is not None:
+            compact[field] = game[field]
+
+    if game.get("challenger_expired"):
+        compact["challenger_expired"] = True
+
+    return compact
+
+
+def _archive_filter(cutoff: datetime) -> dict:
+    """
+    Filter for finished games to archive, those that finished before `cutoff`, or
+    were created before it if they have no finish time.
+    """
+    return {
+        "status": GameStatus.FINISHED.value,
+        "$or": [
+            {"finished_at": {"$lte": cutoff}},
+            {
+                "finished_at": {"$exists": False},
+                # IDs are generated in UTC, so convert from local time
+                "_id": {"$lte": ObjectId.from_datetime(cutoff.astimezone())}
+            }
+        ]
+    }
+
+
+def archive_batch(cutoff: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Archive up to `batch_size` games that finished before `cutoff`, returning how many
+    were archived. Games are only deleted once they're in the archive, and added to
+    their bucket as a set, so a batch interrupted between the two is safely redone.
+    """
+    games = list(GAME_COLL.find(_archive_filter(cutoff)).limit(batch_size))
+    if not games:
+        return 0
+
+    games.sort(key=_bucket)
+    ARCHIVE_COLL.bulk_write(
+        [
+            UpdateOne(
+                {"venue": venue, "table": table, "day": day},
+                {"$addToSet": {"games": {"$each": [_compact(g) for g in bucket]}}},
+                upsert=True
+            )
+            for (venue, table, day), bucket in groupby(games, key=_bucket)
+        ],
+        ordered=False
+    )
+    GAME_COLL.delete_many({"_id": {"$in": [game["_id"] for game in games]}})
+
+    return len(games)
+
+
+def archive_finished_games(
+    now: datetime | None = None, batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """
+    Archive every game that finished more than ARCHIVE_AFTER ago, in batches of
+    `batch_size`. Returns how many games were archived.
+    """
+    cutoff = (now or datetime.now()) - ARCHIVE_AFTER
+    archived = 0
+
+    while batch := archive_batch(cutoff, batch_size):
+        archived += batch
+        if batch < batch_size:
+            break
+
+    return archived
@@ -0,0 +1,222 @@
+"""User chat history. Stored as one capped document per user."""
+from pydantic import BaseModel, Field
+from pymongo import ReturnDocument
+
+from datetime import datetime, timedelta
+from typing import Literal
+
+from pool_queue.database import LazyCollection
+
+
+# The database chat history collection, connected on first use
+HISTORY_COLL = LazyCollection("chat_history")
+
+# Most messages kept per user, older messages are dropped on write
+MAX_STORED_MESSAGES = 100
+
+# Most recent messages loaded on read
+HISTORY_WINDOW = 40
+
+# How long a user's history is kept after their last message, expired by a TTL index
+# on `updated_at`, see `pool_queue.indexes`
+HISTORY_TTL = timedelta(days=90)
+
+
+class Message(BaseModel):
+    """A message in the chat history."""
+    phone_number: str
+    content: str
+    sender: Literal["user", "agent"]
+    time: datetime = Field(default_factory=datetime.now)
+
+    # Position in the user's history, counting every message ever added from 1. Set
+    # from the history's message count when loaded or added, not stored.
+    seq: int = Field(default=0, exclude=True)
+
+
+class ChatHistory(BaseModel):
+    """
+    Chat history for a user. `message_count` is how many messages were ever added,
+    and `summary` is a rolling summary of older messages, covering every message up
+    to and including the one numbered `summarized_seq`.
+    """
+    phone_number: str
+    messages: list[Message]
+    message_count: int = 0
+    summary: str = ""
+    summarized_seq: int = 0
+
+    @staticmethod
+    def bootstrap() -> None:
+        """
+        Migrate histories stored in older formats. Histories from before they expired
+        are dated by their last message, or now if they have none. Histories from
+        before messages were numbered are counted. Run once at startup, see
+        `pool_queue.startup`.
+        """
+        HISTORY_COLL.update_many(
+            {"updated_at": {"$exists": False}},
+            [
+                {
+                    "$set": {
+                        "updated_at": {"$ifNull": [{"$max": "$messages.time"}, "$$NOW"]}
+                    }
+                }
+            ]
+        )
+
+        HISTORY_COLL.update_many(
+            {"message_count": {"$exists": False}},
+            [{"$set": {"message_count": {"$size": {"$ifNull": ["$messages", []]}}}}]
+        )
+
+    @classmethod
+    def from_phone(cls, phone_number: str, window: int = HISTORY_WINDOW) -> "ChatHistory":
+        """Get the most recent `window` messages of a user's chat history."""
+        res = HISTORY_COLL.find_one(
+            {"phone_number": phone_number}, cls._window_projection(window)
+        )
+        return cls._from_document(phone_number, res)
+
+    @classmethod
+    async def afrom_phone(
+        cls,
+        phone_number: str,
+        window: int = HISTORY_WINDOW
+    ) -> "ChatHistory":
+        """Async version of `from_phone`."""
+        res = await HISTORY_COLL.aio.find_one(
+            {"phone_number": phone_number}, cls._window_projection(window)
+        )
+        return cls._from_document(phone_number, res)
+
+    @staticmethod
+    def _window_projection(window: int) -> dict:
+        """Projection loading only the most recent `window` messages."""
+        return {"_id": 0, "messages": {"$slice": -window}}
+
+    @classmethod
+    def _from_document(cls, phone_number: str, res: dict | None) -> "ChatHistory":
+        """Parse a history document, which is None if the user has no history."""
+        # Empty list if user has no history
+        if not res:
+            return cls(phone_number=phone_number, messages=[])
+
+        # The loaded messages are the newest, so are numbered up to the message count
+        messages = res.get("messages", [])
+        message_count = res.get("message_count", len(messages))
+        first = message_count - len(messages) + 1
+
+        return cls(
+            phone_number=phone_number,
+            messages=[
+                Message(**message, seq=seq)
+                for seq, message in enumerate(messages, start=first)
+            ],
+            message_count=message_count,
+            summary=res.get("summary", ""),
+            summarized_seq=res.get("summarized_seq", 0)
+        )
+
+    def add(self, message: Message) -> None:
+        """Add a message to the chat history."""
+        self.extend([message])
+
+    def extend(self, messages: list[Message]) -> None:
+        """
+        Append messages to the chat history in a single write, trimming the stored
+        history to the newest MAX_STORED_MESSAGES.
+        """
+        res = HISTORY_COLL.find_one_and_update(
+            {"phone_number": self.phone_number},
+            self._append_update(messages),
+            projection={"_id": 0, "message_count": 1},
+            upsert=True,  # create if user doesn't have chat history yet
+            return_document=ReturnDocument.AFTER
+        )
+        self._appended(messages, res["message_count"])
+
+    async def aextend(self, messages: list[Message]) -> None:
+        """Async version of `extend`."""
+        res = await HISTORY_COLL.aio.find_one_and_update(
+            {"phone_number": self.phone_number},
+            self._append_update(messages),
+            projection={"_id": 0, "message_count": 1},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        self._appended(messages, res["message_count"])
+
+    @staticmethod
+    def _append_update(messages: list[Message]) -> dict:
+        """
+        Update appending messages and counting them, keeping only the newest
+        MAX_STORED_MESSAGES, and restarting the history's expiry.
+        """
+        return {
+            "$push": {
+                "messages": {
+                    "$each": [message.model_dump() for message in messages],
+                    "$slice": -MAX_STORED_MESSAGES
+                }
+            },
+            "$inc": {"message_count": len(messages)},
+            "$set": {"updated_at": datetime.now()}
+        }
+
+    def _appended(self, messages: list[Message], message_count: int) -> None:
+        """Number and add appended messages, given the message count after adding."""
+        first = message_count - len(messages) + 1
+        for seq, message in enumerate(messages, start=first):
+            message.seq = seq
+
+        self.messages.extend(messages)
+        self.message_count = message_count
+
+    def save_summary(self, summary: str, through: int) -> bool:
+        """
+        Store a new rolling summary covering messages up to and including the one
+        numbered `through`. Returns False, without storing it, if the stored summary
+        changed since the history was loaded, ex. summarized by another process.
+        """
+        res = HISTORY_COLL.update_one(*self._summary_update(summary, through))
+        return self._summary_saved(res.modified_count, summary, through)
+
+    async def asave_summary(self, summary: str, through: int) -> bool:
+        """Async version of `save_summary`."""
+        res = await HISTORY_COLL.aio.update_one(*self._summary_update(summary, through))
+        return self._summary_saved(res.modified_count, summary, through)
+
+    def _summary_update(self, summary: str, through: int) -> tuple[dict, dict]:
+        """Filter and update storing a new summary, if the stored one is unchanged."""
+        # Histories that were never summarized have no `summarized_seq`
+        current = self.summarized_seq or {"$in": [0, None]}
+
+        return (
+            {"phone_number": self.phone_number, "summarized_seq": current},
+            {"$set": {"summary": summary, "summarized_seq": through}}
+        )
+
+    def _summary_saved(self, modified: int, summary: str, through: int) -> bool:
+        """Keep a new summary here if it was stored."""
+        if modified:
+            self.summary, self.summarized_seq = summary, through
+
+        return bool(modified)
+
+    def unsummarized(self, messages: list[Message]) -> list[Message]:
+        """The given messages that aren't covered by the summary yet."""
+        return [message for message in messages if message.seq > self.summarized_seq]
+
+    def update(self) -> "ChatHistory":
+        """Reload the chat history from the database."""
+        history = ChatHistory.from_phone(self.phone_number)
+        self.messages, self.message_count = history.messages, history.message_count
+        return self
+
+    def as_string(self, messages: list[Message] | None = None) -> str:
+        """Get the chat history, or the given messages from it, as a string."""
+        return "\n".join(
+            f"{message.sender}: {message.content}"
+            for message in (self.messages if messages is None else messages)
+        )
@@ -0,0 +1,123 @@
+"""
+Indexes the hot queries depend on. Created idempotently at startup, with a self-check
+that fails loudly if any hot query would fall back to a collection scan.
+"""
+from pymongo import ASCENDING, IndexModel
+
+from pool_queue.database import LazyCollection
+from pool_queue.player import PLAYER_COLL
+from pool_queue.game import GAME_COLL, GameStatus
+from pool_queue.game.archive import ARCHIVE_COLL, ARCHIVE_INDEXES
+from pool_queue.player_queue import QUEUE_COLL
+from pool_queue.table import DEFAULT_TABLE, TABLE_COLL
+from pool_queue.history import HISTORY_COLL, HISTORY_TTL
+
+
+# Indexes to create on each collection
+REQUIRED_INDEXES: dict[LazyCollection, list[IndexModel]] = {
+    PLAYER_COLL: [
+        IndexModel([("phone_number", ASCENDING)], name="phone_number", unique=True)
+    ],
+    GAME_COLL: [
+        IndexModel(
+            [("venue", ASCENDING), ("table", ASCENDING), ("status", ASCENDING)],
+            name="venue_table_status"
+        ),
+        # At most one pending or in-progress game per table, see GameStatus.update
+        IndexModel(
+            [("venue", ASCENDING), ("table", ASCENDING), ("live", ASCENDING)],
+            name="venue_table_live",
+            unique=True,
+            partialFilterExpression={"live": True}
+        ),
+        # Only pending games have a deadline, see `Game.challenger_deadlines`
+        IndexModel(
+            [("challenger_deadline", ASCENDING)], name="challenger_deadline", sparse=True
+        ),
+        # Finished games due for archiving, see `pool_queue.game.archive`
+        IndexModel(
+            [("status", ASCENDING), ("finished_at", ASCENDING)],
+            name="status_finished_at"
+        )
+    ],
+    ARCHIVE_COLL: ARCHIVE_INDEXES,
+    HISTORY_COLL: [
+        IndexModel([("phone_number", ASCENDING)], name="phone_number", unique=True),
+        IndexModel(
+            [("updated_at", ASCENDING)],
+            name="updated_at_ttl",
+            expireAfterSeconds=int(HISTORY_TTL.total_seconds())
+        )
+    ],
+    QUEUE_COLL: [
+        IndexModel([("player_phone", ASCENDING)], name="player_phone", unique=True),
+        IndexModel(
+            [("venue", ASCENDING), ("table", ASCENDING), ("seq", ASCENDING)],
+            name="venue_table_seq",
+            unique=True
+        ),
+        IndexModel([("datetime_added", ASCENDING)], name="datetime_added")
+    ],
+    TABLE_COLL: [
+        IndexModel(
+            [("venue", ASCENDING), ("table", ASCENDING)], name="venue_table", unique=True
+        )
+    ]
+}
+
+# Representative filters of every query run while handling a message
+HOT_QUERIES: list[tuple[LazyCollection, dict]] = [
+    (PLAYER_COLL, {"phone_number": "10000000000"}),
+    (GAME_COLL, {**DEFAULT_TABLE.key, "status": GameStatus.IN_PROGRESS.value}),
+    (GAME_COLL, {**DEFAULT_TABLE.key, "status": GameStatus.PENDING_CHALLENGER.value}),
+    (GAME_COLL, {"venue": DEFAULT_TABLE.venue, "live": True}),
+    (HISTORY_COLL, {"phone_number": "10000000000"}),
+    (QUEUE_COLL, {"player_phone": "10000000000"}),
+    (QUEUE_COLL, {**DEFAULT_TABLE.key, "seq": {"$lte": 0}})
+]
+
+
+class QueryPlanError(Exception):
+    """Raised when a hot query's winning plan includes a collection scan."""
+    def __init__(self, scans: list[str]):
+        super().__init__(
+            "Hot queries fall back to a collection scan: " + "; ".join(scans)
+        )
+
+
+def ensure_indexes() -> None:
+    """Create all required indexes. Existing indexes are left as they are."""
+    for collection, indexes in REQUIRED_INDEXES.items():
+        collection.create_indexes(indexes)
+
+
+def _stages(plan: dict) -> list[str]:
+    """All stage names in a query plan tree."""
+    stages = [plan["stage"]] if "stage" in plan else []
+
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages.extend(_stages(plan[key]))
+
+    for child in plan.get("inputStages", []):
+        stages.extend(_stages(child))
+
+    return stages
+
+
+def verify_query_plans() -> None:
+    """
+    Explain every hot query and raise QueryPlanError if any winning plan contains a
+    COLLSCAN stage.
+    """
+    scans: list[str] = []
+
+    for collection, query in HOT_QUERIES:
+        explanation = collection.find(query).limit(1).explain()
+        winning_plan = explanation["queryPlanner"]["winningPlan"]
+
+        if "COLLSCAN" in _stages(winning_plan):
+            scans.append(f"{collection.name} {query}")
+
+    if scans:
+        raise QueryPlanError(scans)
@@ -0,0 +1,126 @@
+"""
+Scheduled maintenance tasks, run on background threads in each process. Each run of a
+job is claimed in the database first, so only one process runs it, see `run_once`.
+"""
+from pymongo.errors import DuplicateKeyError
+
+from datetime import datetime, timedelta
+import logging
+from threading import Event, Thread
+from typing import Callable
+
+from pool_queue.database import LazyCollection
+from pool_queue.game.archive import archive_finished_games
+from pool_queue.player_queue import PlayerQueue, last_daily_clear
+
+
+logger = logging.getLogger(__name__)
+
+# The last claimed run of each job, by job name, see `run_once`
+JOBS_COLL = LazyCollection("maintenance")
+
+# How long to wait before retrying a job that failed
+RETRY_DELAY = timedelta(minutes=1)
+
+# How often finished games are archived, see `pool_queue.game.archive`
+ARCHIVE_INTERVAL = timedelta(hours=1)
+
+_stopped = Event()
+
+
+def _claim(job: str, due: datetime) -> bool:
+    """
+    Claim the run of `job` due at `due`. Returns False if another process already
+    claimed it or a later run, in which case the upsert collides with its claim.
+    """
+    try:
+        JOBS_COLL.update_one(
+            {"_id": job, "due": {"$lt": due}}, {"$set": {"due": due}}, upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+
+    return True
+
+
+def run_once(job: str, due: datetime, task: Callable[[], None]) -> bool:
+    """
+    Run `task` as the run of `job` due at `due`, unless another process has claimed
+    it. Returns whether it ran here. If it fails, the claim is released, so the run
+    can be retried, and the error is raised.
+    """
+    if not _claim(job, due):
+        return False
+
+    try:
+        task()
+    except Exception:
+        JOBS_COLL.delete_one({"_id": job, "due": due})
+        raise
+
+    return True
+
+
+def _run_daily_clear() -> None:
+    """
+    Clear the queue now, then every day at the clear hour, until stopped. Failed
+    clears are retried after RETRY_DELAY.
+    """
+    while not _stopped.is_set():
+        due = last_daily_clear()
+
+        try:
+            run_once("daily_clear", due, PlayerQueue.daily_clear)
+        except Exception:
+            logger.exception("Clearing the queue failed, retrying")
+            _stopped.wait(RETRY_DELAY.total_seconds())
+            continue
+
+        _stopped.wait((due + timedelta(days=1) - datetime.now()).total_seconds())
+
+
+def _archive() -> None:
+    """Archive finished games, logging how many."""
+    if archived := archive_finished_games():
+        logger.info("Archived %d finished games", archived)
+
+
+def _run_archive() -> None:
+    """
+    Archive finished games now, then at the start of every ARCHIVE_INTERVAL, until
+    stopped. Failed runs are retried after RETRY_DELAY.
+    """
+    while not _stopped.is_set():
+        now = datetime.now()
+        due = now - (now - datetime.min) % ARCHIVE_INTERVAL
+
+        try:
+            run_once("archive", due, _archive)
+        except Exception:
+            logger.exception("Archiving finished games failed, retrying")
+            _stopped.wait(RETRY_DELAY.total_seconds())
+            continue
+
+        _stopped.wait((due + ARCHIVE_INTERVAL - datetime.now()).total_seconds())
+
+
+def start_maintenance() -> list[Thread]:
+    """
+    Start the maintenance threads. The queue is cleared once immediately, unless
+    another process already cleared it since the last clear time. Finished games are
+    archived immediately too, unless another process already did in this interval.
+    """
+    _stopped.clear()
+    threads = [
+        Thread(target=_run_daily_clear, name="maintenance", daemon=True),
+        Thread(target=_run_archive, name="archive", daemon=True)
+    ]
+    for thread in threads:
+        thread.start()
+
+    return threads
+
+
+def stop_maintenance() -> None:
+    """Stop the maintenance threads."""
+    _stopped.set()
@@ -1,13 +1,19 @@
 """Player class, interfaces with the database."""
 from pydantic import BaseModel, field_validator
-from pymongo import MongoClient
+from pymongo.errors import DuplicateKeyError
 
-from keys import KEYS
+from pool_queue.cache import MISSING, TTLCache
+from pool_queue.database import LazyCollection
 from pool_queue.utils import validate_phone_number
 
 
-# Create a connection to the database players collection
-PLAYER_COLL = MongoClient(KEYS.MongoDB.connect_str).PoolQueue.players
+# The database players collection, connected on first use
+PLAYER_COLL = LazyCollection("players")
+
+# Read-through cache in front of from_phone. Only registered players are cached, as
+# players are never changed or removed. Unregistered numbers aren't, since any process,
+# ex. another worker or a roster import, may register them.
+PLAYER_CACHE = TTLCache(max_size=2048, ttl=15 * 60, name="players")
 
 
 class PlayerNotFoundError(Exception):
@@ -16,6 +22,12 @@ class PlayerNotFoundError(Exception):
         super().__init__(f"Player with {lookup_method} {value} not found.")
 
 
+class PlayerAlreadyRegisteredError(Exception):
+    """Raised when registering a phone number that already has a player."""
+    def __init__(self, phone_number: str):
+        super().__init__(f"Player with phone number {phone_number} already registered.")
+
+
 class Player(BaseModel):
     """A pool player in or out of the queue."""
     name: str
@@ -27,23 +39,68 @@ class Player(BaseModel):
         return validate_phone_number(phone)
 
     @classmethod
-    def from_phone(cls, phone_number: str):
+    def _from_cached(cls, phone_number: str, player: dict | None) -> "Player":
         """
-        Get a player from their phone number. If no player is found, raise
-        PlayerNotFoundError.
+        Cache a lookup's result and parse it. If no player was found, raise
+        PlayerNotFoundError, without caching the miss.
         """
-        player = PLAYER_COLL.find_one({"phone_number": phone_number})
-
         if player is None:
             raise PlayerNotFoundError("phone number", phone_number)
 
+        PLAYER_CACHE.set(phone_number, player)
         return cls(**player)
 
+    @classmethod
+    def from_phone(cls, phone_number: str):
+        """
+        Get a player from their phone number. If no player is found, raise
+        PlayerNotFoundError. Registered players are served from PLAYER_CACHE when
+        possible.
+        """
+        player = PLAYER_CACHE.get(phone_number)
+
+        if player is MISSING:
+            player = PLAYER_COLL.find_one({"phone_number": phone_number}, {"_id": 0})
+
+        return cls._from_cached(phone_number, player)
+
+    @classmethod
+    async def afrom_phone(cls, phone_number: str):
+        """Async version of `from_phone`."""
+        player = PLAYER_CACHE.get(phone_number)
+
+        if player is MISSING:
+            player = await PLAYER_COLL.aio.find_one(
+                {"phone_number": phone_number}, {"_id": 0}
+            )
+
+        return cls._from_cached(phone_number, player)
+
     @classmethod
     def register(cls, name: str, phone_number: str):
-        """Register a new player. Phone number must be in 12223334455 format."""
+        """
+        Register a new player. Phone number must be in 12223334455 format. Raises
+        PlayerAlreadyRegisteredError if the phone number is already registered.
+        """
+        player = cls(name=name, phone_number=phone_number)
+
+        try:
+            PLAYER_COLL.insert_one(player.model_dump())
+        except DuplicateKeyError:
+            raise PlayerAlreadyRegisteredError(player.phone_number)
+
+        return player
+
+    @classmethod
+    async def aregister(cls, name: str, phone_number: str):
+        """Async version of `register`."""
         player = cls(name=name, phone_number=phone_number)
-        PLAYER_COLL.insert_one(player.model_dump())
+
+        try:
+            await PLAYER_COLL.aio.insert_one(player.model_dump())
+        except DuplicateKeyError:
+            raise PlayerAlreadyRegisteredError(player.phone_number)
+
         return player
 
     def __eq__(self, __value: object) -> bool:
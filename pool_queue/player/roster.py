@@ -0,0 +1,249 @@
+"""
+Bulk player registration from a venue's roster. Rosters are CSV or JSONL files with a
+name and phone number per player, streamed and registered in batches: each batch is
+validated, checked against existing players in one query, and written in one unordered
+insert. Rows that can't be registered are reported with the reason.
+
+    python -m pool_queue.player.roster roster.csv [--batch-size 1000]
+"""
+from pydantic import BaseModel, ValidationError
+from pymongo.errors import BulkWriteError
+
+import argparse
+import csv
+import json
+import os
+import sys
+from typing import Iterable, Iterator, TextIO
+
+from pool_queue.player import PLAYER_COLL, Player
+
+
+# Rows validated, checked and inserted at a time
+BATCH_SIZE = 1000
+
+# Mongo's duplicate key error code, ex. a player registered while importing
+DUPLICATE_KEY = 11000
+
+
+class RosterRow(BaseModel):
+    """
+    A row of a roster, as read. `line` is its line in the file, and `error` is set if
+    the row couldn't be read.
+    """
+    line: int
+    name: str = ""
+    phone_number: str = ""
+    error: str | None = None
+
+
+class RowError(BaseModel):
+    """A roster row that wasn't registered, and why."""
+    line: int
+    phone_number: str
+    error: str
+
+
+class RosterReport(BaseModel):
+    """Result of importing a roster."""
+    rows: int = 0
+    registered: int = 0
+    errors: list[RowError] = []
+
+
+def _read_csv(f: TextIO) -> Iterator[RosterRow]:
+    """Rows of a CSV roster with a header, naming `name` and `phone_number` columns."""
+    reader = csv.DictReader(f)
+    for record in reader:
+        yield RosterRow(
+            line=reader.line_num,
+            name=record.get("name") or "",
+            phone_number=record.get("phone_number") or record.get("phone") or ""
+        )
+
+
+def _read_jsonl(f: TextIO) -> Iterator[RosterRow]:
+    """Rows of a JSONL roster, one object with `name` and `phone_number` per line."""
+    for line, text in enumerate(f, start=1):
+        if not text.strip():
+            continue
+
+        try:
+            record = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield RosterRow(line=line, error=f"Invalid JSON: {e.msg}.")
+            continue
+
+        if not isinstance(record, dict):
+            yield RosterRow(line=line, error="Row must be an object.")
+            continue
+
+        yield RosterRow(
+            line=line,
+            name=str(record.get("name") or ""),
+            phone_number=str(record.get("phone_number") or record.get("phone") or "")
+        )
+
+
+def read_roster(path: str) -> Iterator[RosterRow]:
+    """Stream the rows of a roster, read as JSONL if it ends in .jsonl, else as CSV."""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if os.path.splitext(path)[1].lower() == ".jsonl":
+            yield from _read_jsonl(f)
+        else:
+            yield from _read_csv(f)
+
+
+def _batches(rows: Iterable[RosterRow], size: int) -> Iterator[list[RosterRow]]:
+    """Rows in lists of up to `size`."""
+    batch: list[RosterRow] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+def _validate(row: RosterRow) -> Player | str:
+    """The row's player, with a normalized phone number, or why it's invalid."""
+    if row.error:
+        return row.error
+
+    if not row.name.strip():
+        return "Name is missing."
+
+    try:
+        return Player(name=row.name.strip(), phone_number=row.phone_number.strip())
+    except ValidationError as e:
+        return e.errors()[0]["msg"]
+
+
+def _import_batch(
+    batch: list[RosterRow], seen: dict[str, int], report: RosterReport
+) -> None:
+    """
+    Register a batch of rows. `seen` maps the phone numbers of earlier rows to their
+    lines, so a number repeated in the roster is only registered once.
+    """
+    players: list[Player] = []
+    lines: list[int] = []
+
+    for row in batch:
+        player = _validate(row)
+        if isinstance(player, str):
+            report.errors.append(
+                RowError(line=row.line, phone_number=row.phone_number, error=player)
+            )
+            continue
+
+        if (first := seen.get(player.phone_number)) is not None:
+            report.errors.append(
+                RowError(
+                    line=row.line,
+                    phone_number=player.phone_number,
+                    error=f"Duplicate of line {first}."
+                )
+            )
+            continue
+
+        seen[player.phone_number] = row.line
+        players.append(player)
+        lines.append(row.line)
+
+    if not players:
+        return
+
+    existing = {
+        player["phone_number"]
+        for player in PLAYER_COLL.find(
+            {"phone_number": {"$in": [player.phone_number for player in players]}},
+            {"_id": 0, "phone_number": 1}
+        )
+    }
+
+    new_players = [
+        (line, player)
+        for line, player in zip(lines, players)
+        if player.phone_number not in existing
+    ]
+    report.errors.extend(
+        RowError(
+            line=line, phone_number=player.phone_number, error="Already registered."
+        )
+        for line, player in zip(lines, players)
+        if player.phone_number in existing
+    )
+
+    if new_players:
+        _insert(new_players, report)
+
+
+def _insert(new_players: list[tuple[int, Player]], report: RosterReport) -> None:
+    """
+    Insert players in one unordered write, so one failed row doesn't stop the rest,
+    and reporting the rows that failed.
+    """
+    try:
+        PLAYER_COLL.insert_many(
+            [player.model_dump() for _, player in new_players], ordered=False
+        )
+        report.registered += len(new_players)
+    except BulkWriteError as e:
+        report.registered += e.details["nInserted"]
+
+        for write_error in e.details["writeErrors"]:
+            line, player = new_players[write_error["index"]]
+            report.errors.append(
+                RowError(
+                    line=line,
+                    phone_number=player.phone_number,
+                    error=(
+                        "Already registered."
+                        if write_error["code"] == DUPLICATE_KEY
+                        else write_error["errmsg"]
+                    )
+                )
+            )
+
+
+def import_roster(
+    rows: Iterable[RosterRow], batch_size: int = BATCH_SIZE
+) -> RosterReport:
+    """
+    Register every valid, new player in the roster's rows, in batches of `batch_size`.
+    Returns how many were registered and why the other rows weren't.
+    """
+    report = RosterReport()
+    seen: dict[str, int] = {}
+
+    for batch in _batches(rows, batch_size):
+        report.rows += len(batch)
+        _import_batch(batch, seen, report)
+
+    report.errors.sort(key=lambda error: error.line)
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(prog="python -m pool_queue.player.roster")
+    parser.add_argument("roster", help="CSV or JSONL file of names and phone numbers")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args()
+
+    report = import_roster(read_roster(args.roster), args.batch_size)
+
+    for error in report.errors:
+        print(f"Line {error.line} ({error.phone_number or 'no number'}): {error.error}")
+
+    print(
+        f"Registered {report.registered} of {report.rows} rows, "
+        f"{len(report.errors)} not registered."
+    )
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,111 +1,411 @@
 """
-Queue of Players. If it's after 4am, all items from before 4am are removed.
-There will only be one item in this collection, being the queue itself.
+Queues of Players, one per table. If it's after 4am, all items from before 4am are
+removed. Each item in the queue collection is one player's place in a table's queue,
+ordered by a monotonic sequence number so positions are a single indexed count.
 """
-from pymongo import MongoClient
 from pydantic import BaseModel
+from bson.objectid import ObjectId
+from pymongo import ASCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from keys import KEYS
-from pool_queue.player import Player
+from pool_queue.database import LazyCollection
+from pool_queue.events import EVENT_BUS, EventType, QueueEvent
+from pool_queue.player import PLAYER_COLL, Player, PlayerNotFoundError
+from pool_queue.table import DEFAULT_TABLE, Table
 
 
-# Create a connection to the database queue collection
-QUEUE_COLL = MongoClient(KEYS.MongoDB.connect_str).PoolQueue.queue
+# The database queue collection, connected on first use
+QUEUE_COLL = LazyCollection("queue")
 
+# Sequence number counters, see `PlayerQueue._next_seq`
+COUNTER_COLL = LazyCollection("counters")
 
-# Ensure there is only one item in the queue collection
-if QUEUE_COLL.count_documents({}) == 0:
-    QUEUE_COLL.insert_one({"players": []})
-elif QUEUE_COLL.count_documents({}) > 1:
-    raise RuntimeError("There should only be one item in the queue collection.")
+# Hour of the day the queue is cleared
+DAILY_CLEAR_HOUR = 4
+
+
+def last_daily_clear(now: datetime | None = None) -> datetime:
+    """The most recent time the queue was due to be cleared."""
+    now = now or datetime.now()
+    cutoff = now.replace(hour=DAILY_CLEAR_HOUR, minute=0, second=0, microsecond=0)
+    return cutoff if cutoff <= now else cutoff - timedelta(days=1)
+
+
+def _phone(player: Player | str) -> str:
+    """The phone number of a player, given as a Player object or a phone number."""
+    return player.phone_number if isinstance(player, Player) else player
 
 
 class QueueItem(BaseModel):
-    """Item in the queue."""
+    """
+    Item in a table's queue. Items are ordered by `seq`: players joining the back of
+    the queue count up from 1, players put back at the front count down from -1.
+    A player can only be in one table's queue at a time.
+    """
     player_phone: str
     datetime_added: datetime
+    seq: int
+    venue: str
+    table: str
+
+
+class QueueSnapshot(BaseModel):
+    """
+    The queue hydrated into players, in queue order, with the IDs of their queue
+    entries. `missing` holds the phone numbers of queue entries whose player record
+    couldn't be found.
+    """
+    players: list[Player]
+    entry_ids: list[str]
+    missing: list[str]
 
 
 class PlayerQueue(BaseModel):
-    """Queue of players."""
+    """Queue of players for a table."""
+    table: Table = DEFAULT_TABLE
+
+    @classmethod
+    def bootstrap(cls) -> None:
+        """
+        Migrate queues stored in older formats: a single item holding an array of
+        players becomes one item per player, and items from before queues were
+        partitioned by table are assigned to the default table. Run once at startup,
+        see `pool_queue.startup`.
+        """
+        QUEUE_COLL.update_many(
+            {"player_phone": {"$exists": True}, "venue": {"$exists": False}},
+            {"$set": DEFAULT_TABLE.key}
+        )
+
+        legacy = QUEUE_COLL.find_one({"players": {"$exists": True}})
+        if legacy is None:
+            return
+
+        # Keep each player's place and join time, so the daily clear still removes
+        # players who joined before it
+        default_queue = cls()
+        for legacy_item in legacy["players"]:
+            item = default_queue._new_item(
+                legacy_item["player_phone"],
+                default_queue._next_seq(front=False),
+                added=legacy_item.get("datetime_added")
+            )
+            try:
+                QUEUE_COLL.insert_one(item.model_dump())
+            except DuplicateKeyError:  # migrated before an interrupted startup
+                continue
+
+        QUEUE_COLL.delete_one({"_id": legacy["_id"]})
+
+    @classmethod
+    def for_player(cls, player: Player | str) -> "PlayerQueue | None":
+        """The queue a player is in, or None if they aren't in any queue."""
+        item = QUEUE_COLL.find_one(
+            {"player_phone": _phone(player)}, {"venue": 1, "table": 1}
+        )
+        return cls(table=Table.from_document(item)) if item else None
+
+    @classmethod
+    async def afor_player(cls, player: Player | str) -> "PlayerQueue | None":
+        """Async version of `for_player`."""
+        item = await QUEUE_COLL.aio.find_one(
+            {"player_phone": _phone(player)}, {"venue": 1, "table": 1}
+        )
+        return cls(table=Table.from_document(item)) if item else None
+
+    @staticmethod
+    def _lengths_pipeline(tables: list[Table]) -> list[dict]:
+        """Aggregation counting the items in each of the tables' queues."""
+        return [
+            {
+                "$match": {
+                    "venue": {"$in": list({table.venue for table in tables})},
+                    "table": {"$in": list({table.table for table in tables})}
+                }
+            },
+            {
+                "$group": {
+                    "_id": {"venue": "$venue", "table": "$table"},
+                    "length": {"$sum": 1}
+                }
+            }
+        ]
+
+    @classmethod
+    def _shortest_of(cls, tables: list[Table], lengths: list[dict]) -> "PlayerQueue":
+        """The queue of the table with the fewest items, the first such table on ties."""
+        by_table = {Table(**length["_id"]): length["length"] for length in lengths}
+        return cls(table=min(tables, key=lambda table: by_table.get(table, 0)))
+
+    @classmethod
+    def shortest(cls, tables: list[Table]) -> "PlayerQueue":
+        """
+        The shortest queue of the given tables, to balance players across tables.
+        Counted in a single aggregation.
+        """
+        lengths = QUEUE_COLL.aggregate(cls._lengths_pipeline(tables))
+        return cls._shortest_of(tables, lengths)
+
+    @classmethod
+    async def ashortest(cls, tables: list[Table]) -> "PlayerQueue":
+        """Async version of `shortest`."""
+        cursor = QUEUE_COLL.aio.aggregate(cls._lengths_pipeline(tables))
+        return cls._shortest_of(tables, await cursor.to_list(length=None))
+
+    def _counter_update(self, front: bool) -> tuple[dict, dict]:
+        """Filter and update for the counter of the back or front of the queue."""
+        if front:
+            return {"_id": f"queue_front:{self.table.id}"}, {"$inc": {"seq": -1}}
+
+        return {"_id": f"queue:{self.table.id}"}, {"$inc": {"seq": 1}}
+
+    def _next_seq(self, front: bool) -> int:
+        """Next sequence number for the back or front of the queue."""
+        counter = COUNTER_COLL.find_one_and_update(
+            *self._counter_update(front),
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    async def _anext_seq(self, front: bool) -> int:
+        """Async version of `_next_seq`."""
+        counter = await COUNTER_COLL.aio.find_one_and_update(
+            *self._counter_update(front),
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    def _player_filter(self, player: Player | str) -> dict:
+        """Filter for a player's item in this queue."""
+        return {"player_phone": _phone(player), **self.table.key}
 
     def player_in_queue(self, player: Player | str) -> bool:
         """
         Check if a player is in the queue. `player` can be a Player object or a phone
         number.
         """
-        player_phone = player.phone_number if isinstance(player, Player) else player
-        return bool(QUEUE_COLL.find_one({"players.player_phone": player_phone}))
+        return bool(QUEUE_COLL.find_one(self._player_filter(player), {"_id": 1}))
+
+    async def aplayer_in_queue(self, player: Player | str) -> bool:
+        """Async version of `player_in_queue`."""
+        return bool(
+            await QUEUE_COLL.aio.find_one(self._player_filter(player), {"_id": 1})
+        )
+
+    def _snapshot_pipeline(self, limit: int | None) -> list[dict]:
+        """
+        Aggregation joining each queue entry to its player record with $lookup, in
+        queue order, rather than one lookup per entry. With a `limit`, entries whose
+        player record is missing are skipped rather than counted towards it.
+        """
+        pipeline = [
+            {"$match": self.table.key},
+            {"$sort": {"seq": ASCENDING}},
+            {"$project": {"player_phone": 1}},
+            {
+                "$lookup": {
+                    "from": PLAYER_COLL.name,
+                    "localField": "player_phone",
+                    "foreignField": "phone_number",
+                    "as": "player"
+                }
+            }
+        ]
+        if limit is not None:
+            pipeline += [{"$match": {"player": {"$ne": []}}}, {"$limit": limit}]
+
+        return pipeline
+
+    @staticmethod
+    def _parse_snapshot(entries: list[dict]) -> QueueSnapshot:
+        """Parse the results of the snapshot aggregation."""
+        players: list[Player] = []
+        entry_ids: list[str] = []
+        missing: list[str] = []
+        for entry in entries:
+            if not entry["player"]:
+                missing.append(entry["player_phone"])
+                continue
+
+            players.append(Player(**entry["player"][0]))
+            entry_ids.append(str(entry["_id"]))
+
+        return QueueSnapshot(players=players, entry_ids=entry_ids, missing=missing)
+
+    def snapshot(self, limit: int | None = None) -> QueueSnapshot:
+        """
+        Hydrate the queue into players in a single aggregation. If `limit` is given,
+        only the first `limit` players found are hydrated, and missing records aren't
+        reported.
+        """
+        return self._parse_snapshot(QUEUE_COLL.aggregate(self._snapshot_pipeline(limit)))
+
+    async def asnapshot(self, limit: int | None = None) -> QueueSnapshot:
+        """Async version of `snapshot`."""
+        cursor = QUEUE_COLL.aio.aggregate(self._snapshot_pipeline(limit))
+        return self._parse_snapshot(await cursor.to_list(length=None))
 
     def get_queue(self) -> list[Player]:
         """Get the queue."""
-        players: list[dict] = QUEUE_COLL.find_one({})["players"]
-        return [Player.from_phone(p["player_phone"]) for p in players]
+        return self.snapshot().players
+
+    async def aget_queue(self) -> list[Player]:
+        """Async version of `get_queue`."""
+        return (await self.asnapshot()).players
 
-    def add(self, player: Player | str) -> bool:
+    @staticmethod
+    def _joined_event(
+        item: QueueItem, entry_id: ObjectId, player: Player | str
+    ) -> QueueEvent:
+        """Event for a player joining the queue."""
+        return QueueEvent.joined(
+            venue=item.venue,
+            table=item.table,
+            entry_id=str(entry_id),
+            name=player.name if isinstance(player, Player) else None,
+            seq=item.seq
+        )
+
+    def _new_item(
+        self, player: Player | str, seq: int, added: datetime | None = None
+    ) -> QueueItem:
+        """
+        A queue item for a player with sequence number `seq`, who joined at `added`,
+        or now.
+        """
+        return QueueItem(
+            player_phone=_phone(player),
+            datetime_added=added or datetime.now(),
+            seq=seq,
+            **self.table.key
+        )
+
+    def add(self, player: Player | str, front: bool = False) -> bool:
         """
         Add a player to the queue. `player` can be a Player object or a phone number.
         Returns True if the player was added, False if the player was already in the
-        queue.
+        queue, which the unique index on player_phone enforces. If `front` is True,
+        the player is added to the front of the queue rather than the back.
         """
-        player_phone = player.phone_number if isinstance(player, Player) else player
+        item = self._new_item(player, self._next_seq(front))
 
-        # Check if the player is already in the queue
-        if self.player_in_queue(player_phone):
+        try:
+            res = QUEUE_COLL.insert_one(item.model_dump())
+        except DuplicateKeyError:
             return False
 
-        item = QueueItem(player_phone=player_phone, datetime_added=datetime.now())
-        QUEUE_COLL.update_one(
-            {},
-            {"$push": {"players": item.model_dump()}}
-        )
+        EVENT_BUS.emit(self._joined_event(item, res.inserted_id, player))
+        return True
 
+    async def aadd(self, player: Player | str, front: bool = False) -> bool:
+        """Async version of `add`."""
+        item = self._new_item(player, await self._anext_seq(front))
+
+        try:
+            res = await QUEUE_COLL.aio.insert_one(item.model_dump())
+        except DuplicateKeyError:
+            return False
+
+        EVENT_BUS.emit(self._joined_event(item, res.inserted_id, player))
         return True
 
+    def _ahead_filter(self, item: dict) -> dict:
+        """Filter for the items up to and including `item` in the queue."""
+        return {**self.table.key, "seq": {"$lte": item["seq"]}}
+
     def get_position(self, player: Player | str) -> int:
         """
         Get the position of a player in the queue. `player` can be a Player object or a
         phone number. Returns -1 if the player is not in the queue.
         """
-        player_phone = player.phone_number if isinstance(player, Player) else player
+        item = QUEUE_COLL.find_one(self._player_filter(player), {"seq": 1})
+
+        if item is None:
+            return -1
 
-        # Check if the player is in the queue
-        if not self.player_in_queue(player_phone):
+        return QUEUE_COLL.count_documents(self._ahead_filter(item))
+
+    async def aget_position(self, player: Player | str) -> int:
+        """Async version of `get_position`."""
+        item = await QUEUE_COLL.aio.find_one(self._player_filter(player), {"seq": 1})
+
+        if item is None:
             return -1
 
-        players: list[dict] = QUEUE_COLL.find_one({})["players"]
-        player: dict = next(filter(lambda p: p["player_phone"] == player_phone, players))
-        return players.index(player) + 1
+        return await QUEUE_COLL.aio.count_documents(self._ahead_filter(item))
 
     def find_next_player(self) -> Player | None:
-        """Find the next player in the queue. Returns None if the queue is empty."""
-        if len(queue := self.get_queue()) == 0:
-            return None
+        """
+        Find the next player in the queue, skipping entries whose player record is
+        missing. Returns None if the queue has no players.
+        """
+        return next(iter(self.snapshot(limit=1).players), None)
+
+    async def afind_next_player(self) -> Player | None:
+        """Async version of `find_next_player`."""
+        return next(iter((await self.asnapshot(limit=1)).players), None)
 
-        return queue[0]
+    def _emit_left(self, item: dict | None) -> bool:
+        """Announce a deleted item leaving the queue. Returns whether there was one."""
+        if item is None:
+            return False
+
+        EVENT_BUS.emit(QueueEvent.left(str(item["_id"]), **self.table.key))
+        return True
+
+    def pop_next(self) -> Player | None:
+        """
+        Remove and return the next player in the queue, in one atomic delete, so
+        concurrent callers never get the same player. Entries whose player record is
+        missing are discarded. Returns None if the queue is empty.
+        """
+        while item := QUEUE_COLL.find_one_and_delete(
+            self.table.key, sort=[("seq", ASCENDING)]
+        ):
+            self._emit_left(item)
+            try:
+                return Player.from_phone(item["player_phone"])
+            except PlayerNotFoundError:
+                continue
+
+        return None
+
+    async def apop_next(self) -> Player | None:
+        """Async version of `pop_next`."""
+        while item := await QUEUE_COLL.aio.find_one_and_delete(
+            self.table.key, sort=[("seq", ASCENDING)]
+        ):
+            self._emit_left(item)
+            try:
+                return await Player.afrom_phone(item["player_phone"])
+            except PlayerNotFoundError:
+                continue
+
+        return None
 
     def remove(self, player: Player | str) -> bool:
         """
-        Remove a player from the queue. Returns True if the player was removed, 
+        Remove a player from the queue. Returns True if the player was removed,
         False if the player was not in the queue.
         """
-        # Check if the player is in the queue
-        if not self.player_in_queue(player):
-            return False
+        item = QUEUE_COLL.find_one_and_delete(self._player_filter(player), {"_id": 1})
+        return self._emit_left(item)
 
-        player_phone = player.phone_number if isinstance(player, Player) else player
-        QUEUE_COLL.update_one(
-            {},
-            {"$pull": {"players": {"player_phone": player_phone}}}
+    async def aremove(self, player: Player | str) -> bool:
+        """Async version of `remove`."""
+        item = await QUEUE_COLL.aio.find_one_and_delete(
+            self._player_filter(player), {"_id": 1}
         )
+        return self._emit_left(item)
 
-        return True
-
+    @classmethod
     def daily_clear(cls) -> None:
-        """Clear the queue of all players added before 4am."""
-        QUEUE_COLL.update_one(
-            {},
-            {"$pull": {"players": {"datetime_added": {"$lt": datetime.now().replace(hour=4)}}}}
-        )
+        """Clear every table's queue of all players added before the most recent 4am."""
+        res = QUEUE_COLL.delete_many({"datetime_added": {"$lt": last_daily_clear()}})
+
+        if res.deleted_count:
+            EVENT_BUS.emit(QueueEvent(type=EventType.CLEARED))
@@ -0,0 +1,105 @@
+"""
+Outbound SMS. Messages go through a pluggable sender: the Twilio REST API when it's
+configured, otherwise a local stub that logs and records them, ex. for testing.
+"""
+from abc import ABC, abstractmethod
+import asyncio
+import base64
+import logging
+from collections import deque
+from threading import Lock
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from keys import KEYS
+
+
+logger = logging.getLogger(__name__)
+
+# Twilio's endpoint for sending messages from an account
+TWILIO_MESSAGES_URL = "https://api.twilio.com/2010-04-01/Accounts/{sid}/Messages.json"
+
+# Seconds to wait for Twilio to accept a message
+SEND_TIMEOUT = 10
+
+
+class SmsSender(ABC):
+    """Sends text messages. Subclasses implement `send`."""
+
+    @abstractmethod
+    def send(self, to_phone: str, body: str) -> None:
+        """Text `body` to a phone number."""
+
+    async def asend(self, to_phone: str, body: str) -> None:
+        """Async version of `send`, sending on a worker thread."""
+        await asyncio.to_thread(self.send, to_phone, body)
+
+
+class TwilioSender(SmsSender):
+    """Sends messages through the Twilio REST API, using the Twilio keys."""
+
+    @staticmethod
+    def _message_request(to_phone: str, body: str) -> Request:
+        """A Twilio request sending `body` to `to_phone`."""
+        twilio = KEYS.Twilio
+        credentials = f"{twilio.account_sid}:{twilio.auth_token}".encode()
+
+        return Request(
+            TWILIO_MESSAGES_URL.format(sid=twilio.account_sid),
+            data=urlencode(
+                {"To": f"+{to_phone}", "From": twilio.from_number, "Body": body}
+            ).encode(),
+            headers={"Authorization": f"Basic {base64.b64encode(credentials).decode()}"}
+        )
+
+    def send(self, to_phone: str, body: str) -> None:
+        with urlopen(self._message_request(to_phone, body), timeout=SEND_TIMEOUT):
+            pass
+
+
+class StubSender(SmsSender):
+    """Logs messages instead of sending them, keeping the most recent in `sent`."""
+
+    def __init__(self, max_kept: int = 1000):
+        self.sent: deque[tuple[str, str]] = deque(maxlen=max_kept)
+
+    def send(self, to_phone: str, body: str) -> None:
+        logger.info("SMS to %s: %s", to_phone, body)
+        self.sent.append((to_phone, body))
+
+    async def asend(self, to_phone: str, body: str) -> None:
+        self.send(to_phone, body)
+
+
+_sender: SmsSender | None = None
+_sender_lock = Lock()
+
+
+def get_sender() -> SmsSender:
+    """The outbound sender, Twilio if it's configured and otherwise the stub."""
+    global _sender
+
+    if _sender is None:
+        with _sender_lock:
+            if _sender is None:
+                _sender = TwilioSender() if KEYS.Twilio is not None else StubSender()
+
+    return _sender
+
+
+def set_sender(sender: SmsSender) -> None:
+    """Send all outbound messages through `sender`."""
+    global _sender
+
+    with _sender_lock:
+        _sender = sender
+
+
+def send_sms(to_phone: str, body: str) -> None:
+    """Text `body` to a phone number through the outbound sender."""
+    get_sender().send(to_phone, body)
+
+
+async def asend_sms(to_phone: str, body: str) -> None:
+    """Async version of `send_sms`."""
+    await get_sender().asend(to_phone, body)
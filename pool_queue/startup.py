@@ -0,0 +1,79 @@
+"""
+Startup hook. Run once per process before serving requests. The agent, its LLM and the
+database clients are otherwise built on first use, so importing the API stays cheap;
+pre-warming builds them in the background while the process starts serving.
+"""
+import logging
+from threading import Thread
+
+from pool_queue.history import ChatHistory
+from pool_queue.database import get_client
+from pool_queue.events.change_streams import start_change_streams
+from pool_queue.game import Game
+from pool_queue.player_queue import PlayerQueue
+from pool_queue.indexes import ensure_indexes, verify_query_plans
+from pool_queue.maintenance import start_maintenance
+from pool_queue.telemetry import start_metrics_export
+from pool_queue.timers import start_timers
+
+from keys import KEYS
+
+
+logger = logging.getLogger(__name__)
+
+
+def _warm() -> None:
+    """Import the agent, build its LLM and executors, and connect to the database."""
+    try:
+        from pool_queue import agent
+
+        agent.get_llm()
+        for registered in (True, False):
+            agent.get_agent_executor(registered)
+
+        get_client().admin.command("ping")
+    except Exception:
+        logger.exception("Pre-warming failed, continuing to build on first use")
+
+
+def prewarm(background: bool = True) -> Thread | None:
+    """
+    Build what's otherwise built while answering the first message. If `background`
+    is True, do so on a daemon thread and return it.
+    """
+    if not background:
+        _warm()
+        return None
+
+    thread = Thread(target=_warm, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def startup(check_query_plans: bool = False) -> None:
+    """
+    Prepare the database for serving requests, and start scheduled maintenance,
+    challenger deadlines, the live event feed and metrics export. If
+    `check_query_plans` is True, raise QueryPlanError if any hot query would scan its
+    whole collection.
+
+    Migrations and index creation can be skipped, and pre-warming turned off, in the
+    Startup keys.
+    """
+    if KEYS.Startup.migrate:
+        # Indexes first, so migrated documents are checked by the unique indexes
+        ensure_indexes()
+        Game.bootstrap()
+        PlayerQueue.bootstrap()
+        ChatHistory.bootstrap()
+
+    if check_query_plans:
+        verify_query_plans()
+
+    start_maintenance()
+    start_timers()
+    start_change_streams()
+    start_metrics_export()
+
+    if KEYS.Startup.prewarm:
+        prewarm()
@@ -0,0 +1,68 @@
+"""Table class. Queues and games are partitioned by (venue, table)."""
+from pydantic import BaseModel, ConfigDict
+
+from pool_queue.database import LazyCollection
+
+
+# The database tables collection, listing the practice tables at each venue
+TABLE_COLL = LazyCollection("tables")
+
+# Venue and table used when none is specified, ex. by deployments with one table
+DEFAULT_VENUE = "default"
+DEFAULT_TABLE_NAME = "1"
+
+
+class Table(BaseModel):
+    """A practice table at a venue."""
+    venue: str
+    table: str
+
+    # Hashable, so tables can key counters and timers
+    model_config = ConfigDict(frozen=True)
+
+    @property
+    def key(self) -> dict:
+        """Fields identifying the table's partition in queue and game documents."""
+        return {"venue": self.venue, "table": self.table}
+
+    @property
+    def id(self) -> str:
+        """Unique string identifier of the table."""
+        return f"{self.venue}:{self.table}"
+
+    @classmethod
+    def from_document(cls, document: dict) -> "Table":
+        """The table a queue or game document belongs to."""
+        return cls(venue=document["venue"], table=document["table"])
+
+    @classmethod
+    def at_venue(cls, venue: str) -> list["Table"]:
+        """
+        All registered tables at a venue, in order of name. A venue with no registered
+        tables has a single default table.
+        """
+        tables = TABLE_COLL.find({"venue": venue}, {"_id": 0}).sort("table")
+        return [cls(**table) for table in tables] or [cls.default(venue)]
+
+    @classmethod
+    async def aat_venue(cls, venue: str) -> list["Table"]:
+        """Async version of `at_venue`."""
+        cursor = TABLE_COLL.aio.find({"venue": venue}, {"_id": 0}).sort("table")
+        return [cls(**table) for table in await cursor.to_list(length=None)] or [
+            cls.default(venue)
+        ]
+
+    @classmethod
+    def register(cls, venue: str, table: str) -> "Table":
+        """Register a table at a venue, if it isn't registered already."""
+        new_table = cls(venue=venue, table=table)
+        TABLE_COLL.update_one(new_table.key, {"$setOnInsert": new_table.key}, upsert=True)
+        return new_table
+
+    @classmethod
+    def default(cls, venue: str = DEFAULT_VENUE) -> "Table":
+        """The default table at a venue."""
+        return cls(venue=venue, table=DEFAULT_TABLE_NAME)
+
+
+DEFAULT_TABLE = Table.default()
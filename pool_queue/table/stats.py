@@ -0,0 +1,157 @@
+"""
+Running statistics of each table: how long games last, how long called challengers
+take to arrive, how often they don't, and how many games the table gets through per
+hour. Kept as sums and counts updated by a single increment on each game transition,
+see `Game`, so they never scan game history, and used to estimate queue wait times.
+"""
+from pydantic import BaseModel, ConfigDict
+
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import TYPE_CHECKING
+
+from pool_queue.database import LazyCollection
+from pool_queue.table import Table
+
+if TYPE_CHECKING:
+    from pool_queue.game import Game
+
+
+# The database table statistics collection, one document per table
+STATS_COLL = LazyCollection("table_stats")
+
+# Used in place of a table's averages until it has this many samples
+MIN_SAMPLES = 3
+DEFAULT_GAME_SECONDS = 15 * 60
+DEFAULT_ARRIVAL_SECONDS = 60
+
+
+class Transition(Enum):
+    """
+    A game transition that adds to its table's statistics.
+
+    ARRIVAL: A called challenger arrived and was confirmed, starting the game.
+    GAME: A game in progress finished.
+    NO_SHOW: A called challenger didn't arrive in time.
+    """
+    ARRIVAL = "arrival"
+    GAME = "game"
+    NO_SHOW = "no_show"
+
+    def update(self, seconds: float) -> dict:
+        """Update adding a transition that took `seconds` to a table's statistics."""
+        counts = {
+            Transition.ARRIVAL: ("arrivals", "arrival_seconds"),
+            Transition.GAME: ("games", "game_seconds"),
+            Transition.NO_SHOW: ("no_shows", "no_show_seconds")
+        }
+        count, total = counts[self]
+
+        # Busy time counts everything that occupies the table, for throughput
+        return {"$inc": {count: 1, total: seconds, "busy_seconds": seconds}}
+
+
+def record(table: Table, transition: Transition, seconds: float) -> None:
+    """Add a transition that took `seconds` to the table's statistics."""
+    STATS_COLL.update_one({"_id": table.id}, transition.update(seconds), upsert=True)
+
+
+async def arecord(table: Table, transition: Transition, seconds: float) -> None:
+    """Async version of `record`."""
+    await STATS_COLL.aio.update_one(
+        {"_id": table.id}, transition.update(seconds), upsert=True
+    )
+
+
+class TableStats(BaseModel):
+    """A table's running statistics, with averages and wait-time estimates."""
+    games: int = 0
+    game_seconds: float = 0
+    arrivals: int = 0
+    arrival_seconds: float = 0
+    no_shows: int = 0
+    no_show_seconds: float = 0
+    busy_seconds: float = 0
+
+    # Ignore the document's _id
+    model_config = ConfigDict(extra="ignore")
+
+    @classmethod
+    def for_table(cls, table: Table) -> "TableStats":
+        """The table's statistics, empty if it has none yet."""
+        return cls(**(STATS_COLL.find_one({"_id": table.id}) or {}))
+
+    @classmethod
+    async def afor_table(cls, table: Table) -> "TableStats":
+        """Async version of `for_table`."""
+        return cls(**(await STATS_COLL.aio.find_one({"_id": table.id}) or {}))
+
+    @property
+    def mean_game_seconds(self) -> float:
+        """Average length of a game."""
+        if self.games < MIN_SAMPLES:
+            return DEFAULT_GAME_SECONDS
+
+        return self.game_seconds / self.games
+
+    @property
+    def mean_arrival_seconds(self) -> float:
+        """Average time for a called challenger to arrive and be confirmed."""
+        if self.arrivals < MIN_SAMPLES:
+            return DEFAULT_ARRIVAL_SECONDS
+
+        return self.arrival_seconds / self.arrivals
+
+    @property
+    def no_show_rate(self) -> float:
+        """Fraction of called challengers who didn't arrive in time."""
+        called = self.arrivals + self.no_shows
+        return self.no_shows / called if called >= MIN_SAMPLES else 0
+
+    @property
+    def seconds_per_player(self) -> float:
+        """
+        Expected time the table spends on each player called from the queue: an
+        arrival and a game, or waiting out a no-show.
+        """
+        played = self.mean_arrival_seconds + self.mean_game_seconds
+        if not self.no_shows:
+            return played
+
+        no_show = self.no_show_seconds / self.no_shows
+        return (1 - self.no_show_rate) * played + self.no_show_rate * no_show
+
+    @property
+    def throughput_per_hour(self) -> float:
+        """Games finished per hour the table is in use."""
+        if self.games < MIN_SAMPLES or not self.busy_seconds:
+            return 3600 / self.seconds_per_player
+
+        return 3600 * self.games / self.busy_seconds
+
+    def _current_game_seconds(self, game: "Game | None", now: datetime) -> float:
+        """Expected time left for the table's live game, if any."""
+        if game is None:
+            return 0
+
+        # In progress
+        if game.started_at is not None:
+            elapsed = (now - game.started_at).total_seconds()
+            return max(0, self.mean_game_seconds - elapsed)
+
+        # Waiting for the challenger, or a game from before timestamps were recorded
+        if game.created_at is None:
+            return self.mean_game_seconds
+
+        elapsed = (now - game.created_at).total_seconds()
+        return max(0, self.mean_arrival_seconds - elapsed) + self.mean_game_seconds
+
+    def eta(
+        self, position: int, game: "Game | None" = None, now: datetime | None = None
+    ) -> timedelta:
+        """
+        Expected wait until the player at `position` in the queue is called to the
+        table, given the table's live game, if any. Constant time in the position.
+        """
+        current = self._current_game_seconds(game, now or datetime.now())
+        return timedelta(seconds=current + (position - 1) * self.seconds_per_player)
@@ -0,0 +1,403 @@
+"""
+Per-turn tracing and process metrics. Each message handled is a turn: the agent's LLM
+calls, its tools (see `pool_queue.agent.callbacks`) and every Mongo command made while
+handling it are recorded as spans on the turn, which is logged as one JSON line when
+it ends. The same timings feed latency histograms, served in the Prometheus text
+format by `api.metrics`.
+
+Metrics are recorded per process. Each server worker writes its own to a directory
+shared with the others every few seconds, and serves the totals of all of them, so a
+scrape reaching any worker sees the whole server.
+"""
+from pydantic import BaseModel, Field
+from pymongo import monitoring
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import cached_property
+from hashlib import sha256
+from pathlib import Path
+from threading import Event, Lock, Thread
+from typing import Any, Iterator
+import json
+import logging
+import os
+import tempfile
+import time
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of latency histogram buckets, in seconds
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30
+)
+
+# Upper bounds of per-turn count histogram buckets
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# Where each process writes its metrics, one file per process. Server workers are
+# children of the same process, so share a directory.
+METRICS_DIR = Path(tempfile.gettempdir()) / "pool-queue-metrics" / str(os.getppid())
+
+# Seconds between writes of this process's metrics, see `start_metrics_export`
+METRICS_EXPORT_INTERVAL = 5
+
+_export_stopped = Event()
+
+
+class Histogram:
+    """A Prometheus-style histogram, with a series per combination of label values."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple[str, ...], list] = {}
+        self._lock = Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record a value in the series of the given label values."""
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+
+        with self._lock:
+            # Bucket counts, then the sum and count of all values
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            bucket = bisect_left(self.buckets, value)
+            if bucket < len(self.buckets):
+                series[0][bucket] += 1
+
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> list:
+        """This process's series, as [label values, [bucket counts, sum, count]]."""
+        with self._lock:
+            return [
+                [list(key), [list(counts), total, count]]
+                for key, (counts, total, count) in self._series.items()
+            ]
+
+    @staticmethod
+    def combine(series: list, other: list) -> list:
+        """Two processes' values of a series, added together."""
+        return [
+            [count + other_count for count, other_count in zip(series[0], other[0])],
+            series[1] + other[1],
+            series[2] + other[2]
+        ]
+
+    def render(self, series: dict[tuple[str, ...], list]) -> list[str]:
+        """The histogram's series in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} histogram"
+        ]
+
+        for key, (counts, total, count) in sorted(series.items()):
+            labels = [f'{label}="{value}"' for label, value in zip(self.labels, key)]
+
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket = _labels(labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{bucket} {cumulative}")
+
+            bucket = _labels(labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket} {count}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+
+        return lines
+
+
+class Counter:
+    """A Prometheus-style counter, with a series per combination of label values."""
+
+    def __init__(self, name: str, description: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self._series: dict[tuple[str, ...], float] = {}
+        self._lock = Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increment the series of the given label values."""
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def snapshot(self) -> list:
+        """This process's series, as [label values, value]."""
+        with self._lock:
+            return [[list(key), value] for key, value in self._series.items()]
+
+    @staticmethod
+    def combine(series: float, other: float) -> float:
+        """Two processes' values of a series, added together."""
+        return series + other
+
+    def render(self, series: dict[tuple[str, ...], float]) -> list[str]:
+        """The counter's series in the Prometheus text exposition format."""
+        lines = [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter"
+        ]
+
+        for key, value in sorted(series.items()):
+            labels = [f'{label}="{value}"' for label, value in zip(self.labels, key)]
+            lines.append(f"{self.name}{_labels(labels)} {value}")
+
+        return lines
+
+
+def _labels(labels: list[str], *extra: str) -> str:
+    """A series' label set, ex. `{route="agent",le="0.5"}`, or nothing if it has none."""
+    labels = [*labels, *extra]
+    return "{" + ",".join(labels) + "}" if labels else ""
+
+
+TURN_SECONDS = Histogram(
+    "pool_queue_turn_seconds", "Time to answer a message.", labels=("route",)
+)
+TURN_ROUND_TRIPS = Histogram(
+    "pool_queue_turn_mongo_round_trips",
+    "Mongo commands made while answering a message.",
+    buckets=COUNT_BUCKETS
+)
+AGENT_ITERATIONS = Histogram(
+    "pool_queue_agent_iterations",
+    "Agent iterations taken to answer a message.",
+    buckets=COUNT_BUCKETS
+)
+LLM_SECONDS = Histogram("pool_queue_llm_seconds", "Latency of LLM calls.")
+TOOL_SECONDS = Histogram(
+    "pool_queue_tool_seconds", "Time spent running tools.", labels=("tool",)
+)
+MONGO_SECONDS = Histogram(
+    "pool_queue_mongo_command_seconds",
+    "Latency of Mongo commands.",
+    labels=("command",)
+)
+MONGO_COMMANDS = Counter(
+    "pool_queue_mongo_commands_total",
+    "Mongo commands made, by command and outcome.",
+    labels=("command", "outcome")
+)
+CACHE_LOOKUPS = Counter(
+    "pool_queue_cache_lookups_total",
+    "Lookups of named caches, by cache and whether they hit.",
+    labels=("cache", "result")
+)
+
+METRICS: list[Histogram | Counter] = [
+    TURN_SECONDS,
+    TURN_ROUND_TRIPS,
+    AGENT_ITERATIONS,
+    LLM_SECONDS,
+    TOOL_SECONDS,
+    MONGO_SECONDS,
+    MONGO_COMMANDS,
+    CACHE_LOOKUPS
+]
+
+
+def export_metrics() -> None:
+    """Write this process's metrics to its file in METRICS_DIR."""
+    METRICS_DIR.mkdir(parents=True, exist_ok=True)
+    path = METRICS_DIR / f"{os.getpid()}.json"
+
+    # Written aside and moved into place, so readers never see a partial file
+    partial = path.with_suffix(".partial")
+    snapshots = {metric.name: metric.snapshot() for metric in METRICS}
+    partial.write_text(json.dumps(snapshots))
+    os.replace(partial, path)
+
+
+def _combined_series() -> dict[str, dict[tuple[str, ...], Any]]:
+    """
+    The series of every metric, added up across every process's file, including
+    processes that have exited, so counts never go down.
+    """
+    export_metrics()
+    combined = {metric.name: {} for metric in METRICS}
+
+    for path in METRICS_DIR.glob("*.json"):
+        try:
+            snapshots = json.loads(path.read_text())
+        except (OSError, ValueError):
+            logger.warning("Skipping unreadable metrics file %s", path)
+            continue
+
+        for metric in METRICS:
+            series = combined[metric.name]
+            for key, value in snapshots.get(metric.name, []):
+                if (key := tuple(key)) in series:
+                    value = metric.combine(series[key], value)
+                series[key] = value
+
+    return combined
+
+
+def render_metrics() -> str:
+    """Every metric, totalled across processes, in the Prometheus text format."""
+    combined = _combined_series()
+    return "\n".join(
+        line for metric in METRICS for line in metric.render(combined[metric.name])
+    ) + "\n"
+
+
+def _run_export() -> None:
+    """Write this process's metrics every METRICS_EXPORT_INTERVAL, until stopped."""
+    while not _export_stopped.wait(METRICS_EXPORT_INTERVAL):
+        try:
+            export_metrics()
+        except OSError:
+            logger.exception("Writing metrics failed, retrying next interval")
+
+
+def start_metrics_export() -> Thread:
+    """Start writing this process's metrics periodically, for other workers to serve."""
+    _export_stopped.clear()
+    thread = Thread(target=_run_export, name="metrics", daemon=True)
+    thread.start()
+    return thread
+
+
+def stop_metrics_export() -> None:
+    """Stop the metrics thread."""
+    _export_stopped.set()
+
+
+def redact_phone(phone: str) -> str:
+    """
+    A stable, non-reversible stand-in for a phone number in logs, so one sender's
+    turns can be followed without logging their number.
+    """
+    return sha256(phone.encode()).hexdigest()[:12]
+
+
+class Span(BaseModel):
+    """A timed step of a turn."""
+    name: str
+    ms: float
+    attributes: dict[str, str] = Field(default_factory=dict)
+
+
+class Turn:
+    """
+    The spans of one message being handled. Spans can be recorded from other threads,
+    ex. Motor's, so recording is locked.
+    """
+
+    def __init__(self, phone: str):
+        self.phone = phone
+        self.route: str | None = None
+        self.spans: list[Span] = []
+        self.round_trips = 0
+        self.iterations = 0
+        self._started = time.perf_counter()
+        self._lock = Lock()
+
+    @cached_property
+    def callbacks(self) -> list:
+        """
+        LangChain callbacks recording the turn's LLM calls and tools. Built on first
+        use, so tracing doesn't import LangChain.
+        """
+        from pool_queue.agent.callbacks import AgentTelemetry
+
+        return [AgentTelemetry(self)]
+
+    @property
+    def tools(self) -> set[str]:
+        """Names of the tools run so far."""
+        with self._lock:
+            return {
+                span.attributes["tool"] for span in self.spans if span.name == "tool"
+            }
+
+    def record(self, name: str, seconds: float, **attributes: str) -> None:
+        """Record a span that took `seconds`."""
+        span = Span(name=name, ms=round(seconds * 1000, 3), attributes=attributes)
+
+        with self._lock:
+            self.spans.append(span)
+            if name == "mongo":
+                self.round_trips += 1
+
+    def finish(self) -> None:
+        """Observe the turn's totals and log it."""
+        seconds = time.perf_counter() - self._started
+        TURN_SECONDS.observe(seconds, route=self.route or "")
+        TURN_ROUND_TRIPS.observe(self.round_trips)
+        if self.iterations:
+            AGENT_ITERATIONS.observe(self.iterations)
+
+        logger.info(
+            json.dumps(
+                {
+                    "event": "turn",
+                    "phone": redact_phone(self.phone),
+                    "route": self.route,
+                    "ms": round(seconds * 1000, 3),
+                    "mongo_round_trips": self.round_trips,
+                    "agent_iterations": self.iterations,
+                    "spans": [span.model_dump() for span in self.spans]
+                }
+            )
+        )
+
+
+# The turn being handled, if any
+CURRENT_TURN: ContextVar[Turn | None] = ContextVar("current_turn", default=None)
+
+
+@contextmanager
+def turn(phone: str) -> Iterator[Turn]:
+    """Trace the handling of a message from `phone` within the block."""
+    current = Turn(phone)
+    token = CURRENT_TURN.set(current)
+
+    try:
+        yield current
+    finally:
+        CURRENT_TURN.reset(token)
+        current.finish()
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """
+    Times every Mongo command and records it on the current turn. Listeners are called
+    on the thread running the command, which Motor runs with the caller's context.
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        self._record(event, "success")
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        self._record(event, "failure")
+
+    @staticmethod
+    def _record(
+        event: monitoring.CommandSucceededEvent | monitoring.CommandFailedEvent,
+        outcome: str
+    ) -> None:
+        seconds = event.duration_micros / 1_000_000
+        MONGO_SECONDS.observe(seconds, command=event.command_name)
+        MONGO_COMMANDS.inc(command=event.command_name, outcome=outcome)
+
+        if (current := CURRENT_TURN.get()) is not None:
+            current.record("mongo", seconds, command=event.command_name, outcome=outcome)
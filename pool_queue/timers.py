@@ -0,0 +1,252 @@
+"""
+Challenger arrival deadlines. When a pending game's challenger doesn't arrive and get
+confirmed in time, the game is expired and the next player in the table's queue is
+called. Deadlines of every table are kept in one min-heap, served by a single
+background thread that sleeps until the earliest deadline rather than polling.
+
+Deadlines follow the game events on the event bus, which include other processes'
+games while a change stream feeds it, so only games pending at startup are loaded
+from the database.
+"""
+from bson.objectid import ObjectId
+
+from datetime import datetime
+import heapq
+import logging
+from threading import Condition, Thread
+from typing import Callable
+
+from pool_queue.events import EVENT_BUS, QueueEvent
+from pool_queue.game import (
+    CHALLENGER_ARRIVAL_WINDOW,
+    Game,
+    GameStatus,
+    LiveGameExistsError
+)
+from pool_queue.player import Player
+from pool_queue.player_queue import PlayerQueue
+from pool_queue.sms import asend_sms, send_sms
+from pool_queue.table import Table
+
+
+logger = logging.getLogger(__name__)
+
+# Text to a player called up from the queue to challenge the king
+CALLED_UP = (
+    "You're up! Head to table {table} to challenge {king}. If the king doesn't "
+    "confirm you've arrived within {minutes} minutes, you'll be skipped."
+)
+
+
+class DeadlineScheduler:
+    """
+    Calls `on_expire(key)` once each scheduled deadline passes, on a single thread.
+    Rescheduling or cancelling a key leaves its old heap entry in place, to be
+    skipped when it comes due.
+    """
+
+    def __init__(self, on_expire: Callable[[ObjectId], None]):
+        self._on_expire = on_expire
+        self._heap: list[tuple[datetime, ObjectId]] = []
+        self._deadlines: dict[ObjectId, datetime] = {}
+        self._condition = Condition()
+        self._running = False
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def schedule(self, key: ObjectId, deadline: datetime) -> None:
+        """Schedule or reschedule `key` to expire at `deadline`."""
+        with self._condition:
+            if self._deadlines.get(key) == deadline:  # already scheduled
+                return
+
+            self._deadlines[key] = deadline
+            heapq.heappush(self._heap, (deadline, key))
+
+            # Wake the thread, in case this is now the earliest deadline
+            self._condition.notify()
+
+    def cancel(self, key: ObjectId) -> None:
+        """Cancel `key`'s deadline, if it has one."""
+        with self._condition:
+            self._deadlines.pop(key, None)
+
+    def _next_due(self) -> ObjectId | None:
+        """
+        Wait until a deadline passes and return its key. Returns None once stopped.
+        Must be called holding the condition.
+        """
+        while self._running:
+            if not self._heap:
+                self._condition.wait()
+                continue
+
+            deadline, key = self._heap[0]
+            if self._deadlines.get(key) != deadline:  # cancelled or rescheduled
+                heapq.heappop(self._heap)
+                continue
+
+            if (wait := (deadline - datetime.now()).total_seconds()) > 0:
+                self._condition.wait(wait)
+                continue
+
+            heapq.heappop(self._heap)
+            del self._deadlines[key]
+            return key
+
+        return None
+
+    def _run(self) -> None:
+        """Expire deadlines as they pass, until stopped."""
+        while True:
+            with self._condition:
+                if (key := self._next_due()) is None:
+                    return
+
+            try:
+                self._on_expire(key)
+            except Exception:
+                logger.exception("Failed to expire %s", key)
+
+    def start(self) -> Thread:
+        """Start the scheduler thread."""
+        with self._condition:
+            self._running = True
+
+        thread = Thread(target=self._run, name="deadlines", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self) -> None:
+        """Stop the scheduler thread. Scheduled deadlines are kept."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+
+
+def _called_up(game: Game) -> str:
+    """Text telling a pending game's challenger they've been called up."""
+    return CALLED_UP.format(
+        table=game.table.table,
+        king=game.king.name,
+        minutes=int(CHALLENGER_ARRIVAL_WINDOW.total_seconds() // 60)
+    )
+
+
+def call_next_challenger(
+    king: Player, table: Table
+) -> tuple[Player | None, Game | None]:
+    """
+    Take the next player off the table's queue and create a pending game for them to
+    challenge the king, texting them that they're up. Returns the player called and
+    their game, or (None, None) if the queue is empty. If another game was started at
+    the table in the meantime, the player is put back at the front of the queue and
+    returned without a game.
+    """
+    table_queue = PlayerQueue(table=table)
+    if (challenger := table_queue.pop_next()) is None:
+        return None, None
+
+    try:
+        game = Game.create(king=king, challenger=challenger, table=table)
+    except LiveGameExistsError:
+        table_queue.add(challenger, front=True)
+        return challenger, None
+
+    try:
+        send_sms(challenger.phone_number, _called_up(game))
+    except Exception:
+        logger.exception("Couldn't text %s that they're up", challenger.name)
+
+    return challenger, game
+
+
+async def acall_next_challenger(
+    king: Player, table: Table
+) -> tuple[Player | None, Game | None]:
+    """Async version of `call_next_challenger`."""
+    table_queue = PlayerQueue(table=table)
+    if (challenger := await table_queue.apop_next()) is None:
+        return None, None
+
+    try:
+        game = await Game.acreate(king=king, challenger=challenger, table=table)
+    except LiveGameExistsError:
+        await table_queue.aadd(challenger, front=True)
+        return challenger, None
+
+    try:
+        await asend_sms(challenger.phone_number, _called_up(game))
+    except Exception:
+        logger.exception("Couldn't text %s that they're up", challenger.name)
+
+    return challenger, game
+
+
+def expire_challenger(game_id: ObjectId) -> None:
+    """
+    Expire a pending game whose challenger didn't arrive in time and call the next
+    player in the queue to challenge the king. Does nothing if the game was confirmed
+    in the meantime.
+    """
+    if (game := Game.expire_challenger(game_id)) is None:
+        return
+
+    logger.info(
+        "%s didn't arrive at %s in time, skipping", game.challenger.name, game.table.id
+    )
+
+    _, next_game = call_next_challenger(game.king, game.table)
+    if next_game:
+        logger.info(
+            "Called %s to challenge %s at %s",
+            next_game.challenger.name,
+            next_game.king.name,
+            next_game.table.id
+        )
+
+
+# Challenger deadlines of every table in this process
+CHALLENGER_TIMERS = DeadlineScheduler(expire_challenger)
+
+
+def watch_event(event: QueueEvent) -> None:
+    """
+    Schedule a pending game's challenger deadline from its event, and cancel it once
+    the game moves on, ex. the challenger is confirmed.
+    """
+    if event.game_id is None:
+        return
+
+    game_id = ObjectId(event.game_id)
+    if event.status == GameStatus.PENDING_CHALLENGER.value and event.deadline:
+        CHALLENGER_TIMERS.schedule(game_id, event.deadline)
+    else:
+        CHALLENGER_TIMERS.cancel(game_id)
+
+
+def watch_pending_challengers() -> None:
+    """
+    Watch the deadlines of every pending game, including those created while this
+    process was down. Deadlines that already passed expire immediately, and expiring
+    is atomic, so only one process expires each game.
+    """
+    for game_id, deadline in Game.challenger_deadlines():
+        CHALLENGER_TIMERS.schedule(game_id, deadline)
+
+
+def start_timers() -> Thread:
+    """
+    Start the deadline thread, following game events from now on, after first
+    recovering the deadlines of games that were pending when the process started.
+    """
+    EVENT_BUS.add_listener(watch_event)
+    watch_pending_challengers()
+    return CHALLENGER_TIMERS.start()
+
+
+def stop_timers() -> None:
+    """Stop following game events and stop the deadline thread."""
+    EVENT_BUS.remove_listener(watch_event)
+    CHALLENGER_TIMERS.stop()
@@ -0,0 +1,121 @@
+"""
+Bounded async worker pool. Work is queued up to a limit and run by a fixed number of
+workers, so a burst of slow jobs can't pile up unbounded work or connections. When
+the queue is full, new work is refused so the caller can shed it.
+"""
+from pydantic import BaseModel
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+
+logger = logging.getLogger(__name__)
+
+
+class PoolStats(BaseModel):
+    """Current load and lifetime counters of a worker pool."""
+    concurrency: int
+    max_queued: int
+    queued: int
+    running: int
+    processed: int
+    failed: int
+    shed: int
+
+
+class WorkerPool:
+    """
+    Runs `handler(job)` for submitted jobs, at most `concurrency` at a time, with at
+    most `max_queued` jobs waiting. Start and stop it from the event loop it runs on.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        concurrency: int,
+        max_queued: int,
+        name: str = "workers"
+    ):
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_queued = max_queued
+        self.name = name
+        self._jobs: asyncio.Queue | None = None
+        self._workers: list[asyncio.Task] = []
+        self.running = 0
+        self.processed = 0
+        self.failed = 0
+        self.shed = 0
+
+    async def _work(self) -> None:
+        """Run jobs from the queue until cancelled."""
+        while True:
+            job = await self._jobs.get()
+            self.running += 1
+
+            try:
+                await self.handler(job)
+                self.processed += 1
+            except Exception:
+                self.failed += 1
+                logger.exception("%s job failed", self.name)
+            finally:
+                self.running -= 1
+                self._jobs.task_done()
+
+    def start(self) -> None:
+        """Start the workers on the running event loop."""
+        self._jobs = asyncio.Queue(self.max_queued)
+        self._workers = [
+            asyncio.create_task(self._work(), name=f"{self.name}-{i}")
+            for i in range(self.concurrency)
+        ]
+
+    async def stop(self, timeout: float | None = None) -> None:
+        """
+        Stop the workers, first waiting up to `timeout` seconds for queued jobs to
+        finish. Jobs still queued after that are dropped.
+        """
+        if self._jobs is not None:
+            try:
+                await asyncio.wait_for(self._jobs.join(), timeout)
+            except TimeoutError:
+                logger.warning(
+                    "%s stopping with %d jobs unfinished", self.name, self._jobs.qsize()
+                )
+
+        for worker in self._workers:
+            worker.cancel()
+
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def submit(self, job: Any) -> bool:
+        """
+        Queue a job. Returns False, without queueing it, if the pool is saturated or
+        not running.
+        """
+        if self._jobs is None or not self._workers:
+            self.shed += 1
+            return False
+
+        try:
+            self._jobs.put_nowait(job)
+        except asyncio.QueueFull:
+            self.shed += 1
+            return False
+
+        return True
+
+    def stats(self) -> PoolStats:
+        """Queue depth, running jobs and lifetime counters."""
+        return PoolStats(
+            concurrency=self.concurrency,
+            max_queued=self.max_queued,
+            queued=self._jobs.qsize() if self._jobs is not None else 0,
+            running=self.running,
+            processed=self.processed,
+            failed=self.failed,
+            shed=self.shed
+        )
@@ -0,0 +1,21 @@
+import benchmarks  # points the keys at the benchmark placeholders
+
+import pytest
+
+from benchmarks.fakes import CountingClient
+from pool_queue import database
+from pool_queue.indexes import ensure_indexes
+from pool_queue.player import PLAYER_CACHE
+
+
+@pytest.fixture
+def db():
+    """A fresh in-memory database with the required indexes, counting operations."""
+    client = CountingClient()
+    database.set_client(client)
+    PLAYER_CACHE.clear()
+    ensure_indexes()
+
+    yield client
+
+    database.set_client(None)
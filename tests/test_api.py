@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+
+# Root of the repository, where `api` is importable from
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_import_is_cheap():
+    """
+    Importing the API neither loads LangChain nor reads the keys. Checked in a fresh
+    interpreter, as other tests import both.
+    """
+    check = (
+        "import sys, api; "
+        "assert 'langchain' not in sys.modules, 'LangChain imported'"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", check],
+        cwd=ROOT,
+        env={**os.environ, "POOL_QUEUE_KEYS": "/nonexistent"},
+        capture_output=True,
+        text=True
+    )
+
+    assert result.returncode == 0, result.stderr
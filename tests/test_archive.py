@@ -0,0 +1,78 @@
+from bson.objectid import ObjectId
+
+from datetime import datetime, timedelta
+
+from pool_queue.game import GAME_COLL, Game, GameStatus
+from pool_queue.game.archive import (
+    ARCHIVE_AFTER,
+    ARCHIVE_COLL,
+    _finished_at,
+    archive_finished_games
+)
+from pool_queue.player import Player
+
+
+NOW = datetime(2024, 1, 3, 12)
+
+
+def finished_game(finished_at: datetime | None) -> ObjectId:
+    """Insert a finished game at the default table, returning its ID."""
+    game = {
+        "king": {"name": "Ann", "phone_number": "15550001111"},
+        "challenger": {"name": "Bob", "phone_number": "15550002222"},
+        "status": GameStatus.FINISHED.value,
+        "venue": "default",
+        "table": "1"
+    }
+    if finished_at is not None:
+        game["finished_at"] = finished_at
+
+    return GAME_COLL.insert_one(game).inserted_id
+
+
+def test_legacy_games_finished_in_local_time():
+    created = datetime(2024, 1, 1, 23, 30)
+    game_id = ObjectId.from_datetime(created.astimezone())
+
+    assert _finished_at({"_id": game_id}) == created
+
+
+def test_old_finished_games_archived_by_day(db):
+    first = finished_game(datetime(2024, 1, 1, 9))
+    second = finished_game(datetime(2024, 1, 1, 22))
+    third = finished_game(datetime(2024, 1, 2, 8))
+    recent = finished_game(NOW - ARCHIVE_AFTER / 2)
+    live = Game.create(
+        Player.register("Cat", "15550003333"),
+        Player.register("Dan", "15550004444"),
+        force_active=True
+    )
+
+    assert archive_finished_games(NOW, batch_size=2) == 3
+
+    assert {game["_id"] for game in GAME_COLL.find()} == {recent, live.game_id}
+    buckets = {
+        bucket["day"]: [game["_id"] for game in bucket["games"]]
+        for bucket in ARCHIVE_COLL.find()
+    }
+    assert buckets == {
+        datetime(2024, 1, 1): [first, second],
+        datetime(2024, 1, 2): [third]
+    }
+
+
+def test_legacy_games_archived_by_creation(db):
+    old = GAME_COLL.insert_one(
+        {
+            "_id": ObjectId.from_datetime((NOW - timedelta(days=2)).astimezone()),
+            "king": "15550001111",
+            "challenger": "15550002222",
+            "status": GameStatus.FINISHED.value,
+            "venue": "default",
+            "table": "1"
+        }
+    ).inserted_id
+    finished_game(None)  # created just now
+
+    assert archive_finished_games(NOW) == 1
+    assert ARCHIVE_COLL.find_one()["games"][0]["_id"] == old
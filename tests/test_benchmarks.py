@@ -0,0 +1,12 @@
+from contextlib import redirect_stdout
+from io import StringIO
+
+from benchmarks.suite import run
+
+
+def test_suite_runs_offline(db):
+    with redirect_stdout(StringIO()):
+        results = run(sizes=[10], repeat=1, budget=1)
+
+    assert {result.benchmark for result in results} >= {"PlayerQueue.add", "run_agent"}
+    assert all(result.mongo_ops > 0 for result in results)
@@ -0,0 +1,64 @@
+import pytest
+
+from pool_queue import cache
+from pool_queue.cache import MISSING, TTLCache
+from pool_queue.player import Player, PlayerNotFoundError
+from pool_queue.telemetry import CACHE_LOOKUPS, METRICS
+
+
+def test_none_is_cached():
+    ttl_cache = TTLCache(max_size=2, ttl=60)
+    ttl_cache.set("a", None)
+    assert ttl_cache.get("a") is None
+    assert ttl_cache.get("b") is MISSING
+
+
+def test_entries_expire(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr(cache.time, "monotonic", lambda: now)
+
+    ttl_cache = TTLCache(max_size=2, ttl=10)
+    ttl_cache.set("a", 1)
+    now = 105.0
+    ttl_cache.set("b", 2)
+
+    now = 110.0
+    assert ttl_cache.get("a") is MISSING
+    assert ttl_cache.get("b") == 2
+    assert ttl_cache.stats().size == 1
+
+
+def test_least_recently_used_evicted():
+    ttl_cache = TTLCache(max_size=2, ttl=60)
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+
+    assert ttl_cache.get("b") is MISSING
+    assert (ttl_cache.get("a"), ttl_cache.get("c")) == (1, 3)
+
+
+def lookups(result: str) -> float:
+    """Player cache lookups with the given result counted in the metrics."""
+    counts = {tuple(key): count for key, count in CACHE_LOOKUPS.snapshot()}
+    return counts.get(("players", result), 0)
+
+
+def test_players_cached_but_not_misses(db):
+    player = Player.register("Ann", "15550001111")
+    hits, misses = lookups("hit"), lookups("miss")
+
+    db.reset()
+    assert Player.from_phone(player.phone_number) == player
+    assert Player.from_phone(player.phone_number) == player
+    assert db.total() == 1
+
+    # Unregistered numbers are looked up every time, as another worker may register them
+    for _ in range(2):
+        with pytest.raises(PlayerNotFoundError):
+            Player.from_phone("15559999999")
+    assert db.total() == 3
+
+    assert (lookups("hit") - hits, lookups("miss") - misses) == (1, 3)
+    assert CACHE_LOOKUPS in METRICS
@@ -0,0 +1,49 @@
+from pymongo.errors import PyMongoError
+
+from pool_queue.events import EVENT_BUS
+from pool_queue.events import change_streams
+
+
+class FakeStream:
+    """
+    A change stream with no changes, that records whether the bus was publishing
+    local events while it was open, and fails or stops the feed when polled.
+    """
+
+    def __init__(self, fail: bool, local: list[bool]):
+        self.fail = fail
+        self.local = local
+        self.resume_token = None
+
+    def __enter__(self) -> "FakeStream":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+    def try_next(self):
+        self.local.append(EVENT_BUS.local)
+        if self.fail:
+            raise PyMongoError("connection lost")
+
+        change_streams._stopped.set()
+
+
+def test_local_events_while_stream_down(db, monkeypatch):
+    local = []
+
+    def reopen(resume_token):
+        local.append(EVENT_BUS.local)
+        return FakeStream(False, local)
+
+    monkeypatch.setattr(change_streams, "RETRY_DELAY", 0)
+    monkeypatch.setattr(change_streams, "_reopen", reopen)
+
+    change_streams._stopped.clear()
+    try:
+        change_streams._run(FakeStream(True, local))
+    finally:
+        change_streams.stop_change_streams()
+
+    # Open, then failed and reopening, then open again
+    assert local == [False, True, False]
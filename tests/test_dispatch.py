@@ -0,0 +1,97 @@
+import asyncio
+
+from pool_queue.dispatch import KeyedDispatcher
+
+
+def run(test, **options):
+    """Run `test(dispatcher, turns)` on a started dispatcher recording its turns."""
+    turns = []
+    dispatcher_options = {"concurrency": 4, "max_pending": 10, "coalesce_window": 0.01}
+    dispatcher_options.update(options)
+
+    async def main():
+        async def handler(key, items):
+            turns.append((key, items))
+
+        dispatcher = KeyedDispatcher(handler, **dispatcher_options)
+        dispatcher.start()
+        await test(dispatcher, turns)
+        await dispatcher.stop(1)
+        return dispatcher
+
+    return asyncio.run(main()), turns
+
+
+def test_keys_handled_in_order():
+    async def test(dispatcher, turns):
+        for i in range(3):
+            dispatcher.submit("a", f"a{i}")
+            dispatcher.submit("b", f"b{i}")
+
+    _, turns = run(test, coalesce_window=0)
+    for key in ("a", "b"):
+        items = [item for turn_key, items in turns if turn_key == key for item in items]
+        assert items == [f"{key}0", f"{key}1", f"{key}2"]
+
+
+def test_items_in_window_coalesced():
+    async def test(dispatcher, turns):
+        for i in range(3):
+            dispatcher.submit("a", i)
+
+    # The window outlasts the test, so stopping queues the key's only turn
+    dispatcher, turns = run(test, coalesce_window=60)
+    assert turns == [("a", [0, 1, 2])]
+    assert dispatcher.stats().coalesced == 2
+
+
+def test_items_during_turn_coalesced():
+    turns = []
+
+    async def main():
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def handler(key, items):
+            turns.append(items)
+            started.set()
+            await release.wait()
+
+        dispatcher = KeyedDispatcher(
+            handler, concurrency=2, max_pending=10, coalesce_window=0
+        )
+        dispatcher.start()
+        dispatcher.submit("a", 1)
+        await asyncio.wait_for(started.wait(), 1)
+
+        # The first turn is running, so these wait for it and then run together
+        dispatcher.submit("a", 2)
+        dispatcher.submit("a", 3)
+        assert turns == [[1]]
+
+        release.set()
+        await dispatcher.stop(1)
+
+    asyncio.run(main())
+    assert turns == [[1], [2, 3]]
+
+
+def test_sheds_at_max_pending():
+    async def test(dispatcher, turns):
+        assert dispatcher.submit("a", 1)
+        assert dispatcher.submit("b", 2)
+        assert not dispatcher.submit("c", 3)
+
+    dispatcher, turns = run(test, max_pending=2, coalesce_window=0.05)
+    assert dispatcher.stats().shed == 1
+    assert sorted(turns) == [("a", [1]), ("b", [2])]
+
+
+def test_stop_drains_waiting_keys():
+    async def test(dispatcher, turns):
+        dispatcher.submit("a", 1)
+        dispatcher.submit("b", 2)
+
+    # Stopping doesn't wait out the window, but still answers both keys
+    dispatcher, turns = run(test, coalesce_window=60)
+    assert sorted(turns) == [("a", [1]), ("b", [2])]
+    assert dispatcher.stats().pending == 0
@@ -0,0 +1,163 @@
+import pytest
+
+from pool_queue.events import EVENT_BUS, EventType
+from pool_queue.game import (
+    GAME_COLL,
+    Game,
+    GameNotFoundError,
+    GameStatus,
+    GameStatusConflictError
+)
+from pool_queue.player import Player
+from pool_queue.player_queue import PlayerQueue
+from pool_queue.table import DEFAULT_TABLE, Table
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Events emitted during the test."""
+    emitted = []
+    monkeypatch.setattr(EVENT_BUS, "emit", emitted.append)
+    return emitted
+
+
+def register(*names):
+    """Register players with numbered phone numbers, in order."""
+    return [
+        Player.register(name, f"1555000{n:04d}") for n, name in enumerate(names)
+    ]
+
+
+@pytest.fixture
+def pending_game(db):
+    """A pending game at the default venue, Ann waiting for Bob to arrive."""
+    king = Player.register("Ann", "15550001111")
+    challenger = Player.register("Bob", "15550002222")
+    return Game.create(king, challenger)
+
+
+def test_confirming_challenger_starts_game(pending_game):
+    Game.transition_for_player(
+        pending_game.king,
+        "default",
+        GameStatus.PENDING_CHALLENGER,
+        GameStatus.IN_PROGRESS,
+        as_king=True
+    )
+
+    assert Game.from_only_active().game_id == pending_game.game_id
+
+
+def test_lost_race_raises(pending_game):
+    """A stale copy of the game can't overwrite a transition made since it loaded."""
+    stale = Game.from_only_pending()
+    pending_game.update_status(GameStatus.IN_PROGRESS)
+
+    with pytest.raises(GameStatusConflictError):
+        stale.update_status(GameStatus.FINISHED)
+
+    assert pending_game.check_status() is GameStatus.IN_PROGRESS
+
+
+def test_double_transition_applies_once(pending_game, events):
+    """Two messages confirming the same challenger start the game only once."""
+    args = (
+        pending_game.king,
+        "default",
+        GameStatus.PENDING_CHALLENGER,
+        GameStatus.IN_PROGRESS
+    )
+    Game.transition_for_player(*args, as_king=True)
+
+    with pytest.raises(GameNotFoundError):
+        Game.transition_for_player(*args, as_king=True)
+
+    assert len(events) == 1
+
+
+def test_only_king_transitions_as_king(pending_game):
+    with pytest.raises(GameNotFoundError):
+        Game.transition_for_player(
+            pending_game.challenger,
+            "default",
+            GameStatus.PENDING_CHALLENGER,
+            GameStatus.IN_PROGRESS,
+            as_king=True
+        )
+
+
+def test_finished_game_not_live(pending_game):
+    pending_game.update_status(GameStatus.FINISHED)
+
+    assert Game.live_at(pending_game.table) is None
+    with pytest.raises(GameNotFoundError):
+        Game.for_player(pending_game.king, "default")
+
+
+@pytest.mark.parametrize(
+    "status", [GameStatus.PENDING_CHALLENGER, GameStatus.IN_PROGRESS]
+)
+def test_update_emits_target_status(db, events, status):
+    """Moving a game, even back to pending, is a status change, not a promotion."""
+    king = Player.register("Ann", "15550001111")
+    challenger = Player.register("Bob", "15550002222")
+    game = Game.create(king, challenger, force_active=True)
+    game.update_status(GameStatus.PENDING_CHALLENGER)
+    if status is GameStatus.IN_PROGRESS:
+        game.update_status(GameStatus.IN_PROGRESS)
+
+    event = events[-1]
+    assert event.type is EventType.GAME_STATUS
+    assert event.status == status.value
+
+
+def test_tables_partition_games(db):
+    ann, bob, cat, dan = register("Ann", "Bob", "Cat", "Dan")
+    other = Table.register("default", "2")
+    Game.create(ann, bob, force_active=True)
+    Game.create(cat, dan, table=other)
+
+    assert Game.from_only_active().king == ann
+    assert Game.from_only_pending(other).king == cat
+    with pytest.raises(GameNotFoundError):
+        Game.from_only_pending()
+
+    assert {table.table for table in Game.live_tables("default")} == {"1", "2"}
+    assert Game.for_player(dan, "default").table == other
+    assert Game.live_tables("elsewhere") == []
+
+
+def test_tables_partition_queues(db):
+    ann, bob = register("Ann", "Bob")
+    tables = [DEFAULT_TABLE, Table.register("default", "2")]
+    PlayerQueue().add(ann)
+
+    shortest = PlayerQueue.shortest(tables)
+    shortest.add(bob)
+
+    assert shortest.table == tables[1]
+    assert PlayerQueue.for_player(bob).table == tables[1]
+    assert PlayerQueue().get_queue() == [ann]
+
+
+def test_bootstrap_migrates_legacy_games(db):
+    ann, bob = register("Ann", "Bob")
+    GAME_COLL.insert_many(
+        [
+            {
+                "king": ann.phone_number,
+                "challenger": bob.phone_number,
+                "status": status.value
+            }
+            for status in (GameStatus.FINISHED, GameStatus.PENDING_CHALLENGER)
+        ]
+    )
+
+    Game.bootstrap()
+
+    assert GAME_COLL.count_documents({"king": {"$type": "string"}}) == 0
+    assert GAME_COLL.count_documents({"live": True}) == 1
+    pending = Game.for_player(bob, "default")
+    assert pending.status is GameStatus.PENDING_CHALLENGER
+    assert pending.table == DEFAULT_TABLE
+    assert pending.challenger == bob
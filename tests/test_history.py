@@ -0,0 +1,75 @@
+from pool_queue import history
+from pool_queue.history import ChatHistory, Message
+from pool_queue.agent.prompts import (
+    MAX_VERBATIM_MESSAGES,
+    SUMMARY_BATCH_SIZE,
+    AgentPrompts,
+    estimate_tokens,
+    summarize_history
+)
+
+
+PHONE = "15550001111"
+
+
+def message(content: str, sender: str = "user") -> Message:
+    """A message in the test user's history."""
+    return Message(phone_number=PHONE, content=content, sender=sender)
+
+
+def test_messages_numbered_across_trims(db, monkeypatch):
+    monkeypatch.setattr(history, "MAX_STORED_MESSAGES", 3)
+    chat_history = ChatHistory.from_phone(PHONE)
+    chat_history.extend([message("a"), message("b")])
+    chat_history.extend([message("c"), message("d")])
+
+    loaded = ChatHistory.from_phone(PHONE)
+    assert [m.content for m in loaded.messages] == ["b", "c", "d"]
+    assert [m.seq for m in loaded.messages] == [2, 3, 4]
+    assert loaded.message_count == chat_history.message_count == 4
+
+
+def test_summary_saved_once_per_cursor(db):
+    ChatHistory.from_phone(PHONE).extend([message("a"), message("b")])
+    first, second = ChatHistory.from_phone(PHONE), ChatHistory.from_phone(PHONE)
+
+    assert first.save_summary("covers a", through=1)
+    assert not second.save_summary("also covers a", through=1)
+
+    loaded = ChatHistory.from_phone(PHONE)
+    assert (loaded.summary, loaded.summarized_seq) == ("covers a", 1)
+    assert loaded.unsummarized(loaded.messages) == loaded.messages[1:]
+
+
+def test_older_messages_summarized_in_batches(db):
+    chat_history = ChatHistory.from_phone(PHONE)
+    count = MAX_VERBATIM_MESSAGES + SUMMARY_BATCH_SIZE
+    chat_history.extend([message("x" * 20) for _ in range(count)])
+    prompts = []
+
+    summarize_history(chat_history, lambda prompt: prompts.append(prompt) or "sum")
+
+    loaded = ChatHistory.from_phone(PHONE)
+    assert len(prompts) == 1
+    assert loaded.summary == "sum"
+    assert loaded.summarized_seq >= SUMMARY_BATCH_SIZE
+
+
+def test_prompt_history_within_budget(db):
+    chat_history = ChatHistory.from_phone(PHONE)
+    chat_history.extend([message(f"message {n} " + "x" * 80) for n in range(30)])
+    chat_history.save_summary("earlier talk", through=5)
+
+    rendered = AgentPrompts.build(None, chat_history, token_budget=200).chat_history
+    assert estimate_tokens(rendered) <= 200
+    assert rendered.startswith("(Summary of earlier messages: earlier talk)")
+    assert "message 29" in rendered and "message 6 " not in rendered
+
+
+def test_oversized_message_cut_to_budget(db):
+    chat_history = ChatHistory.from_phone(PHONE)
+    chat_history.extend([message("x" * 10_000)])
+
+    rendered = AgentPrompts.build(None, chat_history, token_budget=100).chat_history
+    assert estimate_tokens(rendered) <= 100
+    assert rendered.startswith("user: xxx") and rendered.endswith("...")
@@ -0,0 +1,124 @@
+import pytest
+
+from types import SimpleNamespace
+
+from pool_queue.agent.intents import (
+    DEFAULT_ACK,
+    INTENT_ACKS,
+    REGISTRATION_ACK,
+    Intent,
+    _acknowledgment,
+    acknowledgment,
+    intent_for,
+    match_intent
+)
+from pool_queue.game import Game, GameStatus
+from pool_queue.player import Player
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "nobody is here",
+        "no one is here",
+        "who is here",
+        "nobody has arrived",
+        "everyone is here",
+        "what is here",
+        "is he here?",
+        "the next player isnt here",
+        "john is here"
+    ]
+)
+def test_near_misses_go_to_agent(query):
+    assert match_intent(query) is None
+
+
+@pytest.mark.parametrize(
+    "query",
+    ["He's here", "they're here", "The next player is here!", "challenger arrived"]
+)
+def test_confirm_challenger(query):
+    assert match_intent(query) is Intent.CONFIRM_CHALLENGER
+
+
+@pytest.mark.parametrize(
+    "query, intent",
+    [
+        ("I lost", Intent.LOST_MATCH),
+        ("join", Intent.JOIN_QUEUE),
+        ("Take me off the list", Intent.LEAVE_QUEUE),
+        ("where am i?", Intent.CHECK_POSITION),
+        ("who's next", Intent.SEE_QUEUE)
+    ]
+)
+def test_commands(query, intent):
+    assert match_intent(query) is intent
+
+
+def test_partial_match_goes_to_agent():
+    assert match_intent("i lost my phone, am i still in line?") is None
+
+
+PLAYER = Player(name="Ann", phone_number="15550001111")
+OPPONENT = Player(name="Bob", phone_number="15550002222")
+
+
+def game(status, king=PLAYER):
+    """A stand-in for a game, with what acknowledgments look at."""
+    return SimpleNamespace(status=status, king=king)
+
+
+def test_unregistered_acknowledgment():
+    assert acknowledgment("i lost", None, "default") == REGISTRATION_ACK
+
+
+def test_partial_match_acknowledged_neutrally():
+    assert acknowledgment("i lost my phone", PLAYER, "default") == DEFAULT_ACK
+
+
+@pytest.mark.parametrize(
+    "intent, queue, live_game, acted",
+    [
+        (Intent.JOIN_QUEUE, None, None, True),
+        (Intent.JOIN_QUEUE, object(), None, False),
+        (Intent.LEAVE_QUEUE, object(), None, True),
+        (Intent.LEAVE_QUEUE, None, None, False),
+        (Intent.LOST_MATCH, None, game(GameStatus.IN_PROGRESS), True),
+        (Intent.LOST_MATCH, None, game(GameStatus.PENDING_CHALLENGER), False),
+        (Intent.LOST_MATCH, None, None, False),
+        (Intent.CONFIRM_CHALLENGER, None, game(GameStatus.PENDING_CHALLENGER), True),
+        (
+            Intent.CONFIRM_CHALLENGER,
+            None,
+            game(GameStatus.PENDING_CHALLENGER, king=OPPONENT),
+            False
+        ),
+        (Intent.SEE_QUEUE, None, None, True)
+    ]
+)
+def test_acknowledgment_checks_state(intent, queue, live_game, acted):
+    expected = INTENT_ACKS[intent] if acted else DEFAULT_ACK
+    assert _acknowledgment(intent, PLAYER, queue, live_game) == expected
+
+
+@pytest.fixture
+def pending_game(db):
+    """A pending game at the default venue, Ann waiting for Bob Smith to arrive."""
+    king = Player.register("Ann", "15550001111")
+    challenger = Player.register("Bob Smith", "15550002222")
+    return Game.create(king, challenger)
+
+
+@pytest.mark.parametrize("query", ["Bob is here", "bob smith has arrived", "Bob arrived"])
+def test_named_challenger_confirmed(pending_game, query):
+    assert intent_for(query, pending_game.king, "default") is Intent.CONFIRM_CHALLENGER
+
+
+@pytest.mark.parametrize("query", ["Carl is here", "nobody is here", "smith is here"])
+def test_other_names_go_to_agent(pending_game, query):
+    assert intent_for(query, pending_game.king, "default") is None
+
+
+def test_only_king_confirms_by_name(pending_game):
+    assert intent_for("Bob is here", pending_game.challenger, "default") is None
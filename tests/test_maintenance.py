@@ -0,0 +1,30 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from pool_queue.maintenance import run_once
+
+
+DUE = datetime(2026, 1, 1, 4)
+
+
+def test_each_run_claimed_once(db):
+    runs = []
+
+    assert run_once("job", DUE, lambda: runs.append(DUE))
+    assert not run_once("job", DUE, lambda: runs.append(DUE))
+    assert not run_once("job", DUE - timedelta(days=1), lambda: runs.append(None))
+
+    later = DUE + timedelta(days=1)
+    assert run_once("job", later, lambda: runs.append(later))
+    assert runs == [DUE, later]
+
+
+def test_failed_run_released(db):
+    def fail():
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError):
+        run_once("job", DUE, fail)
+
+    assert run_once("job", DUE, lambda: None)
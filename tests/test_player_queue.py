@@ -0,0 +1,82 @@
+from pool_queue.player import Player
+from pool_queue.player_queue import PlayerQueue
+
+
+def register(*names):
+    """Register players with numbered phone numbers, in order."""
+    return [
+        Player.register(name, f"1555000{n:04d}") for n, name in enumerate(names)
+    ]
+
+
+def test_snapshot_in_queue_order_reporting_missing(db):
+    ann, bob = register("Ann", "Bob")
+    queue = PlayerQueue()
+    queue.add(bob)
+    queue.add("15559999999")  # never registered
+    queue.add(ann)
+
+    db.reset()
+    snapshot = queue.snapshot()
+
+    assert db.total() == 1
+    assert snapshot.players == [bob, ann]
+    assert snapshot.missing == ["15559999999"]
+
+
+def test_next_player_skips_missing_records(db):
+    (ann,) = register("Ann")
+    queue = PlayerQueue()
+    queue.add("15559999999")
+    queue.add(ann)
+
+    assert queue.find_next_player() == ann
+
+
+def test_next_player_of_empty_queue(db):
+    assert PlayerQueue().find_next_player() is None
+
+
+def test_positions_follow_join_order(db):
+    ann, bob, cat = register("Ann", "Bob", "Cat")
+    queue = PlayerQueue()
+    for player in (ann, bob, cat):
+        assert queue.add(player)
+
+    assert [queue.get_position(p) for p in (ann, bob, cat)] == [1, 2, 3]
+    assert queue.get_position("15559999999") == -1
+
+
+def test_player_joins_once(db):
+    (ann,) = register("Ann")
+    queue = PlayerQueue()
+
+    assert queue.add(ann)
+    assert not queue.add(ann)
+    assert queue.get_queue() == [ann]
+
+
+def test_front_insert_goes_ahead_of_everyone(db):
+    ann, bob, cat, dan = register("Ann", "Bob", "Cat", "Dan")
+    queue = PlayerQueue()
+    queue.add(ann)
+    queue.add(bob)
+    queue.add(cat, front=True)
+    queue.add(dan, front=True)
+
+    assert queue.get_queue() == [dan, cat, ann, bob]
+    assert queue.get_position(ann) == 3
+
+
+def test_pop_and_remove_close_gaps(db):
+    ann, bob, cat = register("Ann", "Bob", "Cat")
+    queue = PlayerQueue()
+    for player in (ann, bob, cat):
+        queue.add(player)
+
+    assert queue.pop_next() == ann
+    assert queue.remove(cat)
+    assert not queue.remove(cat)
+    assert queue.get_position(bob) == 1
+    assert queue.pop_next() == bob
+    assert queue.pop_next() is None
@@ -0,0 +1,84 @@
+import pytest
+
+from pool_queue.agent import _prompt_history, _response_key
+from pool_queue.history import ChatHistory, Message
+from pool_queue.agent.responses import (
+    RESPONSE_CACHE,
+    cache_response,
+    cacheable_query,
+    cached_response,
+    response_key
+)
+from pool_queue.events import EVENT_BUS
+from pool_queue.player import Player
+
+
+KEY = response_key("How does the queue work?", None, "default", None)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    RESPONSE_CACHE.clear()
+
+
+@pytest.fixture
+def change_streams(monkeypatch):
+    """An event bus fed by change streams, so its version tracks every process."""
+    monkeypatch.setattr(EVENT_BUS, "local", False)
+
+
+def test_key_normalized():
+    assert KEY == response_key("how does the queue work", None, "default", None)
+
+
+def test_short_messages_not_cached():
+    assert not cacheable_query("yes please")
+    assert cacheable_query("how does this work?")
+
+
+def test_reply_without_tools_outlives_state_changes(monkeypatch):
+    cache_response(KEY, "Text join to get in line.", set(), EVENT_BUS.version)
+    monkeypatch.setattr(EVENT_BUS, "version", EVENT_BUS.version + 1)
+
+    assert cached_response(KEY) == "Text join to get in line."
+
+
+def test_shared_tool_reply_tracks_state_version(change_streams, monkeypatch):
+    cache_response(KEY, "Ann, then Bob.", {"See Full Queue"}, EVENT_BUS.version)
+    assert cached_response(KEY) == "Ann, then Bob."
+
+    monkeypatch.setattr(EVENT_BUS, "version", EVENT_BUS.version + 1)
+    assert cached_response(KEY) is None
+
+
+def test_shared_tool_reply_not_cached_without_change_streams():
+    assert EVENT_BUS.local
+    cache_response(KEY, "Ann, then Bob.", {"See Full Queue"}, EVENT_BUS.version)
+
+    assert cached_response(KEY) is None
+
+
+def test_reply_using_private_tools_not_cached(change_streams):
+    tools = {"See Full Queue", "Check Position"}
+    cache_response(KEY, "You're second.", tools, EVENT_BUS.version)
+
+    assert cached_response(KEY) is None
+
+
+def test_queue_only_looked_up_for_cacheable_messages(db):
+    player = Player.register("Ann", "15550001111")
+    db.reset()
+
+    assert _response_key("yes", player, "default") is None
+    assert db.total() == 0
+    assert _response_key("how does this work", player, "default") is not None
+
+
+def test_cacheable_messages_answered_without_history():
+    history = ChatHistory(
+        phone_number="15550001111",
+        messages=[Message(phone_number="15550001111", content="hi", sender="user")]
+    )
+
+    assert _prompt_history(None, history) is history
+    assert _prompt_history(KEY, history).messages == []
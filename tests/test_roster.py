@@ -0,0 +1,59 @@
+from pool_queue.player import PLAYER_COLL, Player
+from pool_queue.player.roster import RosterRow, import_roster, read_roster
+
+
+CSV_ROSTER = """name,phone_number
+Ann,15550000001
+Bob,+15550000002
+,15550000003
+Cat,555
+Dan,15550000001
+Eve,15550000009
+"""
+
+
+def test_csv_roster_reports_rows_not_registered(db, tmp_path):
+    Player.register("Eve", "15550000009")
+    path = tmp_path / "roster.csv"
+    path.write_text(CSV_ROSTER)
+
+    report = import_roster(read_roster(str(path)), batch_size=2)
+
+    assert report.rows == 6
+    assert report.registered == 2
+    assert [error.line for error in report.errors] == [4, 5, 6, 7]
+    assert report.errors[0].error == "Name is missing."
+    assert "11 digits" in report.errors[1].error
+    assert report.errors[2].error == "Duplicate of line 2."
+    assert report.errors[3].error == "Already registered."
+    assert Player.from_phone("15550000002").name == "Bob"
+
+
+def test_jsonl_roster(db, tmp_path):
+    path = tmp_path / "roster.jsonl"
+    path.write_text(
+        '{"name": "Ann", "phone": "15550000001"}\n'
+        "\n"
+        "not json\n"
+        '["Bob", "15550000002"]\n'
+    )
+
+    report = import_roster(read_roster(str(path)))
+
+    assert report.registered == 1
+    assert [error.line for error in report.errors] == [3, 4]
+    assert PLAYER_COLL.count_documents({}) == 1
+
+
+def test_batches_checked_in_one_query_each(db):
+    rows = [
+        RosterRow(line=n + 2, name=f"Player {n}", phone_number=f"1555000{n:04d}")
+        for n in range(10)
+    ]
+    db.reset()
+
+    report = import_roster(rows, batch_size=5)
+
+    assert report.registered == 10
+    # One existence check and one insert per batch
+    assert db.total() == 4
@@ -0,0 +1,80 @@
+import pytest
+
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from pool_queue.game import Game, GameStatus
+from pool_queue.player import Player
+from pool_queue.table import DEFAULT_TABLE
+from pool_queue.table.stats import (
+    DEFAULT_ARRIVAL_SECONDS,
+    DEFAULT_GAME_SECONDS,
+    TableStats,
+    Transition,
+    record
+)
+
+
+NOW = datetime(2024, 1, 1, 20)
+
+
+def recorded(*transitions: tuple[Transition, float]) -> TableStats:
+    """The default table's statistics after recording the transitions."""
+    for transition, seconds in transitions:
+        record(DEFAULT_TABLE, transition, seconds)
+
+    return TableStats.for_table(DEFAULT_TABLE)
+
+
+def test_defaults_until_enough_samples(db):
+    stats = recorded((Transition.GAME, 60), (Transition.ARRIVAL, 10))
+    per_player = DEFAULT_ARRIVAL_SECONDS + DEFAULT_GAME_SECONDS
+
+    assert stats.eta(1) == timedelta(0)
+    assert stats.eta(3) == timedelta(seconds=2 * per_player)
+
+
+def test_eta_from_running_averages(db):
+    stats = recorded(
+        *[(Transition.GAME, seconds) for seconds in (500, 600, 700)],
+        *[(Transition.ARRIVAL, 30)] * 3
+    )
+
+    assert stats.mean_game_seconds == 600
+    assert stats.seconds_per_player == 630
+    assert stats.throughput_per_hour == pytest.approx(3600 * 3 / 1890)
+    assert stats.eta(4) == timedelta(seconds=3 * 630)
+
+
+def test_no_shows_weighted_in(db):
+    stats = recorded(
+        *[(Transition.GAME, 600)] * 3,
+        *[(Transition.ARRIVAL, 30)] * 3,
+        (Transition.NO_SHOW, 120)
+    )
+
+    assert stats.no_show_rate == 0.25
+    assert stats.seconds_per_player == 0.75 * 630 + 0.25 * 120
+
+
+def test_eta_counts_live_game():
+    stats = TableStats(games=3, game_seconds=1800, arrivals=3, arrival_seconds=90)
+    playing = SimpleNamespace(started_at=NOW - timedelta(minutes=4), created_at=None)
+    pending = SimpleNamespace(started_at=None, created_at=NOW - timedelta(seconds=10))
+
+    assert stats.eta(1, playing, NOW) == timedelta(minutes=6)
+    assert stats.eta(1, pending, NOW) == timedelta(seconds=20 + 600)
+    assert stats.eta(2, pending, NOW) == timedelta(seconds=20 + 600 + 630)
+
+
+def test_transitions_recorded(db):
+    king = Player.register("Ann", "15550001111")
+    challenger = Player.register("Bob", "15550002222")
+
+    game = Game.create(king, challenger)
+    game.update_status(GameStatus.IN_PROGRESS)
+    game.update_status(GameStatus.FINISHED)
+
+    stats = TableStats.for_table(DEFAULT_TABLE)
+    assert (stats.arrivals, stats.games, stats.no_shows) == (1, 1, 0)
+    assert game.started_at is not None and game.finished_at is not None
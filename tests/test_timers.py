@@ -0,0 +1,146 @@
+import pytest
+from bson.objectid import ObjectId
+
+from datetime import datetime, timedelta
+from threading import Event
+
+from pool_queue.events import EVENT_BUS
+from pool_queue.game import GAME_COLL, Game, GameStatus
+from pool_queue.player import Player
+from pool_queue.player_queue import PlayerQueue
+from pool_queue.sms import StubSender, get_sender, set_sender
+from pool_queue.timers import (
+    CHALLENGER_TIMERS,
+    DeadlineScheduler,
+    call_next_challenger,
+    expire_challenger,
+    watch_event
+)
+
+
+def scheduler(last=None):
+    """
+    A scheduler, the keys it expired in order, and an event set once it expires
+    `last`, or any key if None.
+    """
+    expired = []
+    expiring = Event()
+
+    def on_expire(key):
+        expired.append(key)
+        if last is None or key == last:
+            expiring.set()
+
+    return DeadlineScheduler(on_expire), expired, expiring
+
+
+def test_expires_in_deadline_order():
+    first, second = ObjectId(), ObjectId()
+    deadlines, expired, expiring = scheduler(last=second)
+    past = datetime.now() - timedelta(minutes=1)
+
+    deadlines.schedule(second, past + timedelta(seconds=1))
+    deadlines.schedule(first, past)
+    deadlines.start()
+    assert expiring.wait(1)
+    deadlines.stop()
+
+    assert expired == [first, second]
+    assert len(deadlines) == 0
+
+
+def test_waits_for_future_deadline():
+    due, later = ObjectId(), ObjectId()
+    deadlines, expired, expiring = scheduler()
+    deadlines.start()
+
+    deadlines.schedule(later, datetime.now() + timedelta(minutes=1))
+    deadlines.schedule(due, datetime.now() + timedelta(milliseconds=20))
+    assert expiring.wait(1)
+    deadlines.stop()
+
+    assert expired == [due]
+    assert len(deadlines) == 1
+
+
+def test_cancelled_and_rescheduled():
+    cancelled, rescheduled, last = ObjectId(), ObjectId(), ObjectId()
+    deadlines, expired, expiring = scheduler(last=last)
+    past = datetime.now() - timedelta(minutes=1)
+
+    deadlines.schedule(cancelled, past)
+    deadlines.schedule(rescheduled, past)
+    deadlines.schedule(rescheduled, past)  # unchanged, so expires once
+    deadlines.schedule(rescheduled, past + timedelta(seconds=1))
+    deadlines.schedule(last, past + timedelta(seconds=2))
+    deadlines.cancel(cancelled)
+    deadlines.start()
+    assert expiring.wait(1)
+    deadlines.stop()
+
+    assert expired == [rescheduled, last]
+
+
+@pytest.fixture
+def texts():
+    """Texts sent during the test, through a stub sender."""
+    previous, stub = get_sender(), StubSender()
+    set_sender(stub)
+    yield stub.sent
+    set_sender(previous)
+
+
+@pytest.fixture
+def watched(db):
+    """Challenger deadlines following game events, as after `start_timers`."""
+    EVENT_BUS.add_listener(watch_event)
+    yield CHALLENGER_TIMERS
+    EVENT_BUS.remove_listener(watch_event)
+    for game_id, _ in Game.challenger_deadlines():
+        CHALLENGER_TIMERS.cancel(game_id)
+
+
+def queued_game(*names):
+    """An in-progress game between the first two players, the rest queued."""
+    king, challenger, *queued = [
+        Player.register(name, f"1555000{n:04d}") for n, name in enumerate(names)
+    ]
+    for player in queued:
+        PlayerQueue().add(player)
+
+    return Game.create(king, challenger, force_active=True)
+
+
+def test_called_challenger_texted_and_watched(watched, texts):
+    game = queued_game("Ann", "Bob", "Cat")
+    game.update_status(GameStatus.FINISHED)
+
+    challenger, pending = call_next_challenger(game.king, game.table)
+
+    assert challenger.name == "Cat"
+    assert [phone for phone, _ in texts] == [challenger.phone_number]
+    assert "Ann" in texts[0][1]
+    assert len(watched) == 1
+
+    pending.update_status(GameStatus.IN_PROGRESS)
+    assert len(watched) == 0
+
+
+def test_expired_challenger_skipped(watched, texts):
+    game = queued_game("Ann", "Bob", "Cat", "Dan")
+    game.update_status(GameStatus.FINISHED)
+    _, pending = call_next_challenger(game.king, game.table)
+    GAME_COLL.update_one(
+        {"_id": pending.game_id},
+        {"$set": {"challenger_deadline": datetime.now() - timedelta(seconds=1)}}
+    )
+
+    expire_challenger(pending.game_id)
+
+    next_game = Game.from_only_pending()
+    assert pending.check_status() is GameStatus.FINISHED
+    assert next_game.challenger.name == "Dan"
+    assert [phone for phone, _ in texts] == [
+        pending.challenger.phone_number, next_game.challenger.phone_number
+    ]
+    assert len(watched) == 1
@@ -0,0 +1,74 @@
+import pytest
+from starlette.requests import Request
+
+from base64 import b64encode
+import hashlib
+import hmac
+
+from api.webhooks import _signed
+from keys import KEYS
+from keys.models import TwilioModel
+
+
+AUTH_TOKEN = "12345"
+
+FORM = {"Body": ["I lost"], "From": ["+15550001111"], "MessageSid": ["SM1"]}
+
+
+@pytest.fixture(autouse=True)
+def twilio(monkeypatch):
+    """Twilio keys, so webhook signatures are checked."""
+    keys = TwilioModel(account_sid="AC1", auth_token=AUTH_TOKEN, from_number="+1555")
+    monkeypatch.setattr(KEYS.load(), "Twilio", keys)
+
+
+def signature(url: str, form: dict[str, list[str]]) -> str:
+    """Twilio's signature of a request to `url` with the form parameters."""
+    payload = url + "".join(key + form[key][0] for key in sorted(form))
+    digest = hmac.new(AUTH_TOKEN.encode(), payload.encode(), hashlib.sha1).digest()
+    return b64encode(digest).decode()
+
+
+def request(signature: str | None, forwarded_proto: str | None = None) -> Request:
+    """A webhook request to http://pool.example/webhooks/sms?venue=bar."""
+    headers = [(b"host", b"pool.example")]
+    if signature is not None:
+        headers.append((b"x-twilio-signature", signature.encode()))
+    if forwarded_proto is not None:
+        headers.append((b"x-forwarded-proto", forwarded_proto.encode()))
+
+    return Request(
+        {
+            "type": "http",
+            "method": "POST",
+            "scheme": "http",
+            "path": "/webhooks/sms",
+            "query_string": b"venue=bar",
+            "headers": headers
+        }
+    )
+
+
+def test_valid_signature_accepted():
+    url = "http://pool.example/webhooks/sms?venue=bar"
+    assert _signed(request(signature(url, FORM)), FORM)
+
+
+def test_signed_over_forwarded_scheme():
+    url = "https://pool.example/webhooks/sms?venue=bar"
+    assert _signed(request(signature(url, FORM), forwarded_proto="https"), FORM)
+
+
+def test_tampered_body_rejected():
+    url = "http://pool.example/webhooks/sms?venue=bar"
+    tampered = {**FORM, "Body": ["I won"]}
+    assert not _signed(request(signature(url, FORM)), tampered)
+
+
+def test_missing_signature_rejected():
+    assert not _signed(request(None), FORM)
+
+
+def test_unsigned_accepted_without_twilio(monkeypatch):
+    monkeypatch.setattr(KEYS.load(), "Twilio", None)
+    assert _signed(request(None), FORM)